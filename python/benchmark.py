@@ -0,0 +1,418 @@
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+# puts the vendored mne, mne_bids and bids_validator that build.sh ships ahead of installed copies
+import python.libs  # noqa: F401
+
+# Benchmarks of the EEG2BIDS pipeline on synthetic EDF/EDF+ recordings. BDF is not benchmarked,
+# EDF.EDFReader only reads 16-bit samples.
+#
+#   python -m python.benchmark --output results.json
+#   python -m python.benchmark --formats edf+ --channels 64 --sfreq 1024 --duration 86400 --output 24h.json
+#   python -m python.benchmark --output new.json --compare old.json
+#
+# Every stage runs in a fresh process, so that its peak RSS is not hidden by an earlier stage. What the
+# stages print is discarded, only the results are printed.
+# The stages of one recording run in order, each one on the output of the previous ones.
+
+RESULTS_VERSION = 1
+
+BENCHMARKS = ['get_edf_data', 'edf_reader', 'edf_writer', 'converter', 'modifier', 'validate', 'tarfile']
+
+# stages that build the BIDS output, in order
+PIPELINE = ['converter', 'modifier', 'validate', 'tarfile']
+
+# number of data records read or written at a time, as in iEEG.Anonymize.make_copy
+CHUNK_RECORDS = 64
+
+
+####################################################################################################
+# synthetic recordings
+####################################################################################################
+
+def field(value, size):
+    return str(value)[:size].ljust(size).encode('ascii')
+
+
+def annotation_records(n_records, record_length, annotations_per_minute):
+    # one TAL block per data record, starting with the time-keeping annotation of the record
+    records = [['+{:g}\x14\x14\x00'.format(i * record_length)] for i in range(n_records)]
+    if annotations_per_minute > 0:
+        duration = n_records * record_length
+        for i, onset in enumerate(np.arange(0, duration, 60 / annotations_per_minute)):
+            records[int(onset // record_length)].append('+{:g}\x150.5\x14stim{}\x14\x00'.format(onset, i % 4))
+    return [''.join(tals).encode('utf-8') for tals in records]
+
+
+# writes a recording of n_channels random signals. EDF+ files also get an 'EDF Annotations' channel
+# holding annotations_per_minute annotations, plain EDF files have no annotations.
+def write_synthetic_edf(fname, fmt='edf', n_channels=32, sfreq=256, duration=60, annotations_per_minute=0,
+                        record_length=1, seed=0):
+    n_samps = int(round(sfreq * record_length))
+    n_records = int(np.ceil(duration / record_length))
+    digital_max = 2 ** 15 - 1
+
+    labels = ['EEG{:03d}'.format(ch + 1) for ch in range(n_channels)]
+    samps = [n_samps] * n_channels
+    tals = None
+    if fmt == 'edf+':
+        tals = annotation_records(n_records, record_length, annotations_per_minute)
+        labels.append('EDF Annotations')
+        samps.append(int(np.ceil(max(len(tal) for tal in tals) / 2)))
+    nchan = len(labels)
+
+    header = field('0', 8)
+    header += field('X M 01-JAN-1980 Synthetic' if fmt == 'edf+' else 'Synthetic', 80)
+    header += field('Startdate 01-JAN-2020 X X X' if fmt == 'edf+' else 'Synthetic', 80)
+    header += field('01.01.20', 8) + field('00.00.00', 8) + field(256 * (nchan + 1), 8)
+    header += field('EDF+C' if fmt == 'edf+' else '', 44)
+    header += field(n_records, 8) + field('{:g}'.format(record_length), 8) + field(nchan, 4)
+    annotation = [label == 'EDF Annotations' for label in labels]
+    header += b''.join(field(label, 16) for label in labels)
+    header += b''.join(field('' if is_tal else 'AgAgCl electrode', 80) for is_tal in annotation)
+    header += b''.join(field('' if is_tal else 'uV', 8) for is_tal in annotation)
+    header += b''.join(field(-1 if is_tal else -3200, 8) for is_tal in annotation)
+    header += b''.join(field(1 if is_tal else 3200, 8) for is_tal in annotation)
+    header += b''.join(field(-32768 if is_tal else -digital_max - 1, 8) for is_tal in annotation)
+    header += b''.join(field(32767 if is_tal else digital_max, 8) for is_tal in annotation)
+    header += b''.join(field('' if is_tal else 'HP:0.1Hz LP:100Hz', 80) for is_tal in annotation)
+    header += b''.join(field(n, 8) for n in samps)
+    header += field('', 32) * nchan
+
+    rng = np.random.default_rng(seed)
+    with open(fname, 'wb') as fid:
+        fid.write(header)
+        for begin in range(0, n_records, CHUNK_RECORDS):
+            n = min(CHUNK_RECORDS, n_records - begin)
+            signals = rng.integers(-digital_max // 8, digital_max // 8, size=(n, n_channels * n_samps), dtype='<i2')
+            signals = signals.view(np.uint8)
+            if tals is None:
+                fid.write(signals.tobytes())
+                continue
+            for i in range(n):
+                fid.write(signals[i].tobytes())
+                fid.write(tals[begin + i].ljust(2 * samps[-1], b'\x00'))
+    return fname
+
+
+####################################################################################################
+# benchmarks, each one returns the function to time once its imports and inputs are ready.
+# That function returns the metrics of the run, and 'state' for the following stages.
+####################################################################################################
+
+def conversion_data(case, state):
+    return {
+        'modality': 'eeg',
+        'bids_directory': state['bids_directory'],
+        'output_time': 'output-benchmark',
+        'read_only': False,
+        'line_freq': '60',
+        'taskName': 'rest',
+        'participantID': 'BENCH01',
+        'session': 'V01',
+        'workers': case['workers'],
+        'edfData': {'files': [{'path': state['edf_file'], 'name': os.path.basename(state['edf_file'])}]},
+        'eegRuns': [{'edfFile': state['edf_file'], 'eventFile': '', 'annotationsTSV': '', 'annotationsJSON': ''}],
+        'bidsMetadata': {},
+        'age': '30', 'sex': 'F', 'hand': 'R',
+        'site_id': 'BEN', 'project_id': 'BENCH', 'sub_project_id': 'BENCH',
+        'preparedBy': 'benchmark', 'recording_type': 'continuous', 'reference': 'Cz',
+    }
+
+
+def bench_get_edf_data(case, state):
+    from python import eeg2bids
+    responses = []
+    eeg2bids.sio.emit = lambda event, response: responses.append(response)
+    data = {'files': [{'path': state['edf_file'], 'name': os.path.basename(state['edf_file'])}]}
+
+    def run():
+        eeg2bids.get_edf_data(None, data)
+        if 'error' in responses[-1]:
+            raise RuntimeError(responses[-1]['error'])
+        return {'input_bytes': os.path.getsize(state['edf_file'])}
+    return run
+
+
+def bench_edf_reader(case, state):
+    from python.libs import EDF
+
+    def run():
+        reader = EDF.EDFReader(fname=state['edf_file'], mmap=True)
+        meas_info = reader.meas_info
+        n_records = int(meas_info['n_records'])
+        n_samples = 0
+        for begblock in range(0, n_records, CHUNK_RECORDS):
+            endblock = min(begblock + CHUNK_RECORDS, n_records) - 1
+            for ch in range(meas_info['nchan']):
+                n_samples += len(reader.readRecords(ch, begblock, endblock))
+        reader.close()
+        return {'input_bytes': os.path.getsize(state['edf_file']), 'samples': n_samples}
+    return run
+
+
+def bench_edf_writer(case, state):
+    from python.libs import EDF
+    reader = EDF.EDFReader(fname=state['edf_file'], mmap=True)
+    header = (reader.meas_info, reader.chan_info)
+    n_records = int(reader.meas_info['n_records'])
+    chunk = min(CHUNK_RECORDS, n_records)
+    data = [reader.readRecords(ch, 0, chunk - 1) for ch in range(reader.meas_info['nchan'])]
+    reader.close()
+    fname = os.path.join(state['workdir'], 'written.edf')
+
+    def run():
+        writer = EDF.EDFWriter(fname)
+        writer.writeHeader(header)
+        for begblock in range(0, n_records, chunk):
+            n = min(chunk, n_records - begblock)
+            if n == chunk:
+                writer.writeBlocks(data)
+            else:
+                writer.writeBlocks([values[:len(values) // chunk * n] for values in data])
+        writer.close()
+        output_bytes = os.path.getsize(fname)
+        os.remove(fname)
+        return {'output_bytes': output_bytes, 'input_bytes': output_bytes}
+    return run
+
+
+def bench_converter(case, state):
+    from python.libs import iEEG
+    data = conversion_data(case, state)
+
+    def run():
+        iEEG.Converter(data)
+        return {
+            'input_bytes': os.path.getsize(state['edf_file']),
+            'state': {
+                'edf_bids_basename': data['eegRuns'][0]['edfBIDSBasename'],
+                'subject_id': iEEG.Converter.m_info['subject_id'],
+            },
+        }
+    return run
+
+
+def bench_modifier(case, state):
+    from python.libs.Modifier import Modifier
+    data = conversion_data(case, state)
+    data['eegRuns'][0]['edfBIDSBasename'] = state['edf_bids_basename']
+    data['subject_id'] = state['subject_id']
+
+    def run():
+        Modifier(data)
+        return {}
+    return run
+
+
+def bench_validate(case, state):
+    from python.libs import BIDS
+    bids_root = os.path.join(state['bids_directory'], 'output-benchmark')
+
+    def run():
+        # the cold run is the one reported as 'seconds', the warm run reuses its index
+        started = time.perf_counter()
+        validation = BIDS.Validate(bids_root, workers=case['workers'])
+        cold_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        BIDS.Validate(bids_root, workers=case['workers'])
+        return {
+            'files': len(validation.file_paths),
+            'valid_files': sum(bool(result) for result in validation.result),
+            'seconds': cold_seconds,
+            'warm_seconds': time.perf_counter() - started,
+        }
+    return run
+
+
+def bench_tarfile(case, state):
+    from python.libs import iEEG
+    bids_root = os.path.join(state['bids_directory'], 'output-benchmark')
+
+    def run():
+        tar = iEEG.TarFile(bids_root, workers=case['workers'])
+        os.remove(tar.output_filename)
+        return {'input_bytes': tar.input_bytes, 'output_bytes': tar.output_bytes, 'ratio': tar.ratio}
+    return run
+
+
+####################################################################################################
+# runner
+####################################################################################################
+
+def peak_rss():
+    # peak resident set size of this process in bytes, None where the resource module is missing
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_benchmark(name, case, state):
+    # runs in a fresh pool process, with the prints of the stage discarded
+    result = {'benchmark': name}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            run = globals()['bench_' + name](case, state)
+            result['baseline_rss_bytes'] = peak_rss()
+            started = time.perf_counter()
+            metrics = run()
+            result['seconds'] = time.perf_counter() - started
+        result['peak_rss_bytes'] = peak_rss()
+        # a benchmark that times more than its measured operation reports its own 'seconds'
+        result.update(metrics)
+        if result.get('input_bytes') and result['seconds'] > 0:
+            result['throughput_mb_s'] = result['input_bytes'] / result['seconds'] / 1e6
+    except Exception as ex:
+        result['error'] = ''.join(traceback.format_exception_only(type(ex), ex)).strip()
+    return result
+
+
+def run_case(case, benchmarks, directory, repeat=1):
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='case-', dir=directory)
+    state = {
+        'workdir': workdir,
+        'edf_file': os.path.join(workdir, 'synthetic.edf'),
+        'bids_directory': os.path.join(workdir, 'bids'),
+    }
+    os.makedirs(state['bids_directory'])
+    write_synthetic_edf(state['edf_file'], case['format'], case['channels'], case['sfreq'], case['duration'],
+                        case['annotations_per_minute'])
+
+    results = []
+    failed = None
+    context = multiprocessing.get_context('spawn')
+    try:
+        for name in BENCHMARKS:
+            if name not in benchmarks:
+                continue
+            # the conversion stages need the output of the earlier ones
+            if failed and name in PIPELINE:
+                result = dict(case, benchmark=name, error='skipped, ' + failed + ' failed')
+                results.append(result)
+                print(format_result(result))
+                continue
+            # the pipeline stages change the output, so only the reads are repeated
+            n_runs = repeat if name in ('get_edf_data', 'edf_reader', 'edf_writer') else 1
+            runs = []
+            for _ in range(n_runs):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    runs.append(pool.submit(run_benchmark, name, case, state).result())
+            result = min(runs, key=lambda run: run.get('seconds', float('inf')))
+            state.update(result.pop('state', {}))
+            result.update(case, input_file_bytes=os.path.getsize(state['edf_file']), runs=n_runs)
+            results.append(result)
+            print(format_result(result))
+            if 'error' in result and name in PIPELINE:
+                failed = name
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def case_key(result):
+    return tuple(result.get(key) for key in
+                 ('benchmark', 'format', 'channels', 'sfreq', 'duration', 'annotations_per_minute', 'workers'))
+
+
+def format_result(result, previous=None):
+    name = '{benchmark:<13} {format:<4} {channels:>4}ch {sfreq:>5}Hz {duration:>6}s {annotations_per_minute:>4}/min'
+    line = name.format(**result)
+    if 'error' in result:
+        return line + '  error: ' + result['error']
+    line += '  {:9.3f} s'.format(result['seconds'])
+    if 'throughput_mb_s' in result:
+        line += '  {:8.1f} MB/s'.format(result['throughput_mb_s'])
+    if result.get('peak_rss_bytes'):
+        line += '  {:7.1f} MB peak'.format(result['peak_rss_bytes'] / 1e6)
+    if previous and previous.get('seconds'):
+        line += '  x{:.2f}'.format(result['seconds'] / previous['seconds'])
+    return line
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the EEG2BIDS pipeline on synthetic recordings.')
+    parser.add_argument('--formats', nargs='+', default=['edf'], choices=['edf', 'edf+'])
+    parser.add_argument('--channels', nargs='+', type=int, default=[32])
+    parser.add_argument('--sfreq', nargs='+', type=int, default=[256], help='sampling rates in Hz')
+    parser.add_argument('--duration', nargs='+', type=int, default=[60], help='durations in seconds')
+    parser.add_argument('--annotations', nargs='+', type=float, default=[10],
+                        help='annotations per minute, written to EDF+ files only')
+    parser.add_argument('--workers', type=int, default=1, help='workers of the stages that have a pool')
+    parser.add_argument('--benchmarks', nargs='+', default=BENCHMARKS, choices=BENCHMARKS)
+    parser.add_argument('--repeat', type=int, default=1, help='runs of the read-only benchmarks, the best is kept')
+    parser.add_argument('--directory', default=None, help='where the synthetic recordings are written')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file the results are written to')
+    parser.add_argument('--compare', default=None, help='JSON results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as fp:
+            previous = {case_key(result): result for result in json.load(fp)['results']}
+
+    cases = []
+    for fmt, channels, sfreq, duration, annotations in itertools.product(
+            args.formats, args.channels, args.sfreq, args.duration, args.annotations):
+        case = {
+            'format': fmt,
+            'channels': channels,
+            'sfreq': sfreq,
+            'duration': duration,
+            # the annotation density only matters for EDF+
+            'annotations_per_minute': annotations if fmt == 'edf+' else 0,
+            'workers': args.workers,
+        }
+        if case not in cases:
+            cases.append(case)
+
+    results = []
+    for case in cases:
+        results.extend(run_case(case, args.benchmarks, args.directory, args.repeat))
+
+    output = {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.output, 'w') as fp:
+        json.dump(output, fp, indent=4)
+    print('Results written to ' + args.output)
+
+    if previous:
+        print('Compared with ' + args.compare + ':')
+        for result in results:
+            print(format_result(result, previous.get(case_key(result))))
+    return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
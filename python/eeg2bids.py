@@ -9,9 +9,12 @@ from python.libs.iEEG import ReadError, WriteError, metadata as metadata_fields
 from python.libs.Modifier import Modifier
 from python.libs import BIDS
 from python.libs.loris_api import LorisAPI
+from python.libs.Jobs import JobQueue, JobCancelled
 import csv
 import datetime
 import json
+import multiprocessing
+import shutil
 
 # LORIS credentials of user
 lorisCredentials = {
@@ -35,21 +38,27 @@ def connect(sid, environ):
         return False  # extra precaution.
 
 
-def tarfile_bids_thread(bids_directory):
-    iEEG.TarFile(bids_directory)
-    response = {
-        'compression_time': 'example_5mins'
+def tarfile_bids_job(job):
+    # the tree is listed here, in the job thread, rather than on the event loop
+    job.add_files(os.path.join(path, f) for path, dirs, filenames in os.walk(job.data) for f in filenames)
+    tar = iEEG.TarFile(job.data, progress=job.progress)
+    return {
+        'compression_time': tar.compression_time,
+        'input_bytes': tar.input_bytes,
+        'output_bytes': tar.output_bytes,
+        'ratio': tar.ratio,
+        'output_filename': tar.output_filename,
     }
-    return eventlet.tpool.Proxy(response)
+
+
+# Packaging jobs, emitted as 'job_progress' while running and as 'response' once finished.
+tarfile_jobs = JobQueue(tarfile_bids_job, sio.emit, 'response', name='tarfile')
 
 
 @sio.event
 def tarfile_bids(sid, bids_directory):
-    response = eventlet.tpool.execute(tarfile_bids_thread, bids_directory)
-    send = {
-        'compression_time': response['compression_time']
-    }
-    sio.emit('response', send)
+    job = tarfile_jobs.submit(bids_directory)
+    return {'job_id': job.id}
 
 
 @sio.event
@@ -84,8 +93,9 @@ def set_loris_credentials(sid, data):
             'success': 200,
             'lorisUsername': loris_api.username
         })
-        sio.emit('loris_sites', loris_api.get_sites())
-        sio.emit('loris_projects', loris_api.get_projects())
+        sites, projects = loris_api.get_sites_and_projects()
+        sio.emit('loris_sites', sites)
+        sio.emit('loris_projects', projects)
 
 
 def get_loris_sites(sid):
@@ -158,8 +168,9 @@ def get_edf_data(sid, data):
                 'date': str(date)
             })
 
+        ch_names = set(headers[0]['metadata'][1]['ch_names'])
         for i in range(1, len(headers)):
-            if set(headers[i - 1]['metadata'][1]['ch_names']) != set(headers[i]['metadata'][1]['ch_names']):
+            if ch_names != set(headers[i]['metadata'][1]['ch_names']):
                 msg = 'The files selected contain more than one recording.'
                 print(msg)
                 response = {
@@ -234,7 +245,7 @@ def get_bids_metadata(sid, data):
     sio.emit('bids_metadata', response)
 
 
-def edf_to_bids_thread(data):
+def edf_to_bids_thread(data, progress=None):
     print('data is ')
     print(data)
     error_messages = []
@@ -250,7 +261,7 @@ def edf_to_bids_thread(data):
         data['output_time'] = 'output-' + time.latest_output
 
         try:
-            iEEG.Converter(data)  # EDF to BIDS format.
+            iEEG.Converter(data, progress)  # EDF to BIDS format.
 
             # store subject_id for Modifier
             data['subject_id'] = iEEG.Converter.m_info['subject_id']
@@ -259,6 +270,10 @@ def edf_to_bids_thread(data):
                 'output_time': data['output_time']
             }
             return eventlet.tpool.Proxy(response)
+        except JobCancelled:
+            # a cancelled conversion leaves no partial output behind
+            shutil.rmtree(os.path.join(data['bids_directory'], data['output_time']), ignore_errors=True)
+            raise
         except ReadError as e:
             error_messages.append('Cannot read file - ' + str(e))
         except WriteError as e:
@@ -270,16 +285,46 @@ def edf_to_bids_thread(data):
     return eventlet.tpool.Proxy(response)
 
 
+def edf_to_bids_job(job):
+    response = edf_to_bids_thread(job.data, job.progress)
+    return response.copy()
+
+
+# Conversion jobs, emitted as 'job_progress' while running and as 'bids' once finished.
+conversion_jobs = JobQueue(edf_to_bids_job, sio.emit, 'bids', name='conversion')
+
+
 @sio.event
 def edf_to_bids(sid, data):
     # data = { file_paths: [], bids_directory: '', read_only: false,
     # event_files: '', line_freq: '', site_id: '', project_id: '',
     # sub_project_id: '', session: '', subject_id: ''}
     print('edf_to_bids: ', data)
-    response = eventlet.tpool.execute(edf_to_bids_thread, data)
-    print(response)
-    print('Response received!')
-    sio.emit('bids', response.copy())
+    files = [eegRun['edfFile'] for eegRun in data.get('eegRuns', [])]
+    job = conversion_jobs.submit(data, files)
+    return {'job_id': job.id}
+
+
+@sio.event
+def cancel_job(sid, job_id):
+    return {'cancelled': conversion_jobs.cancel(job_id) or tarfile_jobs.cancel(job_id)}
+
+
+@sio.event
+def get_jobs(sid):
+    sio.emit('jobs', conversion_jobs.get_status() + tarfile_jobs.get_status())
+
+
+@sio.event
+def set_max_jobs(sid, max_jobs):
+    try:
+        max_jobs = int(max_jobs)
+    except (TypeError, ValueError):
+        max_jobs = 0
+    if max_jobs < 1:
+        return {'error': 'The number of concurrent conversions must be a positive integer.'}
+    conversion_jobs.set_max_jobs(max_jobs)
+    return {'max_jobs': conversion_jobs.max_jobs}
 
 
 @sio.event
@@ -290,10 +335,10 @@ def validate_bids(sid, bids_directory):
         error_messages.append('The BIDS output directory is missing.')
 
     if not error_messages:
-        BIDS.Validate(bids_directory)
+        validation = BIDS.Validate(bids_directory)
         response = {
-            'file_paths': BIDS.Validate.file_paths,
-            'result': BIDS.Validate.result
+            'file_paths': validation.file_paths,
+            'result': validation.result
         }
     else:
         response = {
@@ -308,6 +353,8 @@ def disconnect(sid):
 
 
 if __name__ == '__main__':
+    # the converter can run its runs in spawned processes, which must not restart the service
+    multiprocessing.freeze_support()
     eventlet.wsgi.server(
         eventlet.listen(('127.0.0.1', 7301)),
         app,
@@ -1,39 +1,116 @@
+import fnmatch
+import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+import bids_validator
 from bids_validator import BIDSValidator
 
 
+def validate_paths(file_paths):
+    # runs in a pool process for large trees
+    return BIDSValidator().validate_paths(file_paths)
+
+
 class Validate:
-    file_paths = []
-    result = []
+    # trees with more files to (re)validate than this are checked in a process pool
+    pool_threshold = 20000
+    chunk_size = 5000
 
-    def __init__(self, bids_directory):
+    def __init__(self, bids_directory, workers=None):
         print('- Validate: init started.')
-        file_paths = []
-        result = []
-        validator = BIDSValidator()
-        for path, dirs, files in os.walk(bids_directory):
-            for filename in files:
-                if filename == '.bidsignore':
-                    continue
+        bids_directory = bids_directory.rstrip('/\\')
+        self.bids_directory = bids_directory
+        self.index_path = bids_directory + '.validation.json'
+        self.workers = workers
+
+        files = self.scan(bids_directory)
+        index = self.read_index()
+
+        # only new or modified files are validated again
+        pending = [path for path in files if path not in index or index[path][0] != files[path]]
+        for path, result in zip(pending, self.validate(pending)):
+            index[path] = [files[path], result]
+
+        self.file_paths = list(files)
+        self.result = [index[path][1] for path in self.file_paths]
+        self.write_index({path: index[path] for path in self.file_paths})
+
+    def scan(self, bids_directory):
+        # relative file path -> modification time
+        files = {}
+        ignored = self.read_bidsignore(bids_directory)
+        directories = [bids_directory]
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                        continue
 
-                if filename.endswith('_annotations.tsv'):
-                    continue
+                    filename = entry.name
+                    if filename == '.bidsignore':
+                        continue
 
-                if filename.endswith('_annotations.json'):
-                    continue
+                    if filename.endswith('_annotations.tsv'):
+                        continue
 
-                temp = os.path.join(path, filename)
-                file_paths.append(temp[len(bids_directory):len(temp)])
-                result.append(validator.is_bids(temp[len(bids_directory):len(temp)]))
-                # print(validator.is_bids(temp[len(bids_directory):len(temp)]))
+                    if filename.endswith('_annotations.json'):
+                        continue
 
-        self.set_file_paths(file_paths)
-        self.set_result(result)
+                    file_path = entry.path[len(bids_directory):]
+                    if self.is_ignored(file_path, ignored):
+                        continue
+
+                    files[file_path] = entry.stat().st_mtime_ns
+        return dict(sorted(files.items()))
+
+    @staticmethod
+    def read_bidsignore(bids_directory):
+        # glob patterns of the files the bids-validator skips
+        try:
+            with open(os.path.join(bids_directory, '.bidsignore'), 'r') as fp:
+                lines = fp.read().splitlines()
+        except OSError:
+            return []
+        return [line.strip().lstrip('/') for line in lines if line.strip() and not line.startswith('#')]
+
+    @staticmethod
+    def is_ignored(file_path, patterns):
+        file_path = file_path.replace('\\', '/').lstrip('/')
+        filename = file_path.rsplit('/', 1)[-1]
+        return any(fnmatch.fnmatchcase(filename, pattern) or fnmatch.fnmatchcase(file_path, pattern)
+                   for pattern in patterns)
+
+    def validate(self, file_paths):
+        if len(file_paths) <= self.pool_threshold:
+            return BIDSValidator().validate_paths(file_paths)
+
+        chunks = [file_paths[i:i + self.chunk_size] for i in range(0, len(file_paths), self.chunk_size)]
+        result = []
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for chunk_result in pool.map(validate_paths, chunks):
+                result.extend(chunk_result)
+        return result
 
-    @classmethod
-    def set_file_paths(cls, value):
-        cls.file_paths = value
+    def read_index(self):
+        # the results are dropped when they were computed by another validator version
+        try:
+            with open(self.index_path, 'r') as fp:
+                index = json.load(fp)
+            if index.get('validator') == bids_validator.__version__:
+                return index['files']
+        except (IOError, ValueError, KeyError, AttributeError):
+            pass
+        return {}
 
-    @classmethod
-    def set_result(cls, value):
-        cls.result = value
+    def write_index(self, index):
+        # written to a temporary file first, so that concurrent validations never read a partial index
+        temp_path = self.index_path + '.' + str(os.getpid())
+        try:
+            with open(temp_path, 'w') as fp:
+                json.dump({'validator': bids_validator.__version__, 'files': index}, fp)
+            os.replace(temp_path, self.index_path)
+        except IOError as e:
+            print(e)
+            print('Could not write the validation index')
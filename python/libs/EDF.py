@@ -1,6 +1,5 @@
-from copy import deepcopy
+from copy import copy
 from math import ceil, floor
-from struct import pack, unpack
 # import calendar
 # import datetime
 import numpy as np
@@ -19,6 +18,39 @@ def padtrim(buf, num):
         return buf[0:num]
 
 
+####################################################################################################
+# parsed headers are cached per file, keyed on (path, size, mtime) so that a modified file is
+# parsed again. The cache hands out copies, since callers update meas_info in place.
+####################################################################################################
+
+header_cache = {}
+header_cache_size = 512
+
+
+def headerCacheKey(fname):
+    stat = os.stat(fname)
+    return (os.path.abspath(fname), stat.st_size, stat.st_mtime_ns)
+
+
+def copyHeader(header):
+    meas_info, chan_info = header
+    return (dict(meas_info), {key: copy(value) for key, value in chan_info.items()})
+
+
+def getCachedHeader(fname):
+    header = header_cache.get(headerCacheKey(fname))
+    if header is None:
+        return None
+    return copyHeader(header)
+
+
+def setCachedHeader(fname, header):
+    if len(header_cache) >= header_cache_size:
+        # drop the oldest entry
+        header_cache.pop(next(iter(header_cache)))
+    header_cache[headerCacheKey(fname)] = copyHeader(header)
+
+
 ####################################################################################################
 # the EDF header is represented as a tuple of (meas_info, chan_info)
 # meas_info should have ['record_length', 'magic', 'hour', 'subject_id', 'recording_id', 'n_records', 'month', 'subtype', 'second', 'nchan', 'data_size', 'data_offset', 'lowpass', 'year', 'highpass', 'day', 'minute']
@@ -28,6 +60,7 @@ def padtrim(buf, num):
 class EDFWriter():
     def __init__(self, fname=None):
         self.fname = None
+        self.fid = None
         self.meas_info = None
         self.chan_info = None
         self.calibrate = None
@@ -37,30 +70,18 @@ class EDFWriter():
             self.open(fname)
 
     def open(self, fname):
-        with open(fname, 'wb') as fid:
-            assert (fid.tell() == 0)
+        # the file handle is kept open until close(), all blocks are appended to it
+        self.fid = open(fname, 'wb')
+        assert (self.fid.tell() == 0)
         self.fname = fname
 
     def close(self):
-        # it is still needed to update the number of records in the header
-        # this requires copying the whole file content
-        meas_info = self.meas_info
-        chan_info = self.chan_info
-        # update the n_records value in the file
-        tempname = self.fname + '.bak'
-        os.rename(self.fname, tempname)
-        with open(tempname, 'rb') as fid1:
-            assert (fid1.tell() == 0)
-            with open(self.fname, 'wb') as fid2:
-                assert (fid2.tell() == 0)
-                fid2.write(fid1.read(236))
-                fid1.read(8)  # skip this part
-                fid2.write(padtrim(str(self.n_records), 8).encode('utf-8'))  # but write this instead
-                fid2.write(fid1.read(meas_info['data_offset'] - 236 - 8))
-                blocksize = np.sum(chan_info['n_samps']) * meas_info['data_size']
-                for block in range(self.n_records):
-                    fid2.write(fid1.read(blocksize))
-        os.remove(tempname)
+        # it is still needed to update the number of records in the header,
+        # this is patched in place on byte 236
+        self.fid.seek(236)
+        self.fid.write(padtrim(str(self.n_records), 8).encode('utf-8'))
+        self.fid.close()
+        self.fid = None
         self.fname = None
         self.meas_info = None
         self.chan_info = None
@@ -74,70 +95,70 @@ class EDFWriter():
         chan_info = header[1]
         meas_size = 256
         chan_size = 256 * meas_info['nchan']
-        with open(self.fname, 'wb') as fid:
-            assert (fid.tell() == 0)
-
-            # fill in the missing or incomplete information
-            if not 'subject_id' in meas_info:
-                meas_info['subject_id'] = ''
-            if not 'recording_id' in meas_info:
-                meas_info['recording_id'] = ''
-            if not 'subtype' in meas_info:
-                meas_info['subtype'] = 'edf'
-            nchan = meas_info['nchan']
-            if not 'ch_names' in chan_info or len(chan_info['ch_names']) < nchan:
-                chan_info['ch_names'] = [str(i) for i in range(nchan)]
-            if not 'transducers' in chan_info or len(chan_info['transducers']) < nchan:
-                chan_info['transducers'] = ['' for i in range(nchan)]
-            if not 'units' in chan_info or len(chan_info['units']) < nchan:
-                chan_info['units'] = ['' for i in range(nchan)]
-
-            if meas_info['subtype'] in ('24BIT', 'bdf'):
-                meas_info['data_size'] = 3  # 24-bit (3 byte) integers
-            else:
-                meas_info['data_size'] = 2  # 16-bit (2 byte) integers
-
-            fid.write(padtrim('0', 8).encode('utf-8'))
-            fid.write(padtrim(meas_info['subject_id'], 80).encode('utf-8'))
-            fid.write(padtrim(meas_info['recording_id'], 80).encode('utf-8'))
-            fid.write(
-                padtrim('{:0>2d}.{:0>2d}.{:0>2d}'.format(meas_info['day'], meas_info['month'], meas_info['year']), 8)
-                .encode('utf-8'))
-            fid.write(
-                padtrim('{:0>2d}.{:0>2d}.{:0>2d}'.format(meas_info['hour'], meas_info['minute'], meas_info['second']),
-                        8).encode('utf-8'))
-            fid.write(padtrim(str(meas_size + chan_size), 8).encode('utf-8'))
-            fid.write((' ' * 44).encode('utf-8'))
-            fid.write(padtrim(str(-1), 8).encode('utf-8'))  # the final n_records should be inserted on byte 236
-            fid.write(padtrim(str(meas_info['record_length']), 8).encode('utf-8'))
-            fid.write(padtrim(str(meas_info['nchan']), 4).encode('utf-8'))
-
-            # ensure that these are all np arrays rather than lists
-            for key in ['physical_min', 'transducers', 'physical_max', 'digital_max', 'ch_names', 'n_samps', 'units',
-                        'digital_min']:
-                chan_info[key] = np.asarray(chan_info[key])
-
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(chan_info['ch_names'][i], 16).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(chan_info['transducers'][i], 80).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(chan_info['units'][i], 8).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(str(chan_info['physical_min'][i]), 8).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(str(chan_info['physical_max'][i]), 8).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(str(chan_info['digital_min'][i]), 8).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(str(chan_info['digital_max'][i]), 8).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write((' ' * 80).encode('utf-8'))  # prefiltering
-            for i in range(meas_info['nchan']):
-                fid.write(padtrim(str(chan_info['n_samps'][i]), 8).encode('utf-8'))
-            for i in range(meas_info['nchan']):
-                fid.write((' ' * 32).encode('utf-8'))  # reserved
-            meas_info['data_offset'] = fid.tell()
+        fid = self.fid
+        fid.seek(0)
+
+        # fill in the missing or incomplete information
+        if not 'subject_id' in meas_info:
+            meas_info['subject_id'] = ''
+        if not 'recording_id' in meas_info:
+            meas_info['recording_id'] = ''
+        if not 'subtype' in meas_info:
+            meas_info['subtype'] = 'edf'
+        nchan = meas_info['nchan']
+        if not 'ch_names' in chan_info or len(chan_info['ch_names']) < nchan:
+            chan_info['ch_names'] = [str(i) for i in range(nchan)]
+        if not 'transducers' in chan_info or len(chan_info['transducers']) < nchan:
+            chan_info['transducers'] = ['' for i in range(nchan)]
+        if not 'units' in chan_info or len(chan_info['units']) < nchan:
+            chan_info['units'] = ['' for i in range(nchan)]
+
+        if meas_info['subtype'] in ('24BIT', 'bdf'):
+            meas_info['data_size'] = 3  # 24-bit (3 byte) integers
+        else:
+            meas_info['data_size'] = 2  # 16-bit (2 byte) integers
+
+        fid.write(padtrim('0', 8).encode('utf-8'))
+        fid.write(padtrim(meas_info['subject_id'], 80).encode('utf-8'))
+        fid.write(padtrim(meas_info['recording_id'], 80).encode('utf-8'))
+        fid.write(
+            padtrim('{:0>2d}.{:0>2d}.{:0>2d}'.format(meas_info['day'], meas_info['month'], meas_info['year']), 8)
+            .encode('utf-8'))
+        fid.write(
+            padtrim('{:0>2d}.{:0>2d}.{:0>2d}'.format(meas_info['hour'], meas_info['minute'], meas_info['second']),
+                    8).encode('utf-8'))
+        fid.write(padtrim(str(meas_size + chan_size), 8).encode('utf-8'))
+        fid.write((' ' * 44).encode('utf-8'))
+        fid.write(padtrim(str(-1), 8).encode('utf-8'))  # the final n_records should be inserted on byte 236
+        fid.write(padtrim(str(meas_info['record_length']), 8).encode('utf-8'))
+        fid.write(padtrim(str(meas_info['nchan']), 4).encode('utf-8'))
+
+        # ensure that these are all np arrays rather than lists
+        for key in ['physical_min', 'transducers', 'physical_max', 'digital_max', 'ch_names', 'n_samps', 'units',
+                    'digital_min']:
+            chan_info[key] = np.asarray(chan_info[key])
+
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(chan_info['ch_names'][i], 16).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(chan_info['transducers'][i], 80).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(chan_info['units'][i], 8).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(str(chan_info['physical_min'][i]), 8).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(str(chan_info['physical_max'][i]), 8).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(str(chan_info['digital_min'][i]), 8).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(str(chan_info['digital_max'][i]), 8).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write((' ' * 80).encode('utf-8'))  # prefiltering
+        for i in range(meas_info['nchan']):
+            fid.write(padtrim(str(chan_info['n_samps'][i]), 8).encode('utf-8'))
+        for i in range(meas_info['nchan']):
+            fid.write((' ' * 32).encode('utf-8'))  # reserved
+        meas_info['data_offset'] = fid.tell()
 
         self.meas_info = meas_info
         self.chan_info = chan_info
@@ -151,38 +172,55 @@ class EDFWriter():
                 self.offset[ch] = 0;
 
     def writeBlock(self, data):
+        self.writeBlocks(data)
+
+    def writeBlocks(self, data):
+        # data contains one array per channel, holding the samples of one or more consecutive blocks
         meas_info = self.meas_info
         chan_info = self.chan_info
-        with open(self.fname, 'ab') as fid:
-            assert (fid.tell() > 0)
-            for i in range(meas_info['nchan']):
-                raw = deepcopy(data[i])
-
-                assert (len(raw) == chan_info['n_samps'][i])
-                if min(raw) < chan_info['physical_min'][i]:
-                    warnings.warn('Value exceeds physical_min: ' + str(min(raw)));
-                if max(raw) > chan_info['physical_max'][i]:
-                    warnings.warn('Value exceeds physical_max: ' + str(max(raw)));
-
-                raw -= self.offset[i]  # FIXME I am not sure about the order of calibrate and offset
-                raw /= self.calibrate[i]
-
-                raw = np.asarray(raw, dtype=np.int16)
-                buf = [pack('h', x) for x in raw]
-                for val in buf:
-                    fid.write(val)
-            self.n_records += 1
+        n_samps = chan_info['n_samps'].astype(np.int64)
+        n_blocks = len(data[0]) // n_samps[0]
+        offsets = np.concatenate(([0], np.cumsum(n_samps)))
+        if meas_info['data_size'] == 3:
+            dtype = '<i4'
+        else:
+            dtype = '<i2'
+        block = np.empty((n_blocks, offsets[-1]), dtype=dtype)
+        for i in range(meas_info['nchan']):
+            raw = np.asarray(data[i], dtype=np.float64)
+
+            assert (len(raw) == n_blocks * n_samps[i])
+            if raw.min() < chan_info['physical_min'][i]:
+                warnings.warn('Value exceeds physical_min: ' + str(raw.min()));
+            if raw.max() > chan_info['physical_max'][i]:
+                warnings.warn('Value exceeds physical_max: ' + str(raw.max()));
+
+            raw = raw - self.offset[i]  # FIXME I am not sure about the order of calibrate and offset
+            raw /= self.calibrate[i]
+            np.clip(np.rint(raw), chan_info['digital_min'][i], chan_info['digital_max'][i], out=raw)
+            block[:, offsets[i]:offsets[i + 1]] = raw.reshape(n_blocks, n_samps[i])
+
+        if meas_info['data_size'] == 3:
+            # keep the 3 least significant bytes of each little-endian 32-bit integer
+            buf = block.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+        else:
+            buf = block.tobytes()
+        self.fid.write(buf)
+        self.n_records += n_blocks
 
 
 ####################################################################################################
 
 class EDFReader():
-    def __init__(self, fname=None):
+    def __init__(self, fname=None, mmap=False):
         self.fname = None
         self.meas_info = None
         self.chan_info = None
         self.calibrate = None
         self.offset = None
+        self.mmap = mmap
+        self.records = None
+        self.chan_offsets = None
         if fname:
             self.open(fname)
 
@@ -191,6 +229,8 @@ class EDFReader():
             assert (fid.tell() == 0)
         self.fname = fname
         self.readHeader()
+        if self.mmap:
+            self.openRecords()
         return self.meas_info, self.chan_info
 
     def close(self):
@@ -199,8 +239,47 @@ class EDFReader():
         self.chan_info = None
         self.calibrate = None
         self.offset = None
+        self.records = None
+        self.chan_offsets = None
+
+    def openRecords(self):
+        # view the whole data section as a (n_records, sum(n_samps) * data_size) byte array,
+        # the channels are then sliced out of each record with the precomputed offsets
+        meas_info = self.meas_info
+        chan_info = self.chan_info
+        data_size = meas_info['data_size']
+        recordsize = int(np.sum(chan_info['n_samps'])) * data_size
+        n_records = int(meas_info['n_records'])
+        self.chan_offsets = np.concatenate(([0], np.cumsum(chan_info['n_samps']))).astype(np.int64)
+        if n_records == 0:
+            self.records = np.zeros((0, recordsize), dtype=np.uint8)
+        else:
+            self.records = np.memmap(self.fname, dtype=np.uint8, mode='r', offset=meas_info['data_offset'],
+                                     shape=(n_records, recordsize))
+        return self.records
 
     def readHeader(self):
+        # the parsed header is cached per (path, size, mtime), see getCachedHeader
+        header = getCachedHeader(self.fname)
+        if header is None:
+            header = self.parseHeader()
+            setCachedHeader(self.fname, header)
+        meas_info, chan_info = header
+        channels = list(range(meas_info['nchan']))
+
+        self.calibrate = (chan_info['physical_max'] - chan_info['physical_min']) / (
+                chan_info['digital_max'] - chan_info['digital_min']);
+        self.offset = chan_info['physical_min'] - self.calibrate * chan_info['digital_min'];
+        for ch in channels:
+            if self.calibrate[ch] < 0:
+                self.calibrate[ch] = 1;
+                self.offset[ch] = 0;
+
+        self.meas_info = meas_info
+        self.chan_info = chan_info
+        return (meas_info, chan_info)
+
+    def parseHeader(self):
         # the following is copied over from MNE-Python and subsequently modified
         # to more closely reflect the native EDF standard
         meas_info = {}
@@ -208,12 +287,19 @@ class EDFReader():
         with open(self.fname, 'rb') as fid:
             assert (fid.tell() == 0)
 
-            meas_info['magic'] = fid.read(8).strip().decode()
-            meas_info['subject_id'] = fid.read(80).strip().decode()  # subject id
-            meas_info['recording_id'] = fid.read(80).strip().decode()  # recording id
+            # the fixed part of the header holds the size of the complete header,
+            # the channel part is then read at once and decoded per field
+            buf = fid.read(256)
+            header_nbytes = int(buf[184:192].decode())
+            buf += fid.read(header_nbytes - 256)
+            assert len(buf) == header_nbytes
+
+            meas_info['magic'] = buf[0:8].strip().decode()
+            meas_info['subject_id'] = buf[8:88].strip().decode()  # subject id
+            meas_info['recording_id'] = buf[88:168].strip().decode()  # recording id
 
-            day, month, year = [int(x) for x in re.findall('(\d+)', fid.read(8).decode())]
-            hour, minute, second = [int(x) for x in re.findall('(\d+)', fid.read(8).decode())]
+            day, month, year = [int(x) for x in re.findall('(\d+)', buf[168:176].decode())]
+            hour, minute, second = [int(x) for x in re.findall('(\d+)', buf[176:184].decode())]
             meas_info['day'] = day
             meas_info['month'] = month
             meas_info['year'] = year
@@ -223,9 +309,9 @@ class EDFReader():
             # date = datetime.datetime(year + 2000, month, day, hour, minute, sec)
             # meas_info['meas_date'] = calendar.timegm(date.utctimetuple())
 
-            meas_info['data_offset'] = header_nbytes = int(fid.read(8).decode())
+            meas_info['data_offset'] = header_nbytes
 
-            subtype = fid.read(44).strip().decode()[:5]
+            subtype = buf[192:236].strip().decode()[:5]
             if len(subtype) > 0:
                 meas_info['subtype'] = subtype
             else:
@@ -236,28 +322,37 @@ class EDFReader():
             else:
                 meas_info['data_size'] = 2  # 16-bit (2 byte) integers
 
-            meas_info['n_records'] = n_records = int(fid.read(8).decode())
+            meas_info['n_records'] = n_records = int(buf[236:244].decode())
 
             # record length in seconds
-            record_length = float(fid.read(8).decode())
+            record_length = float(buf[244:252].decode())
             if record_length == 0:
                 meas_info['record_length'] = record_length = 1.
                 warnings.warn('Headermeas_information is incorrect for record length. '
                               'Default record length set to 1.')
             else:
                 meas_info['record_length'] = record_length
-            meas_info['nchan'] = nchan = int(fid.read(4).decode())
-
-            channels = list(range(nchan))
-            chan_info['ch_names'] = [fid.read(16).strip().decode() for ch in channels]
-            chan_info['transducers'] = [fid.read(80).strip().decode() for ch in channels]
-            chan_info['units'] = [fid.read(8).strip().decode() for ch in channels]
-            chan_info['physical_min'] = physical_min = np.array([float(fid.read(8).decode()) for ch in channels])
-            chan_info['physical_max'] = physical_max = np.array([float(fid.read(8).decode()) for ch in channels])
-            chan_info['digital_min'] = digital_min = np.array([float(fid.read(8).decode()) for ch in channels])
-            chan_info['digital_max'] = digital_max = np.array([float(fid.read(8).decode()) for ch in channels])
-
-            prefiltering = [fid.read(80).strip().decode() for ch in channels][:-1]
+            meas_info['nchan'] = nchan = int(buf[252:256].decode())
+
+            # every channel field is stored as nchan consecutive fixed-width ascii strings
+            fields = {}
+            offset = 256
+            for key, width in [('ch_names', 16), ('transducers', 80), ('units', 8), ('physical_min', 8),
+                               ('physical_max', 8), ('digital_min', 8), ('digital_max', 8),
+                               ('prefiltering', 80), ('n_samps', 8), ('reserved', 32)]:
+                fields[key] = np.frombuffer(buf, dtype='S' + str(width), count=nchan, offset=offset)
+                offset += width * nchan
+            assert offset == header_nbytes
+
+            chan_info['ch_names'] = [x.strip().decode() for x in fields['ch_names']]
+            chan_info['transducers'] = [x.strip().decode() for x in fields['transducers']]
+            chan_info['units'] = [x.strip().decode() for x in fields['units']]
+            chan_info['physical_min'] = fields['physical_min'].astype(np.float64)
+            chan_info['physical_max'] = fields['physical_max'].astype(np.float64)
+            chan_info['digital_min'] = fields['digital_min'].astype(np.float64)
+            chan_info['digital_max'] = fields['digital_max'].astype(np.float64)
+
+            prefiltering = [x.strip().decode() for x in fields['prefiltering']][:-1]
             highpass = np.ravel([re.findall('HP:\s+(\w+)', filt) for filt in prefiltering])
             lowpass = np.ravel([re.findall('LP:\s+(\w+)', filt) for filt in prefiltering])
             high_pass_default = 0.
@@ -287,43 +382,58 @@ class EDFReader():
                 warnings.warn('%s' % ('Channels contain different lowpass filters.'
                                       ' Lowest filter setting will be stored.'))
             # number of samples per record
-            chan_info['n_samps'] = n_samps = np.array([int(fid.read(8).decode()) for ch in channels])
-
-            fid.read(32 * meas_info['nchan']).decode()  # reserved
-            assert fid.tell() == header_nbytes
+            chan_info['n_samps'] = n_samps = fields['n_samps'].astype(np.int64)
 
             if meas_info['n_records'] == -1:
                 # this happens if the n_records is not updated at the end of recording
                 tot_samps = (os.path.getsize(self.fname) - meas_info['data_offset']) / meas_info['data_size']
                 meas_info['n_records'] = tot_samps / sum(n_samps)
 
-        self.calibrate = (chan_info['physical_max'] - chan_info['physical_min']) / (
-                chan_info['digital_max'] - chan_info['digital_min']);
-        self.offset = chan_info['physical_min'] - self.calibrate * chan_info['digital_min'];
-        for ch in channels:
-            if self.calibrate[ch] < 0:
-                self.calibrate[ch] = 1;
-                self.offset[ch] = 0;
-
-        self.meas_info = meas_info
-        self.chan_info = chan_info
         return (meas_info, chan_info)
 
+    def decodeSamples(self, buf):
+        # convert little-endian 16-bit (EDF) or 24-bit (BDF) integers to int32, in any array shape
+        buf = np.asarray(buf, dtype=np.uint8)
+        if self.meas_info['data_size'] == 3:
+            buf = buf.reshape(buf.shape[:-1] + (-1, 3)).astype(np.int32)
+            raw = buf[..., 0] | (buf[..., 1] << 8) | (buf[..., 2] << 16)
+            return (raw ^ 0x800000) - 0x800000
+        return np.ascontiguousarray(buf).view('<i2').astype(np.int32)
+
+    def readRecords(self, channel, begblock, endblock):
+        # read the samples of one channel for the blocks begblock up to and including endblock
+        data_size = self.meas_info['data_size']
+        if self.records is None:
+            self.openRecords()
+        begbyte = self.chan_offsets[channel] * data_size
+        endbyte = self.chan_offsets[channel + 1] * data_size
+        raw = self.decodeSamples(self.records[begblock:endblock + 1, begbyte:endbyte]).ravel()
+        data = raw.astype(np.float32)
+        data *= self.calibrate[channel]
+        data += self.offset[channel]  # FIXME I am not sure about the order of calibrate and offset
+        return data
+
     def readBlock(self, block):
         assert (block >= 0)
         meas_info = self.meas_info
         chan_info = self.chan_info
+        if self.mmap:
+            return [self.readRecords(i, block, block) for i in range(meas_info['nchan'])]
         data = []
         with open(self.fname, 'rb') as fid:
             assert (fid.tell() == 0)
             blocksize = np.sum(chan_info['n_samps']) * meas_info['data_size']
             fid.seek(meas_info['data_offset'] + block * blocksize)
-            for i in range(meas_info['nchan']):
-                buf = fid.read(chan_info['n_samps'][i] * meas_info['data_size'])
-                raw = np.asarray(unpack('<{}h'.format(chan_info['n_samps'][i]), buf), dtype=np.float32)
-                raw *= self.calibrate[i]
-                raw += self.offset[i]  # FIXME I am not sure about the order of calibrate and offset
-                data.append(raw)
+            buf = np.frombuffer(fid.read(blocksize), dtype=np.uint8)
+        raw = self.decodeSamples(buf)
+        begsample = 0
+        for i in range(meas_info['nchan']):
+            endsample = begsample + chan_info['n_samps'][i]
+            chan = raw[begsample:endsample].astype(np.float32)
+            chan *= self.calibrate[i]
+            chan += self.offset[i]  # FIXME I am not sure about the order of calibrate and offset
+            data.append(chan)
+            begsample = endsample
         return data
 
     def readSamples(self, channel, begsample, endsample):
@@ -332,9 +442,10 @@ class EDFReader():
         n_samps = chan_info['n_samps'][channel]
         begblock = int(floor((begsample) / n_samps))
         endblock = int(floor((endsample) / n_samps))
-        data = self.readBlock(begblock)[channel]
-        for block in range(begblock + 1, endblock + 1):
-            data = np.append(data, self.readBlock(block)[channel])
+        if self.mmap:
+            data = self.readRecords(channel, begblock, endblock)
+        else:
+            data = np.concatenate([self.readBlock(block)[channel] for block in range(begblock, endblock + 1)])
         begsample -= begblock * n_samps
         endsample -= begblock * n_samps
         return data[begsample:(endsample + 1)]
@@ -359,7 +470,7 @@ class EDFReader():
 
     def readSignal(self, chanindx):
         begsample = 0;
-        endsample = self.chan_info['n_samps'][chanindx] * self.meas_info['n_records'] - 1;
+        endsample = int(self.chan_info['n_samps'][chanindx] * self.meas_info['n_records']) - 1;
         return self.readSamples(chanindx, begsample, endsample)
 
 ####################################################################################################
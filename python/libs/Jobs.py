@@ -0,0 +1,180 @@
+import itertools
+import os
+import queue
+import threading
+import time
+import eventlet
+from eventlet import tpool
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled"""
+    pass
+
+
+# Job - one queued conversion, updated from the worker thread.
+class Job:
+    def __init__(self, job_queue, job_id, data, total_bytes=0, total_runs=0):
+        self.job_queue = job_queue
+        self.id = job_id
+        self.data = data
+        self.status = 'queued'
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self.total_runs = total_runs
+        self.done_runs = 0
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.cancel_event = threading.Event()
+
+    def add_files(self, files):
+        # adds the input files to the totals the progress is measured against
+        for file in files:
+            try:
+                self.total_bytes += os.path.getsize(file)
+            except OSError:
+                pass
+            self.total_runs += 1
+
+    def progress(self, n_runs, n_bytes):
+        # called from the tpool thread while the runs are copied and once each one is done
+        self.done_runs += n_runs
+        self.done_bytes += n_bytes
+        self.job_queue.events.put(self)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled('Job ' + self.id + ' was cancelled.')
+
+    def get_status(self):
+        elapsed = 0
+        throughput = 0
+        eta = None
+        if self.started:
+            elapsed = (self.finished or time.time()) - self.started
+            if elapsed > 0:
+                throughput = self.done_bytes / elapsed
+            if throughput > 0:
+                eta = max(0, self.total_bytes - self.done_bytes) / throughput
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'done_runs': self.done_runs,
+            'total_runs': self.total_runs,
+            'done_bytes': self.done_bytes,
+            'total_bytes': self.total_bytes,
+            'elapsed': elapsed,
+            'throughput': throughput,
+            'eta': eta,
+        }
+
+
+# JobQueue - runs queued jobs in tpool threads, at most max_jobs at a time.
+#
+# target(job) runs in a native thread, reports through job.progress(n_runs, n_bytes) and
+# returns the response that is emitted as result_event. Status changes are collected in a
+# thread-safe queue and emitted as 'job_progress' from a green thread, since socket.io must
+# not be called from the tpool threads.
+class JobQueue:
+    # number of finished jobs whose status is kept for get_status
+    max_finished = 50
+
+    def __init__(self, target, emit, result_event, max_jobs=1, name='job'):
+        self.name = name
+        self.target = target
+        self.emit = emit
+        self.result_event = result_event
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self.queued = []
+        self.running = 0
+        self.events = queue.Queue()
+        self.counter = itertools.count(1)
+        self.pump = None
+
+    def submit(self, data, files=()):
+        job_id = self.name + '-' + str(next(self.counter))
+        job = Job(self, job_id, data)
+        job.add_files(files)
+        self.jobs[job_id] = job
+        self.queued.append(job)
+        self.notify(job)
+        self.schedule()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.status not in ('queued', 'running'):
+            return False
+
+        job.cancel_event.set()
+        if job in self.queued:
+            self.queued.remove(job)
+            job.status = 'cancelled'
+            job.result = {'error': ['The conversion was cancelled.']}
+            self.notify(job)
+            self.prune()
+        return True
+
+    def set_max_jobs(self, max_jobs):
+        self.max_jobs = max(1, int(max_jobs))
+        self.schedule()
+
+    def get_status(self):
+        return [job.get_status() for job in self.jobs.values()]
+
+    def schedule(self):
+        while self.queued and self.running < self.max_jobs:
+            job = self.queued.pop(0)
+            self.running += 1
+            eventlet.spawn(self.run, job)
+
+    def run(self, job):
+        job.status = 'running'
+        job.started = time.time()
+        self.notify(job)
+        try:
+            job.result = tpool.execute(self.target, job)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+            job.result = {'error': ['The conversion was cancelled.']}
+        except Exception as e:
+            print(e)
+            job.status = 'failed'
+            job.result = {'error': [str(e)]}
+        job.finished = time.time()
+        self.running -= 1
+        self.notify(job)
+        self.prune()
+        self.schedule()
+
+    def prune(self):
+        # forget the oldest finished jobs, the running and queued ones are always kept
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ('done', 'failed', 'cancelled')]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def notify(self, job):
+        self.events.put(job)
+        if self.pump is None:
+            self.pump = eventlet.spawn(self.emit_events)
+
+    def emit_events(self):
+        while True:
+            pending = {}
+            while not self.events.empty():
+                job = self.events.get_nowait()
+                pending[job.id] = job
+            for job in pending.values():
+                self.emit('job_progress', job.get_status())
+                if job.status in ('done', 'failed', 'cancelled') and job.result is not None:
+                    self.emit(self.result_event, dict(job.result, job_id=job.id))
+                    job.result = None
+            if not self.running and self.events.empty():
+                self.pump = None
+                return
+            eventlet.sleep(0.5)
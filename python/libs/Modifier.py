@@ -1,10 +1,143 @@
 import os
+import io
 import csv
 import json
 import re
 import shutil
+import numpy as np
 from python.libs.iEEG import metadata as metadata_fields
 
+events_tsv_headers = ['onset', 'duration', 'trial_type', 'value', 'sample']
+
+
+def read_events_tsv(path):
+    # returns the rows of an events.tsv as an (n_events, 5) object array of strings. Rows with
+    # only onset, duration and trial_type get 'n/a' as value and sample, other rows are dropped.
+    with open(path, mode='r', newline='') as tsv_file:
+        tsv_file.readline()
+        text = tsv_file.read()
+
+    quoted = '"' in text
+    if quoted:
+        # quoted fields may contain tabs or newlines, leave them to the csv module
+        lines = list(csv.reader(io.StringIO(text), delimiter='\t'))
+        n_fields = np.fromiter(map(len, lines), dtype=int, count=len(lines))
+    else:
+        lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        if not lines[-1]:
+            lines.pop()
+        n_fields = np.fromiter((line.count('\t') + 1 for line in lines), dtype=int, count=len(lines))
+
+    events = np.empty((len(lines), len(events_tsv_headers)), dtype=object)
+    for width in (5, 3):
+        selected = np.flatnonzero(n_fields == width)
+        if not len(selected):
+            continue
+        if quoted:
+            fields = [field for i in selected for field in lines[i]]
+        else:
+            # the fields of all rows with the same width are split at once
+            fields = '\t'.join([lines[i] for i in selected]).split('\t')
+        events[selected, :width] = np.array(fields, dtype=object).reshape(-1, width)
+        events[selected, width:] = 'n/a'
+
+    valid = (n_fields == 5) | (n_fields == 3)
+    n_skipped = len(valid) - np.count_nonzero(valid)
+    if n_skipped:
+        print('error: ValueError, ' + str(n_skipped) + ' rows skipped in ' + path)
+    return events[valid]
+
+
+# Sidecars - the sidecar files of one conversion, staged in memory.
+#
+# Every file is read at most once, edited in place and written exactly once by flush(),
+# through a temporary file and os.replace. Directory listings are cached and follow the
+# staged removals and renames, which are applied on flush() as well.
+class Sidecars:
+    def __init__(self):
+        self.documents = {}
+        self.dirty = set()
+        self.listings = {}
+        self.removed = []
+        self.renamed = []
+
+    def listdir(self, directory):
+        if directory not in self.listings:
+            self.listings[directory] = sorted(os.listdir(directory))
+        return list(self.listings[directory])
+
+    def load_json(self, path):
+        # returns the parsed document, changes to it are written on flush()
+        if path not in self.documents:
+            with open(path, mode='r', encoding='utf-8') as fp:
+                self.documents[path] = json.load(fp)
+        self.dirty.add(path)
+        return self.documents[path]
+
+    def load_tsv(self, path):
+        # returns the rows, without the header line
+        if path not in self.documents:
+            with open(path, mode='r', newline='') as tsv_file:
+                reader = csv.reader(tsv_file, delimiter='\t')
+                self.documents[path] = list(reader)[1:]
+        return self.documents[path]
+
+    def set_tsv(self, path, headers, rows):
+        self.documents[path] = [headers] + rows
+        self.dirty.add(path)
+
+    def set_text(self, path, text):
+        self.documents[path] = text
+        self.dirty.add(path)
+
+    def remove(self, path, missing_ok=False):
+        directory, filename = os.path.split(path)
+        listing = self.listings.get(directory)
+        if listing is not None and filename in listing:
+            listing.remove(filename)
+        self.documents.pop(path, None)
+        self.dirty.discard(path)
+        self.removed.append((path, missing_ok))
+
+    def rename(self, source, destination):
+        directory, filename = os.path.split(source)
+        listing = self.listings.get(directory)
+        if listing is not None and filename in listing:
+            listing.remove(filename)
+            listing.append(os.path.basename(destination))
+            listing.sort()
+        self.renamed.append((source, destination))
+
+    def flush(self):
+        for path, missing_ok in self.removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                if not missing_ok:
+                    raise
+                print('No ' + os.path.basename(path) + ' file found')
+
+        for source, destination in self.renamed:
+            os.replace(source, destination)
+
+        for path in sorted(self.dirty):
+            document = self.documents[path]
+            temp_path = path + '.' + str(os.getpid())
+            with open(temp_path, mode='w', newline='', encoding='utf-8') as fp:
+                if isinstance(document, str):
+                    fp.write(document)
+                elif path.endswith('.tsv'):
+                    writer = csv.writer(fp, delimiter='\t')
+                    writer.writerows(document)
+                else:
+                    json.dump(document, fp, indent=4)
+            os.replace(temp_path, path)
+
+        self.removed = []
+        self.renamed = []
+        self.dirty = set()
+
+
 class Modifier:
     def __init__(self, data):
         self.data = data
@@ -12,6 +145,7 @@ class Modifier:
 
         print('- Modifier: init started.')
 
+        self.sidecars = Sidecars()
         self.modify_dataset_description_json()
         self.modify_participants_tsv()
         self.modify_participants_json()
@@ -19,6 +153,7 @@ class Modifier:
         self.copy_event_files()
         self.copy_annotation_files()
         self.modify_eeg_json()
+        self.sidecars.flush()
 
 
     def get_bids_root_path(self):
@@ -48,10 +183,10 @@ class Modifier:
     def clean_dataset_files(self):
         if len(self.data['edfData']['files']) > 0:
             # for multiple run recording, clean the duplicate _channels.tsv
-            channels_files = [f for f in os.listdir(self.get_eeg_path()) if f.endswith('_channels.tsv')]
+            channels_files = [f for f in self.sidecars.listdir(self.get_eeg_path()) if f.endswith('_channels.tsv')]
             for i in range(1, len(channels_files)):
                 filename = os.path.join(self.get_eeg_path(), channels_files[i])
-                os.remove(filename)
+                self.sidecars.remove(filename)
 
             # remove the run suffix in the file names
             fileOrig = os.path.join(self.get_eeg_path(), channels_files[0])
@@ -59,14 +194,11 @@ class Modifier:
                 self.get_eeg_path(),
                 re.sub(r"_run-[0-9]+", '', channels_files[0])
             )
-            os.rename(fileOrig, fileDest)
+            self.sidecars.rename(fileOrig, fileDest)
 
         # remove the mne citations README
         filename = os.path.join(self.get_bids_root_path(), 'README')
-        try:
-            os.remove(filename)
-        except FileNotFoundError:
-            print("No README file found")
+        self.sidecars.remove(filename, missing_ok=True)
 
 
     def modify_dataset_description_json(self):
@@ -87,17 +219,12 @@ class Modifier:
         )
 
         try:
-            with open(file_path, "r") as fp:
-                file_data = json.load(fp)
-                file_data['PreparedBy'] = self.data['preparedBy']
-                file_data['Eeg2bidsVersion'] = appVersion
-                file_data['Name'] = self.data['participantID'] + '_' + self.data['session']
-
-                with open(file_path, "w") as fp:
-                    json.dump(file_data, fp, indent=4)
-
+            file_data = self.sidecars.load_json(file_path)
+            file_data['PreparedBy'] = self.data['preparedBy']
+            file_data['Eeg2bidsVersion'] = appVersion
+            file_data['Name'] = self.data['participantID'] + '_' + self.data['session']
         except IOError:
-            print("Could not read or write dataset_description.json file")
+            print("Could not read dataset_description.json file")
 
 
     def modify_participants_tsv(self):
@@ -106,11 +233,7 @@ class Modifier:
             'participants.tsv'
         )
 
-        with open(file_path, mode='r') as tsv_file:
-            tsv_file.readline()
-            reader = csv.reader(tsv_file, delimiter='\t')
-            rows = list(reader)
-            tsv_file.close()
+        rows = self.sidecars.load_tsv(file_path)
 
         # participants.tsv data collected:
         output = []
@@ -145,12 +268,8 @@ class Modifier:
                 except ValueError:
                     print('error: ValueError')
 
-        with open(file_path, mode='w', newline='') as tsv_file:
-            headers = ['participant_id', 'age', 'sex', 'hand', 'site', 'subproject', 'project']
-            writer = csv.writer(tsv_file, delimiter='\t')
-            writer.writerow(headers)
-            writer.writerows(output)
-            tsv_file.close()
+        headers = ['participant_id', 'age', 'sex', 'hand', 'site', 'subproject', 'project']
+        self.sidecars.set_tsv(file_path, headers, output)
 
 
     def modify_participants_json(self):
@@ -159,23 +278,19 @@ class Modifier:
             'participants.json'
         )
 
-        with open(file_path, mode='r+', encoding='utf-8') as json_file:
-            json_data = json.load(json_file)
-            user_data = {
-                'site': {
-                    'Description': "Site of the testing"
-                },
-                'subproject': {
-                    'Description': "Subproject of the participant"
-                },
-                'project': {
-                    'Description': "Project of the participant"
-                }
+        json_data = self.sidecars.load_json(file_path)
+        user_data = {
+            'site': {
+                'Description': "Site of the testing"
+            },
+            'subproject': {
+                'Description': "Subproject of the participant"
+            },
+            'project': {
+                'Description': "Project of the participant"
             }
-            json_data.update(user_data)
-            json_file.seek(0)
-            json.dump(json_data, json_file, indent=4)
-            json_file.close()
+        }
+        json_data.update(user_data)
 
 
     def copy_annotation_files(self):
@@ -184,10 +299,7 @@ class Modifier:
             '.bidsignore'
         )
 
-        with open(file, mode='w', newline='') as bidsignore:
-            bidsignore.write('*_annotations.json\n')
-            bidsignore.write('*_annotations.tsv\n')
-            bidsignore.close()
+        self.sidecars.set_text(file, '*_annotations.json\n*_annotations.tsv\nchecksums.sha256\n')
 
         for eegRun in self.data.get('eegRuns'):
             edf_file = eegRun['edfBIDSBasename']
@@ -224,102 +336,47 @@ class Modifier:
 
     def copy_event_files(self):
         for eegRun in self.data.get('eegRuns'):
-            edf_file = eegRun['edfBIDSBasename']
-            filename = os.path.join(self.get_eeg_path(), edf_file + '_annotations')
-
             if eegRun['eventFile']:
-                # events.tsv data collected:
-                output = []
-
-                # Open user supplied events.tsv and grab data.
-                with open(eegRun['eventFile'], mode='r', newline='') as tsv_file:
-                    tsv_file.readline()
-                    reader = csv.reader(tsv_file, delimiter='\t')
-                    rows = list(reader)
-                    tsv_file.close()
-
-                for line in rows:
-                    try:
-                        onset, duration, trial_type, value, sample = line
-                        output.append([onset, duration, trial_type, value, sample])
-                    except ValueError:
-                        try:
-                            onset, duration, trial_type = line
-                            output.append([onset, duration, trial_type, 'n/a', 'n/a'])
-                        except ValueError:
-                            print('error: ValueError')
-
-                path_event_files = ''
-                # We search for the events.tsv file.
-                for path, dirs, files in os.walk(self.get_eeg_path()):
-                    for filename in files:
-                        temp = os.path.join(path, filename)
-                        if temp.endswith(eegRun['edfBIDSBasename'] + '_events.tsv'):
-                            path_event_files = temp
-
-                # We now open BIDS events.tsv file if it exists
-                if path_event_files:
-                    try:
-                        with open(path_event_files, mode='r', newline='') as tsv_file:
-                            tsv_file.readline()
-                            reader = csv.reader(tsv_file, delimiter='\t')
-                            rows = list(reader)
-                            tsv_file.close()
-
-                        for line in rows:
-                            try:
-                                onset, duration, trial_type, value, sample = line
-                                output.append([onset, duration, trial_type, value, sample])
-                            except ValueError:
-                                try:
-                                    onset, duration, trial_type = line
-                                    output.append([onset, duration, trial_type, 'n/a', 'n/a'])
-                                except ValueError:
-                                    print('error: ValueError')
-                    except:
-                        print('No events.tsv found in the BIDS folder.')
+                # user supplied events first, so that they come first among events with the same onset
+                events = [read_events_tsv(eegRun['eventFile'])]
+
+                # the BIDS events.tsv written by mne_bids, if any
+                path_event_files = os.path.join(self.get_eeg_path(), eegRun['edfBIDSBasename'] + '_events.tsv')
+                if os.path.isfile(path_event_files):
+                    events.append(read_events_tsv(path_event_files))
                 else:
-                    path_event_files = self.get_eeg_path() + '/' + eegRun['edfBIDSBasename'] + '_events.tsv'
+                    print('No events.tsv found in the BIDS folder.')
 
-                # output is an array of arrays
-                # sort by first element in array
-                output.sort(key=lambda x: float(x[0]))
+                # stable sort on the onsets, which merges the already sorted runs of rows
+                events = np.concatenate(events)
+                order = np.argsort(events[:, 0].astype(float), kind='stable')
 
-                # overwrite BIDS events.tsv with collected data.
-                with open(path_event_files, mode='a+', newline='') as tsv_file:
-                    headers = ['onset', 'duration', 'trial_type', 'value', 'sample']
-                    writer = csv.writer(tsv_file, delimiter='\t')
-                    writer.writerow(headers)
-                    writer.writerows(output)
-                    tsv_file.close()
+                # overwrite BIDS events.tsv with collected data, written on flush()
+                self.sidecars.set_tsv(path_event_files, events_tsv_headers, events[order].tolist())
 
 
     def modify_eeg_json(self):
-        eeg_jsons = [f for f in os.listdir(self.get_eeg_path()) if f.endswith('eeg.json')]
+        eeg_jsons = [f for f in self.sidecars.listdir(self.get_eeg_path()) if f.endswith('eeg.json')]
 
         for eeg_json in eeg_jsons:
             file_path = os.path.join(self.get_eeg_path(), eeg_json)
 
             try:
-                with open(file_path, "r") as fp:
-                    file_data = json.load(fp)
-                    file_data["RecordingType"] = self.data['recording_type']
-
-                    if (self.data["modality"] == 'ieeg'):
-                        referenceField = 'iEEGReference'
-                    else:
-                        referenceField = 'EGGReference'
+                file_data = self.sidecars.load_json(file_path)
+                file_data["RecordingType"] = self.data['recording_type']
 
-                    file_data[referenceField] = " ".join(self.data['reference'].split())
+                if (self.data["modality"] == 'ieeg'):
+                    referenceField = 'iEEGReference'
+                else:
+                    referenceField = 'EGGReference'
 
-                    if 'metadata' in self.data['bidsMetadata'] and 'ignored_keys' in self.data['bidsMetadata']:
-                        for key in self.data['bidsMetadata']['metadata']:
-                            if key not in self.data['bidsMetadata']['ignored_keys']:
-                                file_data[key] = self.data['bidsMetadata']['metadata'][key]
+                file_data[referenceField] = " ".join(self.data['reference'].split())
 
-                    with open(file_path, "w") as fp:
-                        json.dump(file_data, fp, indent=4)
+                if 'metadata' in self.data['bidsMetadata'] and 'ignored_keys' in self.data['bidsMetadata']:
+                    for key in self.data['bidsMetadata']['metadata']:
+                        if key not in self.data['bidsMetadata']['ignored_keys']:
+                            file_data[key] = self.data['bidsMetadata']['metadata'][key]
 
             except IOError as e:
                 print(e)
-                print("Could not read or write eeg.json file")
+                print("Could not read eeg.json file")
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# build.sh ships the mne, mne_bids and bids_validator packages vendored in this directory, and the
+# converter relies on changes made to them. Load them ahead of any installed copy, so that the
+# dev server (start-server.sh) runs the same code as the build.
+libs_directory = os.path.dirname(os.path.abspath(__file__))
+if libs_directory not in sys.path:
+    sys.path.insert(0, libs_directory)
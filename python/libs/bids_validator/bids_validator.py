@@ -2,6 +2,12 @@
 import re
 import os
 import json
+from functools import lru_cache
+
+COMBINED_RULES = ['top_level_rules.json', 'associated_data_rules.json',
+                  'subject_level_rules.json', 'phenotypic_rules.json',
+                  'file_level_rules.json']
+SESSION_RULES = 'session_level_rules.json'
 
 
 class BIDSValidator():
@@ -74,67 +80,62 @@ class BIDSValidator():
 
         return (any(conditions))
 
-    def is_top_level(self, path):
-        """Check if the file has appropriate name for a top-level file."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'top_level_rules.json')
+    def validate_paths(self, paths):
+        """Check a batch of file paths.
 
-        conditions = [False if re.compile(x).search(path) is None else True for
-                      x in regexps]
+        Parameters
+        ----------
+        paths : iterable of str
+            Paths of the files to be checked, relative to the root of a BIDS
+            dataset (see `is_bids()`).
 
-        return (any(conditions))
+        Returns
+        -------
+        list of bool
+            Whether each path adheres to BIDS, in the order of `paths`.
+
+        """
+        return [self.is_bids(path) for path in paths]
+
+    def is_top_level(self, path):
+        """Check if the file has appropriate name for a top-level file."""
+        return self._rules['top_level_rules.json'].search(path) is not None
 
     def is_associated_data(self, path):
         """Check if file is appropriate associated data."""
         if not self.index_associated:
             return False
 
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'associated_data_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
-
-        return any(conditions)
+        return self._rules['associated_data_rules.json'].search(path) is not None
 
     def is_session_level(self, path):
         """Check if the file has appropriate name for a session level."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'session_level_rules.json')
-
-        conditions = [self.conditional_match(x, path) for x in regexps]
+        conditions = [self.conditional_match(x, path) for x in
+                      self._session_rules]
 
         return (any(conditions))
 
     def is_subject_level(self, path):
         """Check if the file has appropriate name for a subject level."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'subject_level_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
-
-        return (any(conditions))
+        return self._rules['subject_level_rules.json'].search(path) is not None
 
     def is_phenotypic(self, path):
         """Check if file is phenotypic data."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'phenotypic_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
-
-        return (any(conditions))
+        return self._rules['phenotypic_rules.json'].search(path) is not None
 
     def is_file(self, path):
         """Check if file is phenotypic data."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'file_level_rules.json')
+        return self._rules['file_level_rules.json'].search(path) is not None
 
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
+    @property
+    def _rules(self):
+        """Combined pattern of each rule set, compiled once per process."""
+        return _compile_rules(self.dir_rules)[0]
 
-        return (any(conditions))
+    @property
+    def _session_rules(self):
+        """Compiled session level patterns, which are matched one by one."""
+        return _compile_rules(self.dir_rules)[1]
 
     def get_regular_expressions(self, file_name):
         """Read regular expressions from a file."""
@@ -170,3 +171,58 @@ class BIDSValidator():
                 return False
         else:
             return False
+
+
+def _name_groups(regexp, prefix):
+    """Turn the capture groups and backreferences of a rule into named ones.
+
+    This keeps the backreferences of a rule (e.g. ``\\1`` for the subject)
+    pointing to the right group once several rules are joined into one
+    alternation.
+    """
+    out = []
+    n_groups = 0
+    in_class = False
+    i = 0
+    while i < len(regexp):
+        char = regexp[i]
+        if char == '\\' and i + 1 < len(regexp):
+            nxt = regexp[i + 1]
+            if not in_class and nxt.isdigit() and nxt != '0':
+                out.append('(?P=%s%s)' % (prefix, nxt))
+            else:
+                out.append(regexp[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(' and not regexp.startswith('(?', i):
+            n_groups += 1
+            char = '(?P<%s%d>' % (prefix, n_groups)
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+@lru_cache(maxsize=None)
+def _compile_rules(dir_rules):
+    """Load and compile all rule sets of a rules directory.
+
+    Returns a dict with one combined pattern per rule file and the list of
+    compiled session level patterns, which need their own groups for
+    `BIDSValidator.conditional_match()`.
+    """
+    validator = BIDSValidator.__new__(BIDSValidator)
+    combined = {}
+    for file_name in COMBINED_RULES:
+        regexps = validator.get_regular_expressions(dir_rules + file_name)
+        combined[file_name] = re.compile('|'.join(
+            '(?:%s)' % _name_groups(regexp, 'r%d_' % i)
+            for i, regexp in enumerate(regexps)))
+
+    session_rules = [re.compile(regexp) for regexp in
+                     validator.get_regular_expressions(dir_rules +
+                                                       SESSION_RULES)]
+    return combined, session_rules
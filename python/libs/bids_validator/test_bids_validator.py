@@ -52,3 +52,18 @@ def test_is_bids(fname):
     """Test that is_bids returns true for each file in a valid BIDS dataset."""
     validator = BIDSValidator()
     assert validator.is_bids(fname)
+
+
+def test_validate_paths():
+    """Test that validate_paths agrees with is_bids for each path."""
+    validator = BIDSValidator()
+    paths = ['/sub-01/anat/sub-01_rec-CSD_T1w.nii.gz',
+             '/sub-01/anat/sub-01_acq-23_rec-CSD_T1w.exe',
+             '/sub-01/anat/sub-02_T1w.nii.gz',  # subject mismatch
+             '/sub-01/ses-1/anat/sub-01_ses-1_T1w.nii.gz',
+             '/sub-01/ses-1/anat/sub-01_ses-2_T1w.nii.gz',  # session mismatch
+             'home/username/my_dataset/participants.tsv',
+             '/participants.tsv'] + files
+    results = validator.validate_paths(paths)
+    assert results[:7] == [True, False, False, True, False, False, True]
+    assert results == [validator.is_bids(path) for path in paths]
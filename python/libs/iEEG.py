@@ -2,6 +2,7 @@ import os
 import mne
 from python.libs import EDF
 from mne_bids import write_raw_bids, BIDSPath
+from mne_bids.copyfiles import CHECKSUMS_FNAME, _read_checksums, _update_checksums
 
 
 class ReadError(PermissionError):
@@ -89,13 +90,115 @@ metadata = {
 }
 
 
+# GzipWriter - file object compressing blocks of the written data in parallel.
+#
+# Each block becomes its own gzip member. Concatenated members form a valid gzip file
+# (as written by pigz), which tar, gzip and tarfile read like any other .tar.gz.
+class GzipWriter:
+    def __init__(self, fileobj, level=6, block_size=4 * 1024 * 1024, workers=None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        # zlib releases the GIL while compressing, so threads run on all cores
+        workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_pending = 2 * workers
+        self.pending = []
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def set_level(self, level):
+        # the blocks already buffered are compressed with the previous level
+        if level != self.level:
+            self.flush_block()
+            self.level = level
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            block = bytes(self.buffer[:self.block_size])
+            del self.buffer[:self.block_size]
+            self.submit(block)
+        return len(data)
+
+    def submit(self, block):
+        import gzip
+        self.bytes_in += len(block)
+        self.pending.append(self.pool.submit(gzip.compress, block, self.level, mtime=0))
+        while len(self.pending) > self.max_pending:
+            self.write_member()
+
+    def write_member(self):
+        member = self.pending.pop(0).result()
+        self.fileobj.write(member)
+        self.bytes_out += len(member)
+
+    def flush_block(self):
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def close(self):
+        self.flush_block()
+        while self.pending:
+            self.write_member()
+        self.pool.shutdown()
+
+    def abort(self):
+        # drops the blocks not written yet, when the archive is abandoned
+        self.pending = []
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
 # TarFile - tarfile the BIDS data.
 class TarFile:
-    def __init__(self, bids_directory):
+    # payloads that are already compressed are stored without compression
+    stored_extensions = ('.gz', '.zip', '.bz2', '.xz', '.7z', '.png', '.jpg', '.jpeg', '.mp4')
+
+    # progress(n_files, n_bytes) is called after every archived file.
+    def __init__(self, bids_directory, level=6, workers=None, store_compressed=True, progress=None):
         import tarfile
+        import time
+        started = time.time()
         output_filename = bids_directory + '.tar.gz'
-        with tarfile.open(output_filename, "w:gz") as tar:
-            tar.add(bids_directory, arcname=os.path.basename(bids_directory))
+        arcroot = os.path.basename(bids_directory)
+
+        writer = None
+        try:
+            with open(output_filename, 'wb') as fileobj:
+                writer = GzipWriter(fileobj, level=level, workers=workers)
+                with tarfile.open(fileobj=writer, mode='w|') as tar:
+                    tar.add(bids_directory, arcname=arcroot, recursive=False)
+                    for path, dirs, files in os.walk(bids_directory):
+                        dirs.sort()
+                        for name in dirs + sorted(files):
+                            file_path = os.path.join(path, name)
+                            arcname = os.path.join(arcroot, os.path.relpath(file_path, bids_directory))
+                            if store_compressed and name.lower().endswith(self.stored_extensions):
+                                writer.set_level(0)
+                            else:
+                                writer.set_level(level)
+                            tar.add(file_path, arcname=arcname, recursive=False)
+                            if progress and name in files:
+                                progress(1, os.path.getsize(file_path))
+                writer.close()
+        except BaseException:
+            # a failed or cancelled archive is removed rather than left truncated
+            if writer is not None:
+                writer.abort()
+            try:
+                os.remove(output_filename)
+            except OSError:
+                pass
+            raise
+
+        self.output_filename = output_filename
+        self.compression_time = time.time() - started
+        self.input_bytes = writer.bytes_in
+        self.output_bytes = writer.bytes_out
+        self.ratio = self.output_bytes / self.input_bytes if self.input_bytes else 0
 
         #import platform
         #import subprocess
@@ -117,10 +220,9 @@ class Anonymize:
         self.file_path = file_path
 
         try:
-            # read EDF file from file_path,
+            # read the header of the EDF file from file_path (cached per file).
             file_in = EDF.EDFReader(fname=self.file_path)
-            # read header of EDF file.
-            self.header = file_in.readHeader()
+            self.header = (file_in.meas_info, file_in.chan_info)
             file_in.close()
         except PermissionError as ex:
             raise ReadError(ex)
@@ -131,16 +233,19 @@ class Anonymize:
     def set_header(self, key, value):
         self.header[0][key] = value
 
-    def make_copy(self, new_file):
+    def make_copy(self, new_file, chunk_size=64):
+        # copy chunk_size data records at a time
         header = self.get_header()
-        file_in = EDF.EDFReader(fname=self.file_path)
+        file_in = EDF.EDFReader(fname=self.file_path, mmap=True)
         file_out = EDF.EDFWriter()
         file_out.open(new_file)
         file_out.writeHeader(header)
         meas_info = header[0]
-        for i in range(meas_info['n_records']):
-            data = file_in.readBlock(i)
-            file_out.writeBlock(data)
+        n_records = int(meas_info['n_records'])
+        for begblock in range(0, n_records, chunk_size):
+            endblock = min(begblock + chunk_size, n_records) - 1
+            data = [file_in.readRecords(ch, begblock, endblock) for ch in range(meas_info['nchan'])]
+            file_out.writeBlocks(data)
         file_in.close()
         file_out.close()
 
@@ -152,25 +257,148 @@ class Converter:
     # data = { file_path: '', bids_directory: '', read_only: false,
     # event_files: '', line_freq: '', site_id: '', project_id: '',
     # sub_project_id: '', session: '', subject_id: ''}
-    def __init__(self, data):
+    # progress(n_runs, n_bytes) is called with the runs converted and the bytes copied since its
+    # previous call, while the runs are copied. An exception it raises, e.g. to cancel, stops the
+    # conversion.
+    # data['workers'] is the number of runs converted at once, os.cpu_count() by default.
+    def __init__(self, data, progress=None):
         print('- Converter: init started.')
         modality = 'seeg'
         if data['modality'] == 'eeg':
             modality = 'eeg'
 
+        # with data['conversion_cache'], converted data files are cached below the BIDS directory
+        # and copied into the new output when a rerun only changes the metadata
+        cache_directory = None
+        if data.get('conversion_cache', False):
+            cache_directory = os.path.join(data['bids_directory'], '.conversion-cache')
+
+        runs = []
         for i, eegRun in enumerate(data['eegRuns']):
-            eegRun['edfBIDSBasename'] = self.to_bids(
-                eeg_run=eegRun,
-                ch_type=modality,
-                task=data['taskName'],
-                bids_directory=data['bids_directory'],
-                subject_id=data['participantID'],
-                session=data['session'],
-                run=((i + 1) if len(data['edfData']['files']) > 1 else None),
-                output_time=data['output_time'],
-                read_only=data['read_only'],
-                line_freq=data['line_freq']
-            )
+            runs.append({
+                'eeg_run': eegRun,
+                'ch_type': modality,
+                'task': data['taskName'],
+                'bids_directory': data['bids_directory'],
+                'subject_id': data['participantID'],
+                'session': data['session'],
+                'run': ((i + 1) if len(data['edfData']['files']) > 1 else None),
+                'output_time': data['output_time'],
+                'read_only': data['read_only'],
+                'line_freq': data['line_freq'],
+                'cache_directory': cache_directory
+            })
+
+        # the runs are converted in a process pool, with one worker per CPU unless
+        # data['workers'] says otherwise
+        workers = min(int(data.get('workers') or os.cpu_count() or 1), len(runs))
+        if workers > 1 and not data['read_only']:
+            basenames = self.to_bids_parallel(runs, workers, progress)
+        else:
+            basenames = []
+            for run in runs:
+                basenames.append(self.to_bids(**run, progress=progress)[0])
+                if progress:
+                    # the data files of read-only runs are not copied
+                    progress(1, os.path.getsize(run['eeg_run']['edfFile']) if run['read_only'] else 0)
+
+        for eegRun, basename in zip(data['eegRuns'], basenames):
+            eegRun['edfBIDSBasename'] = basename
+
+    def to_bids_parallel(self, runs, workers, progress=None):
+        # every run is written by a worker into its own staging dataset next to the output
+        # directory, so that the shared top-level files (participants.tsv, dataset_description.json,
+        # scans.tsv) are never written concurrently. They are merged here once all runs are done.
+        # The staging directory is outside of the output, so that it can never end up validated
+        # or archived with it.
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        import multiprocessing
+        import queue
+        import shutil
+        import tempfile
+
+        bids_root = os.path.join(runs[0]['bids_directory'], runs[0]['output_time'])
+        os.makedirs(bids_root, exist_ok=True)
+        staging_directory = tempfile.mkdtemp(prefix='.' + runs[0]['output_time'] + '-staging-',
+                                             dir=runs[0]['bids_directory'])
+        try:
+            staged_runs = []
+            for i, run in enumerate(runs):
+                staged_runs.append(dict(run, bids_directory=staging_directory, output_time='run-' + str(i)))
+
+            results = [None] * len(staged_runs)
+            context = multiprocessing.get_context('spawn')
+            with context.Manager() as manager, \
+                    ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                # the workers put the bytes they copy in updates, and stop copying once cancel is set
+                updates = manager.Queue()
+                cancel = manager.Event()
+                futures = {pool.submit(_to_bids_worker, run, updates, cancel): i
+                           for i, run in enumerate(staged_runs)}
+                pending = set(futures)
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                        n_bytes = 0
+                        while True:
+                            try:
+                                n_bytes += updates.get_nowait()
+                            except queue.Empty:
+                                break
+                        for future in done:
+                            results[futures[future]] = future.result()
+                        # called even without news, so that a cancellation is seen
+                        if progress:
+                            progress(len(done), n_bytes)
+                except BaseException:
+                    # stop the running and queued runs, e.g. when the progress callback cancels
+                    # the conversion
+                    cancel.set()
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+
+            for staged_run, (basename, m_info) in zip(staged_runs, results):
+                if m_info is not None:
+                    self.set_m_info(m_info)
+                self.merge_staged_run(
+                    os.path.join(staged_run['bids_directory'], staged_run['output_time']),
+                    bids_root
+                )
+        finally:
+            shutil.rmtree(staging_directory, ignore_errors=True)
+        return [basename for basename, m_info in results]
+
+    @staticmethod
+    def merge_staged_run(staging_root, bids_root):
+        import csv
+
+        for path, dirs, files in os.walk(staging_root):
+            relative_path = os.path.relpath(path, staging_root)
+            os.makedirs(os.path.join(bids_root, relative_path), exist_ok=True)
+            for filename in files:
+                src = os.path.join(path, filename)
+                dest = os.path.join(bids_root, relative_path, filename)
+                if filename.endswith('_scans.tsv') and os.path.exists(dest):
+                    # add the rows of the run to the session scans.tsv, which stays sorted on
+                    # the file name as when mne_bids writes it
+                    rows = {}
+                    for fname in (dest, src):
+                        with open(fname, mode='r', encoding='utf-8-sig', newline='') as tsv_file:
+                            reader = csv.reader(tsv_file, delimiter='\t')
+                            header = next(reader)
+                            rows.update((row[0], row) for row in reader if row)
+                    with open(dest, mode='w', encoding='utf-8-sig', newline='') as tsv_file:
+                        writer = csv.writer(tsv_file, delimiter='\t', lineterminator='\n')
+                        writer.writerow(header)
+                        writer.writerows(rows[key] for key in sorted(rows))
+                elif filename == CHECKSUMS_FNAME and os.path.exists(dest):
+                    # add the checksums of the run to the dataset manifest
+                    _update_checksums(bids_root, _read_checksums(src))
+                elif relative_path == os.curdir and os.path.exists(dest):
+                    # the top-level files are identical for every run of a session
+                    continue
+                else:
+                    os.replace(src, dest)
 
     @staticmethod
     def validate(path):
@@ -184,6 +412,8 @@ class Converter:
     def set_m_info(cls, value):
         cls.m_info = value
 
+    # returns the basename of the converted run (True if read_only) and the header info.
+    # progress(n_runs, n_bytes) is called while the data file is copied, see Converter.
     def to_bids(self,
                 eeg_run,
                 bids_directory,
@@ -194,22 +424,26 @@ class Converter:
                 run=None,
                 ch_type='seeg',
                 read_only=False,
-                line_freq='n/a'):
+                line_freq='n/a',
+                cache_directory=None,
+                progress=None):
         file = eeg_run['edfFile']
 
         if self.validate(file):
             try:
+                # the header is parsed once here and reused for the anonymized copy
                 reader = EDF.EDFReader(fname=file)
             except PermissionError as ex:
                 raise ReadError(ex)
 
-            m_info, c_info = reader.open(fname=file)
+            m_info, c_info = reader.meas_info, reader.chan_info
+            reader.close()
             self.set_m_info(m_info)
 
-            raw = mne.io.read_raw_edf(input_fname=file)
-
             if read_only:
-                return True
+                return True, m_info
+
+            raw = mne.io.read_raw_edf(input_fname=file)
 
             ch_types = {}
             for ch in raw.ch_names:
@@ -250,6 +484,16 @@ class Converter:
                 'verbose': None
             }
 
+            # the errors of progress, e.g. a cancellation, stop the conversion
+            progress_errors = []
+
+            def copy_progress(n_bytes):
+                try:
+                    progress(0, n_bytes)
+                except BaseException as ex:
+                    progress_errors.append(ex)
+                    raise
+
             try:
                 os.makedirs(bids_directory + os.path.sep + output_time, exist_ok=True)
                 bids_directory = bids_directory + os.path.sep + output_time
@@ -259,25 +503,45 @@ class Converter:
                 bids_basename.update(session=session)
 
                 try:
-                    write_raw_bids(raw, bids_basename, overwrite=False, verbose=False)
-                    with open(bids_basename, 'r+b') as f:
-                        f.seek(8)  # id_info field starts 8 bytes in
-                        f.write(bytes("X X X X".ljust(80), 'ascii'))
+                    # the subject field is scrubbed while the file is copied and checksummed
+                    write_raw_bids(raw, bids_basename, overwrite=False, verbose=False,
+                                   edf_header={'id_info': 'X X X X'}, edf_cache_dir=cache_directory,
+                                   edf_progress=copy_progress if progress else None)
                 except Exception as ex:
+                    if progress_errors:
+                        raise
                     print('Exception ex:')
                     print(ex)
 
                 print('finished')
 
-                return bids_basename.basename
+                return bids_basename.basename, m_info
 
             except PermissionError as ex:
+                if progress_errors:
+                    raise
                 raise WriteError(ex)
 
             except Exception as ex:
+                if progress_errors:
+                    raise
                 print(ex)
+            return None, m_info
         else:
             print('File not found or is not file: %s', file)
+            return None, None
+
+
+def _to_bids_worker(run, updates, cancel):
+    # runs in a pool process: convert one run and report its basename and header info. The bytes
+    # copied are put in the updates queue, and the copy stops once the cancel event is set.
+    def progress(n_runs, n_bytes):
+        if cancel.is_set():
+            raise RuntimeError('The conversion was cancelled.')
+        updates.put(n_bytes)
+
+    converter = Converter.__new__(Converter)
+    return converter.to_bids(**run, progress=progress)
 
 
 # Time - used for generating BIDS 'output' directory
@@ -1,6 +1,11 @@
 import json
+import threading
+import time
 import requests
 import urllib
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class LorisAPI:
@@ -9,14 +14,65 @@ class LorisAPI:
     password = ''
     token = ''
 
+    # cache_ttl: seconds a project, subproject, site or visit lookup is reused
+    def __init__(self, cache_ttl=300, retries=3, verify=False):
+        self.cache_ttl = cache_ttl
+        self.verify = verify
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+
+        # one pooled keep-alive session for every request, idempotent requests are retried
+        retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(['GET', 'PUT']))
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(max_retries=retry, pool_maxsize=10))
+        self.session.mount('https://', HTTPAdapter(max_retries=retry, pool_maxsize=10))
+
+    def get_headers(self):
+        return {'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'}
+
+    def get_cached(self, endpoint):
+        # GET the endpoint, reusing the decoded response for cache_ttl seconds
+        key = (self.url, self.token, endpoint)
+        with self.cache_lock:
+            cached = self.cache.get(key)
+        if cached and cached[0] > time.time():
+            return cached[1]
+
+        resp = self.session.get(
+            url=self.url + endpoint,
+            headers=self.get_headers(),
+            verify=self.verify
+        )
+        print(resp)
+        json_resp = json.loads(resp.content.decode('ascii'))
+        if resp.ok:
+            with self.cache_lock:
+                self.cache[key] = (time.time() + self.cache_ttl, json_resp)
+        return json_resp
+
+    def invalidate_cache(self):
+        with self.cache_lock:
+            self.cache.clear()
+
+    def fetch_concurrently(self, *lookups):
+        # run independent lookups (callables without arguments) at the same time
+        with ThreadPoolExecutor(max_workers=len(lookups)) as pool:
+            futures = [pool.submit(lookup) for lookup in lookups]
+            return [future.result() for future in futures]
+
+    def get_sites_and_projects(self):
+        return self.fetch_concurrently(self.get_sites, self.get_projects)
+
     def login(self):
-        resp = requests.post(
+        self.invalidate_cache()
+        resp = self.session.post(
             url=self.url + 'login',
             json={
                 'username': self.username,
                 'password': self.password
             },
-            verify=False
+            verify=self.verify
         )
 
         print(resp)
@@ -37,25 +93,13 @@ class LorisAPI:
 
     def get_projects(self):
         print('get_projects has ran')
-        resp = requests.get(
-            url=self.url + 'projects',
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
-            verify=False
-        )
-
-        json_resp = json.loads(resp.content.decode('ascii'))
+        json_resp = self.get_cached('projects')
         return json_resp.get('Projects')
 
     def get_all_subprojects(self):
         print('get_all_subprojects has ran')
-        resp = requests.get(
-            url=self.url + 'subprojects',
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
-            verify=False
-        )
         print('getting subprojects')
-        print(resp)
-        json_resp = json.loads(resp.content.decode('ascii'))
+        json_resp = self.get_cached('subprojects')
         return json_resp.get('Subprojects')
 
     def get_subprojects(self, project):
@@ -66,50 +110,24 @@ class LorisAPI:
 
     def get_visits(self, subproject):
         print('get_visits has ran')
-        print('get_visits look here:')
-        resp = requests.get(
-            url=self.url + 'subprojects/' + urllib.parse.quote(subproject),
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
-            verify=False
-        )
-
-        print(resp)
-        json_resp = json.loads(resp.content.decode('ascii'))
-        print(json_resp)
+        json_resp = self.get_cached('subprojects/' + urllib.parse.quote(subproject))
         return json_resp.get('Visits')
 
     def get_sites(self):
         print('get_sites has ran')
-        resp = requests.get(
-            url=self.url + 'sites',
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
-            verify=False
-        )
-
-        print(resp)
-
-        json_resp = json.loads(resp.content.decode('ascii'))
-        print (json_resp)
+        json_resp = self.get_cached('sites')
         sites = json_resp.get('Sites')
         return sites
 
     def get_project(self, project):
         print('get_project has ran')
-        resp = requests.get(
-            url=self.url + 'projects/' + urllib.parse.quote(project),
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
-            verify=False
-        )
-
-        print(resp)
-        json_resp = json.loads(resp.content.decode('ascii'))
-        return json_resp
+        return self.get_cached('projects/' + urllib.parse.quote(project))
 
     def get_visit(self, candid, visit, site, subproject, project):
         print('get_visit has ran')
-        resp = requests.get(
+        resp = self.session.get(
             url=self.url + '/candidates/' + str(candid) + '/' + urllib.parse.quote(visit),
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
+            headers=self.get_headers(),
             data=json.dumps({
                 "Meta": {
                     "CandID": candid,
@@ -119,7 +137,7 @@ class LorisAPI:
                     "Project": project
                 }
             }),
-            verify=False
+            verify=self.verify
         )
 
         print(visit)
@@ -129,9 +147,9 @@ class LorisAPI:
 
     def start_next_stage(self, candid, visit, site, subproject, project, date):
         print('start_next_stage has ran')
-        resp = requests.patch(
+        resp = self.session.patch(
             url=self.url + '/candidates/' + str(candid) + '/' + urllib.parse.quote(visit),
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
+            headers=self.get_headers(),
             data=json.dumps({
                 "CandID": candid,
                 "Visit": visit,
@@ -145,8 +163,10 @@ class LorisAPI:
                     }
                 }
             }),
-            verify=False
+            verify=self.verify
         )
+        # the visit stages changed
+        self.invalidate_cache()
         print('resp.status_code:')
         print(resp.status_code)
         print('resp.text:')
@@ -154,9 +174,9 @@ class LorisAPI:
 
     def create_candidate(self, project, dob, sex, site):
         print('create_candidate has ran')
-        resp = requests.post(
+        resp = self.session.post(
             url=self.url + '/candidates/',
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
+            headers=self.get_headers(),
             data=json.dumps({
                 "Candidate": {
                     "Project": project,
@@ -165,9 +185,11 @@ class LorisAPI:
                     "Site": site,
                 }
             }),
-            verify=False
+            verify=self.verify
         )
 
+        # the new candidate changes the project and site lookups
+        self.invalidate_cache()
         print(resp)
         json_resp = json.loads(resp.content.decode('ascii'))
         print(json_resp)
@@ -175,9 +197,9 @@ class LorisAPI:
 
     def create_visit(self, candid, visit, site, project, subproject):
         print('create_visit has ran')
-        resp = requests.put(
+        resp = self.session.put(
             url=self.url + '/candidates/' + candid + '/' + visit,
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
+            headers=self.get_headers(),
             data=json.dumps({
                 "CandID": candid,
                 "Visit": visit,
@@ -185,8 +207,10 @@ class LorisAPI:
                 "Battery": subproject,
                 "Project": project
             }),
-            verify=False
+            verify=self.verify
         )
+        # the new visit changes the visit lookups
+        self.invalidate_cache()
         print('resp:')
         print(resp)
         # json_resp = json.loads(resp.content.decode('ascii'))
@@ -194,10 +218,10 @@ class LorisAPI:
 
     def get_candidate(self, candid):
         print('get_candidate has ran')
-        resp = requests.get(
+        resp = self.session.get(
             url=self.url + '/candidates/' + candid,
-            headers={'Authorization': 'Bearer %s' % self.token, 'LORIS-Overwrite': 'overwrite'},
-            verify=False
+            headers=self.get_headers(),
+            verify=self.verify
         )
 
         print(resp)
@@ -43,6 +43,15 @@ def _auto_close(fid):
             pass  # we did our best
 
 
+def _iter_data_chunks(raw, picks, units, out_sfreq, n_per):
+    """Yield (start, data) for n_per data records of out_sfreq samples."""
+    n_chunk = n_per * out_sfreq
+    for start in range(0, raw.n_times, n_chunk):
+        stop = min(start + n_chunk, raw.n_times)
+        yield start, raw.get_data(picks=picks, start=start, stop=stop,
+                                  units=units)
+
+
 def _export_raw(fname, raw, physical_range, add_ch_type):
     """Export Raw objects to EDF files.
 
@@ -60,9 +69,6 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
     digital_max = 32767
     file_type = EDFwriter.EDFLIB_FILETYPE_EDFPLUS
 
-    # load data first
-    raw.load_data()
-
     # remove extra STI channels
     orig_ch_types = raw.get_channel_types()
     drop_chs = []
@@ -116,8 +122,15 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
     linefreq = raw.info['line_freq']
     filter_str_info = f"HP:{highpass}Hz LP:{lowpass}Hz N:{linefreq}Hz"
 
-    # get the entire dataset in uV
-    data = raw.get_data(units=units, picks=ch_names)
+    # the data are never loaded at once, but read in chunks of whole data
+    # records (~10 MB), once for the ranges and once to write them
+    n_blocks = np.ceil(n_times / out_sfreq).astype(int)
+    n_per = max(10 * 1024 * 1024 // (8 * max(n_channels, 1) * out_sfreq), 1)
+    ch_max = np.full(n_channels, -np.inf)
+    ch_min = np.full(n_channels, np.inf)
+    for _, _data in _iter_data_chunks(raw, ch_names, units, out_sfreq, n_per):
+        np.maximum(ch_max, _data.max(axis=-1), out=ch_max)
+        np.minimum(ch_min, _data.min(axis=-1), out=ch_min)
 
     if physical_range == 'auto':
         # get max and min for each channel type data
@@ -126,9 +139,8 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
 
         for _type in np.unique(ch_types):
             _picks = np.nonzero(ch_types == _type)[0]
-            _data = raw.get_data(units=units, picks=_picks)
-            ch_types_phys_max[_type] = _data.max()
-            ch_types_phys_min[_type] = _data.min()
+            ch_types_phys_max[_type] = ch_max[_picks].max()
+            ch_types_phys_min[_type] = ch_min[_picks].min()
     else:
         # get the physical min and max of the data in uV
         # Physical ranges of the data in uV is usually set by the manufacturer
@@ -141,11 +153,11 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
         pmin, pmax = physical_range[0], physical_range[1]
 
         # check that physical min and max is not exceeded
-        if data.max() > pmax:
-            raise RuntimeError(f'The maximum μV of the data {data.max()} is '
+        if ch_max.max() > pmax:
+            raise RuntimeError(f'The maximum μV of the data {ch_max.max()} is '
                                f'more than the physical max passed in {pmax}.')
-        if data.min() < pmin:
-            raise RuntimeError(f'The minimum μV of the data {data.min()} is '
+        if ch_min.min() < pmin:
+            raise RuntimeError(f'The minimum μV of the data {ch_min.min()} is '
                                f'less than the physical min passed in {pmin}.')
 
     # create instance of EDF Writer
@@ -224,9 +236,6 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
         if data_record_duration is not None:
             _try_to_set_value(hdl, 'DataRecordDuration', data_record_duration)
 
-        # compute number of data records to loop over
-        n_blocks = np.ceil(n_times / out_sfreq).astype(int)
-
         # increase the number of annotation signals if necessary
         annots = raw.annotations
         if annots is not None:
@@ -237,35 +246,33 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
             if n_annot_chans > 1:
                 hdl.setNumberOfAnnotationSignals(n_annot_chans)
 
-        # Write each data record sequentially
-        for idx in range(n_blocks):
-            end_samp = (idx + 1) * out_sfreq
-            if end_samp > n_times:
-                end_samp = n_times
-            start_samp = idx * out_sfreq
-
-            # then for each datarecord write each channel
-            for jdx in range(n_channels):
-                # create a buffer with sampling rate
-                buf = np.zeros(out_sfreq, np.float64, "C")
-
-                # get channel data for this block
-                ch_data = data[jdx, start_samp:end_samp]
-
-                # assign channel data to the buffer and write to EDF
-                buf[:len(ch_data)] = ch_data
-                err = hdl.writeSamples(buf)
-                if err != 0:
-                    raise RuntimeError(
-                        f"writeSamples() for channel{ch_names[jdx]} "
-                        f"returned error: {err}")
-
-            # there was an incomplete datarecord
-            if len(ch_data) != len(buf):
-                warn(f'EDF format requires equal-length data blocks, '
-                     f'so {(len(buf) - len(ch_data)) / sfreq} seconds of '
-                     'zeros were appended to all channels when writing the '
-                     'final block.')
+        # Write the data records sequentially, n_per records at a time.
+        # EDFlib takes one record of one channel per call, which are passed
+        # as views into the same buffer.
+        buf = np.zeros((n_channels, n_per * out_sfreq), np.float64, "C")
+        for _, ch_data in _iter_data_chunks(raw, ch_names, units, out_sfreq,
+                                            n_per):
+            n_samp = ch_data.shape[1]
+            buf[:, :n_samp] = ch_data
+            # zeros are appended to an incomplete final data record
+            n_read = -(-n_samp // out_sfreq)
+            buf[:, n_samp:n_read * out_sfreq] = 0.
+            for rdx in range(n_read):
+                record = slice(rdx * out_sfreq, (rdx + 1) * out_sfreq)
+                for jdx in range(n_channels):
+                    err = hdl.writeSamples(buf[jdx, record])
+                    if err != 0:
+                        raise RuntimeError(
+                            f"writeSamples() for channel{ch_names[jdx]} "
+                            f"returned error: {err}")
+
+        # there was an incomplete datarecord
+        n_pad = n_blocks * out_sfreq - n_times
+        if n_pad:
+            warn(f'EDF format requires equal-length data blocks, '
+                 f'so {n_pad / sfreq} seconds of '
+                 'zeros were appended to all channels when writing the '
+                 'final block.')
 
         # write annotations
         if annots is not None:
@@ -142,6 +142,28 @@ def test_export_edf_annotations(tmp_path):
                        raw_read.annotations.description)
 
 
+@pytest.mark.skipif(not _check_edflib_installed(strict=False),
+                    reason='edflib-python not installed')
+def test_export_edf_no_preload(tmp_path):
+    """Test exporting EDF without loading the data."""
+    rng = np.random.RandomState(0)
+    info = create_info(['0', '1', '2'], sfreq=256, ch_types='eeg')
+    data = rng.random(size=(3, 256 * 10 + 100)) * 1e-5
+    raw = RawArray(data, info)
+    temp_fname = op.join(str(tmp_path), 'test.edf')
+    with pytest.warns(RuntimeWarning, match='zeros were appended'):
+        raw.export(temp_fname)
+
+    raw_read = read_raw_edf(temp_fname, preload=False)
+    temp_fname_2 = op.join(str(tmp_path), 'test_2.edf')
+    with pytest.warns(RuntimeWarning, match='zeros were appended'):
+        raw_read.crop(tmax=(data.shape[1] - 1) / 256.).export(temp_fname_2)
+    assert not raw_read.preload
+    raw_read_2 = read_raw_edf(temp_fname_2, preload=True)
+    assert_allclose(raw_read_2.get_data()[:, :data.shape[1]], data,
+                    atol=1e-9)
+
+
 @pytest.mark.skipif(not _check_edflib_installed(strict=False),
                     reason='edflib-python not installed')
 def test_rawarray_edf(tmp_path):
@@ -12,6 +12,8 @@
 # License: BSD-3-Clause
 
 from datetime import datetime, timezone, timedelta
+import functools
+import math
 import os
 import re
 
@@ -22,7 +24,6 @@ from ..utils import _blk_read_lims, _mult_cal_one
 from ..base import BaseRaw
 from ..meas_info import _empty_info, _unique_channel_names
 from ..constants import FIFF
-from ...filter import resample
 from ...utils import fill_doc
 from ...annotations import Annotations
 
@@ -144,12 +145,10 @@ class RawEDF(BaseRaw):
         # Read annotations from file and set it
         onset, duration, desc = list(), list(), list()
         if len(edf_info['tal_idx']) > 0:
-            # Read TAL data exploiting the header info (no regexp)
-            idx = np.empty(0, int)
-            tal_data = self._read_segment_file(
-                np.empty((0, self.n_times)), idx, 0, 0, int(self.n_times),
-                np.ones((len(idx), 1)), None)
-            onset, duration, desc = _read_annotations_edf(tal_data[0])
+            # Read only the TAL bytes of each record, not the signals
+            events = list(_iter_annotations_edf(input_fname, edf_info))
+            if events:
+                onset, duration, desc = zip(*events)
 
         self.set_annotations(Annotations(onset=onset, duration=duration,
                                          description=desc, orig_time=None))
@@ -249,6 +248,68 @@ def _read_ch(fid, subtype, samp, dtype_byte, dtype=None):
     return ch_data
 
 
+@functools.lru_cache(maxsize=None)
+def _poly_filter(up, down):
+    """Design the polyphase filter for one resampling ratio.
+
+    The filter is the one :func:`scipy.signal.resample_poly` uses, with
+    leading zeros so that output ``j0`` of :func:`scipy.signal.upfirdn` lines
+    up with the first input sample after ``n_ctx`` samples of history.
+    """
+    from scipy.signal import firwin
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1. / max_rate, window=('kaiser', 5.0)) * up
+    n_ctx = -(-half_len // up) + 1
+    n_zeros = -(n_ctx * up + half_len) % down
+    h = np.concatenate([np.zeros(n_zeros), h])
+    h.flags.writeable = False
+    j0 = (n_ctx * up + half_len + n_zeros) // down
+    return h, n_ctx, j0
+
+
+class _StreamResampler(object):
+    """Resample one channel chunk by chunk without edge artifacts.
+
+    Blocks with ``n_samp`` samples are resampled to ``buf_len`` samples. The
+    last ``n_ctx`` input samples are kept between calls, and each call gets
+    ``n_ctx`` samples of lookahead, so the output is the same as resampling
+    the whole channel at once. Samples beyond the file edges are taken as
+    constant.
+    """
+
+    def __init__(self, n_samp, buf_len):
+        factor = math.gcd(int(n_samp), int(buf_len))
+        self.up = int(buf_len) // factor
+        self.down = int(n_samp) // factor
+        self.h, self.n_ctx, self.j0 = _poly_filter(self.up, self.down)
+        self.history = None
+
+    def process(self, data, before, after):
+        """Resample data of shape (n_blocks, n_samp) to (n_blocks, buf_len).
+
+        ``before`` holds the preceding blocks and only matters for the first
+        call, ``after`` holds the next blocks of the file (empty at the end).
+        """
+        from scipy.signal import upfirdn
+        n_blocks = len(data)
+        data = np.asarray(data, np.float64).ravel()
+        before = np.ravel(before)
+        after = np.ravel(after)[:self.n_ctx]
+        if self.history is None:
+            edge = before[:1] if len(before) else data[:1]
+            self.history = np.concatenate(
+                [np.repeat(edge, self.n_ctx - len(before)), before])
+            self.history = self.history[len(self.history) - self.n_ctx:]
+        edge = after[-1:] if len(after) else data[-1:]
+        stream = np.concatenate([self.history, data, after,
+                                 np.repeat(edge, self.n_ctx - len(after))])
+        self.history = stream[len(stream) - 2 * self.n_ctx:-self.n_ctx]
+        n_out = len(data) * self.up // self.down
+        out = upfirdn(self.h, stream, self.up, self.down)
+        return out[self.j0:self.j0 + n_out].reshape(n_blocks, -1)
+
+
 def _read_segment_file(data, idx, fi, start, stop, raw_extras, filenames,
                        cals, mult):
     """Read a chunk of raw data."""
@@ -281,18 +342,34 @@ def _read_segment_file(data, idx, fi, start, stop, raw_extras, filenames,
     # Otherwise we can end up with e.g. 18,181 chunks for a 20 MB file!
     # Let's do ~10 MB chunks:
     n_per = max(10 * 1024 * 1024 // (ch_offsets[-1] * dtype_byte), 1)
+
+    # Channels with fewer samples per block are resampled as one continuous
+    # stream, so each chunk also needs a few blocks of context around it
+    resamplers = dict()
+    for ii, ci in enumerate(orig_sel[idx]):
+        if n_samps[ci] != buf_len and idx_arr[ii] not in stim_channel_idxs:
+            resamplers[ci] = _StreamResampler(n_samps[ci], buf_len)
+    n_ctx = max([-(-rs.n_ctx // int(n_samps[ci]))
+                 for ci, rs in resamplers.items()], default=0)
+    n_records = int(raw_extras['n_records'])
+
     with open(filenames, 'rb', buffering=0) as fid:
 
         # Extract data
-        start_offset = (data_offset +
-                        block_start_idx * ch_offsets[-1] * dtype_byte)
         for ai in range(0, len(r_lims), n_per):
-            block_offset = ai * ch_offsets[-1] * dtype_byte
             n_read = min(len(r_lims) - ai, n_per)
-            fid.seek(start_offset + block_offset, 0)
+            first = block_start_idx + ai
+            # the resampler state carries the history after the first chunk
+            n_pre = min(n_ctx, first) if ai == 0 else 0
+            n_post = max(min(n_ctx, n_records - first - n_read), 0)
+            n_all = n_pre + n_read + n_post
+            fid.seek(data_offset +
+                     (first - n_pre) * ch_offsets[-1] * dtype_byte, 0)
             # Read and reshape to (n_chunks_read, ch0_ch1_ch2_ch3...)
-            many_chunk = _read_ch(fid, subtype, ch_offsets[-1] * n_read,
-                                  dtype_byte, dtype).reshape(n_read, -1)
+            many_chunk = _read_ch(fid, subtype, ch_offsets[-1] * n_all,
+                                  dtype_byte, dtype).reshape(n_all, -1)
+            context = many_chunk[:n_pre], many_chunk[n_pre + n_read:]
+            many_chunk = many_chunk[n_pre:n_pre + n_read]
             r_sidx = r_lims[ai][0]
             r_eidx = (buf_len * (n_read - 1) + r_lims[ai + n_read - 1][1])
             d_sidx = d_lims[ai][0]
@@ -323,13 +400,12 @@ def _read_segment_file(data, idx, fi, start, stop, raw_extras, filenames,
                         ch_data = interp1d(old, ch_data,
                                            kind='zero', axis=-1)(new)
                     else:
-                        # XXX resampling each chunk isn't great,
-                        # it forces edge artifacts to appear at
-                        # each buffer boundary :(
-                        # it can also be very slow...
-                        ch_data = resample(
-                            ch_data.astype(np.float64), buf_len, n_samps[ci],
-                            npad=0, axis=-1)
+                        sl = slice(ch_offsets[ci], ch_offsets[ci + 1])
+                        before, after = [
+                            (c[:, sl] * cal[orig_idx] + offsets[orig_idx]) *
+                            gains[orig_idx] for c in context]
+                        ch_data = resamplers[ci].process(
+                            ch_data, before, after)
                 elif orig_idx in stim_channel_idxs:
                     ch_data = np.bitwise_and(ch_data.astype(int), 2**17 - 1)
                 one[orig_idx] = ch_data.ravel()[r_sidx:r_eidx]
@@ -1481,6 +1557,10 @@ def read_raw_gdf(input_fname, eog=None, misc=None, stim_channel='auto',
                   verbose=verbose)
 
 
+_TAL_PATTERN = re.compile(
+    '([+-]\\d+\\.?\\d*)(\x15(\\d+\\.?\\d*))?(\x14.*?)\x14\x00')
+
+
 def _read_annotations_edf(annotations):
     """Annotation File Reader.
 
@@ -1500,10 +1580,9 @@ def _read_annotations_edf(annotations):
         string, all the annotations are given the same description. To reject
         epochs, use description starting with keyword 'bad'. See example above.
     """
-    pat = '([+-]\\d+\\.?\\d*)(\x15(\\d+\\.?\\d*))?(\x14.*?)\x14\x00'
     if isinstance(annotations, str):
         with open(annotations, encoding='latin-1') as annot_file:
-            triggers = re.findall(pat, annot_file.read())
+            triggers = annot_file.read()
     else:
         tals = bytearray()
         annotations = np.atleast_2d(annotations)
@@ -1526,28 +1605,110 @@ def _read_annotations_edf(annotations):
         # use of latin-1 because characters are only encoded for the first 256
         # code points and utf-8 can triggers an "invalid continuation byte"
         # error
-        triggers = re.findall(pat, tals.decode('latin-1'))
+        triggers = tals.decode('latin-1')
+
+    events = list(_iter_tal_annotations([triggers]))
+    return zip(*events) if events else (list(), list(), list())
 
-    events = []
+
+def _iter_tal_annotations(tals):
+    """Parse TAL strings incrementally.
+
+    Parameters
+    ----------
+    tals : iterable of str
+        TAL text, e.g. the TAL bytes of one data record decoded as latin-1.
+        The first trigger of the first string sets the time offset.
+
+    Yields
+    ------
+    onset, duration, description : float, float, str
+        One annotation at a time, in file order.
+    """
     offset = 0.
-    for k, ev in enumerate(triggers):
-        onset = float(ev[0]) + offset
-        duration = float(ev[2]) if ev[2] else 0
-        for description in ev[3].split('\x14')[1:]:
-            if description:
-                events.append([onset, duration, description])
-            elif k == 0:
-                # The startdate/time of a file is specified in the EDF+ header
-                # fields 'startdate of recording' and 'starttime of recording'.
-                # These fields must indicate the absolute second in which the
-                # start of the first data record falls. So, the first TAL in
-                # the first data record always starts with +0.X, indicating
-                # that the first data record starts a fraction, X, of a second
-                # after the startdate/time that is specified in the EDF+
-                # header. If X=0, then the .X may be omitted.
-                offset = -onset
+    first = True
+    for tal in tals:
+        for ev in _TAL_PATTERN.finditer(tal):
+            onset = float(ev.group(1)) + offset
+            duration = float(ev.group(3)) if ev.group(3) else 0
+            for description in ev.group(4).split('\x14')[1:]:
+                if description:
+                    yield onset, duration, description
+                elif first:
+                    # The startdate/time of a file is specified in the EDF+
+                    # header fields 'startdate of recording' and 'starttime
+                    # of recording'. These fields must indicate the absolute
+                    # second in which the start of the first data record
+                    # falls. So, the first TAL in the first data record
+                    # always starts with +0.X, indicating that the first data
+                    # record starts a fraction, X, of a second after the
+                    # startdate/time that is specified in the EDF+ header.
+                    # If X=0, then the .X may be omitted.
+                    offset = -onset
+            first = False
+
+
+def _read_tal_records(fname, edf_info, n_per=None):
+    """Read only the TAL bytes of each data record.
+
+    The data records are mapped with a strided memmap and only the byte
+    ranges of the annotation channels are copied, ``n_per`` records at a
+    time, so the signal samples are never decoded.
+
+    Yields
+    ------
+    tal : str
+        The TAL bytes of one record of one annotation channel, decoded as
+        latin-1. Channels are yielded one after the other, as in
+        ``_read_segment_file``.
+    """
+    tal_idx = edf_info['tal_idx']
+    n_records = int(edf_info['n_records'])
+    dtype_byte = edf_info['dtype_byte']
+    ch_offsets = np.cumsum(np.concatenate([[0], edf_info['n_samps']]),
+                           dtype=np.int64) * dtype_byte
+    if len(tal_idx) == 0 or n_records <= 0:
+        return
+    if n_per is None:
+        # ~10 MB of TAL bytes per copy
+        tal_bytes = max(int(np.diff(ch_offsets)[tal_idx].max()), 1)
+        n_per = max(10 * 1024 * 1024 // tal_bytes, 1)
+    records = np.memmap(fname, dtype=UINT8, mode='r',
+                        offset=edf_info['data_offset'],
+                        shape=(n_records, int(ch_offsets[-1])))
+    try:
+        for ci in tal_idx:
+            for ai in range(0, n_records, n_per):
+                # (n_read, n_tal_bytes): only these pages are touched
+                chunk = np.array(records[ai:ai + n_per,
+                                         ch_offsets[ci]:ch_offsets[ci + 1]])
+                for record in chunk:
+                    # use of latin-1 for the same reason as in
+                    # _read_annotations_edf
+                    yield record.tobytes().decode('latin-1')
+    finally:
+        del records
+
+
+def _iter_annotations_edf(fname, edf_info, n_per=None):
+    """Yield the EDF+ annotations of a file, reading only its TAL channels.
 
-    return zip(*events) if events else (list(), list(), list())
+    Parameters
+    ----------
+    fname : str
+        Path to the EDF/BDF file.
+    edf_info : dict
+        The header info as returned by ``_read_edf_header``.
+    n_per : int | None
+        Number of records read at once. None reads ~10 MB at a time.
+
+    Yields
+    ------
+    onset, duration, description : float, float, str
+        One annotation at a time, as soon as its record has been parsed.
+    """
+    yield from _iter_tal_annotations(
+        _read_tal_records(fname, edf_info, n_per))
 
 
 def _get_edf_default_event_id(descriptions):
@@ -28,7 +28,8 @@ from mne.io import read_raw_edf, read_raw_bdf, read_raw_fif, edf, read_raw_gdf
 from mne.io.tests.test_raw import _test_raw_reader
 from mne.io.edf.edf import (_get_edf_default_event_id, _read_annotations_edf,
                             _read_ch, _parse_prefilter_string, _edf_str,
-                            _read_edf_header, _read_header)
+                            _read_edf_header, _read_header,
+                            _iter_annotations_edf, _StreamResampler)
 from mne.io.pick import channel_indices_by_type, get_channel_type_constants
 from mne.tests.test_annotations import _assert_annotations_equal
 
@@ -334,6 +335,105 @@ def test_read_annot(tmp_path):
     _assert_annotations_equal(annotation, EXPECTED_ANNOTATIONS)
 
 
+def _write_edf_plus(fname, tals, signals=None, tal_samp=30):
+    """Write an EDF+ file with int16 signals and one annotation channel."""
+    def field(*values, width):
+        return b''.join(str(value).ljust(width)[:width].encode('latin-1')
+                        for value in values)
+
+    if signals is None:
+        signals = [np.repeat(np.arange(len(tals)), 10).reshape(-1, 10)]
+    n_signals = len(signals)
+    with open(fname, 'wb') as fid:
+        fid.write(field(0, width=8) + field('X X X X', width=80) +
+                  field('Startdate 01-JAN-2020 X X X', width=80) +
+                  field('01.01.20', '00.00.00', width=8) +
+                  field(256 * (n_signals + 2), width=8) +
+                  field('EDF+C', width=44) +
+                  field(len(tals), 1, width=8) + field(n_signals + 1, width=4))
+        labels = ['EEG %d' % ii for ii in range(n_signals)]
+        fid.write(field(*labels, 'EDF Annotations', width=16) +
+                  field(*[''] * (n_signals + 1), width=80) +
+                  field(*['uV'] * n_signals, '', width=8) +
+                  field(*[-32768] * n_signals, -1, width=8) +
+                  field(*[32767] * n_signals, 1, width=8) +
+                  field(*[-32768] * (n_signals + 1), width=8) +
+                  field(*[32767] * (n_signals + 1), width=8) +
+                  field(*[''] * (n_signals + 1), width=80) +
+                  field(*[sig.shape[1] for sig in signals], tal_samp,
+                        width=8) +
+                  field(*[''] * (n_signals + 1), width=32))
+        for ri, tal in enumerate(tals):
+            for sig in signals:
+                fid.write(sig[ri].astype('<i2').tobytes())
+            fid.write(tal.ljust(2 * tal_samp, b'\x00'))
+
+
+def test_iter_annotations_edf(tmp_path):
+    """Test reading only the TAL bytes of each record."""
+    tals = [b'+0.5\x14\x14\x00+1.5\x14Lights off\x14\x00',
+            b'+1.5\x14\x14\x00+2\x150.5\x14Apnea\x14Arousal\x14\x00',
+            b'+2.5\x14\x14\x00',
+            b'+3.5\x14\x14\x00+3.75\x14Close door\x14\x00']
+    fname = tmp_path / 'test_tal.edf'
+    _write_edf_plus(fname, tals)
+    want = [(1., 0, 'Lights off'), (1.5, 0.5, 'Apnea'),
+            (1.5, 0.5, 'Arousal'), (3.25, 0, 'Close door')]
+
+    edf_info, _ = _read_edf_header(str(fname), exclude=(), infer_types=False)
+    for n_per in (None, 1, 3):
+        events = list(_iter_annotations_edf(str(fname), edf_info, n_per))
+        assert_allclose([ev[0] for ev in events], [ev[0] for ev in want])
+        assert_allclose([ev[1] for ev in events], [ev[1] for ev in want])
+        assert [ev[2] for ev in events] == [ev[2] for ev in want]
+
+    # same as parsing the whole annotation channel at once
+    tal_channel = np.frombuffer(
+        b''.join(tal.ljust(60, b'\x00') for tal in tals), '<i2')
+    onset, duration, desc = _read_annotations_edf([tal_channel])
+    assert_allclose(onset, [ev[0] for ev in want])
+    assert desc == tuple(ev[2] for ev in want)
+
+    raw = read_raw_edf(fname)
+    assert_allclose(raw.annotations.onset, [ev[0] for ev in want])
+    assert list(raw.annotations.description) == [ev[2] for ev in want]
+    assert_array_equal(raw.get_data()[0] * 1e6,
+                       np.repeat(np.arange(len(tals)), 10))
+
+
+def test_edf_stream_resample(tmp_path):
+    """Test that mixed-rate channels are resampled without chunk edges."""
+    from scipy.signal import resample_poly
+    n_records = 12
+    rng = np.random.RandomState(0)
+    fast = rng.randint(-1000, 1000, (n_records, 64))
+    slow = np.round(1000 * np.sin(np.arange(n_records * 4) / 3.))
+    fname = tmp_path / 'test_mixed_rate.edf'
+    _write_edf_plus(fname, [b'+0\x14\x14\x00'] * n_records,
+                    signals=[fast, slow.reshape(n_records, 4)])
+
+    raw = read_raw_edf(fname, preload=True)
+    assert raw.info['sfreq'] == 64
+    assert_allclose(raw._data[0] * 1e6, fast.ravel())
+    want = raw._data[1]
+    # the file edges are padded with constant values instead of zeros
+    assert_allclose(want[160:-160], resample_poly(slow, 16, 1)[160:-160] *
+                    1e-6, atol=1e-9)
+    # reading pieces gives the same samples as reading everything
+    for start, stop in [(0, 100), (100, 415), (415, 768), (130, 131)]:
+        assert_allclose(raw[1, start:stop][0][0], want[start:stop],
+                        atol=1e-12)
+    # and the resampler state carries over between chunks
+    slow = slow.reshape(n_records, 4)
+    for splits in ([3, 7], [1, 2, 3, 4, 5, 11]):
+        resampler = _StreamResampler(4, 64)
+        out = [resampler.process(chunk, np.empty((0, 4)), slow[end:])
+               for chunk, end in zip(np.split(slow, splits),
+                                     splits + [n_records])]
+        assert_allclose(np.concatenate(out).ravel() * 1e-6, want,
+                        atol=1e-9)
+
+
 @testing.requires_testing_data
 @pytest.mark.parametrize('fname', [test_generator_edf, test_generator_bdf])
 def test_read_annotations(fname, recwarn):
@@ -14,10 +14,12 @@ due to internal pointers that are not being updated.
 #          Matt Sanderson <matt.sanderson@mq.edu.au>
 #
 # License: BSD-3-Clause
+import hashlib
 import os
 import os.path as op
 import re
 import shutil as sh
+import stat
 from pathlib import Path
 
 from scipy.io import loadmat, savemat
@@ -42,6 +44,263 @@ def _copytree(src, dst, **kwargs):
             raise
 
 
+# offset and length of the EDF/BDF header fields that copyfile_edf can patch
+EDF_HEADER_FIELDS = {'id_info': (8, 80), 'rec_info': (88, 80)}
+
+# name of the per-dataset checksum manifest, in ``sha256sum`` format
+CHECKSUMS_FNAME = 'checksums.sha256'
+
+
+def _copyfile_checksum(src, dest, patches=None, buffer_size=16 * 1024 ** 2,
+                       src_hash=None, progress=None):
+    """Copy a file in one pass and return the SHA-256 of the copy.
+
+    Parameters
+    ----------
+    src : path-like
+        The source file.
+    dest : path-like
+        The destination file.
+    patches : dict | None
+        Maps byte offsets to bytes that replace the source bytes at that
+        offset. They are applied to the buffer before it is written, so the
+        destination is never rewritten and the checksum matches its content.
+    buffer_size : int
+        Number of bytes copied at a time.
+    src_hash : hashlib hash object | None
+        If given, it is also updated with the unpatched source bytes.
+    progress : callable | None
+        If given, called with the number of bytes of each buffer once it is
+        written. An exception it raises stops the copy, and the partial
+        destination is removed.
+
+    Returns
+    -------
+    checksum : str
+        The SHA-256 hex digest of the destination file.
+    """
+    patches = sorted((patches or dict()).items())
+    sha256 = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    position = 0
+    try:
+        with open(src, 'rb') as fin, open(dest, 'wb') as fout:
+            while True:
+                n_read = fin.readinto(buffer)
+                if not n_read:
+                    break
+                if src_hash is not None:
+                    src_hash.update(view[:n_read])
+                for offset, value in patches:
+                    start = max(offset, position)
+                    stop = min(offset + len(value), position + n_read)
+                    if start < stop:
+                        view[start - position:stop - position] = \
+                            value[start - offset:stop - offset]
+                sha256.update(view[:n_read])
+                fout.write(view[:n_read])
+                position += n_read
+                if progress is not None:
+                    progress(n_read)
+    except BaseException:
+        if op.exists(dest):
+            os.remove(dest)
+        raise
+    return sha256.hexdigest()
+
+
+def _write_atomic(fname, text):
+    """Write a small text file through a temporary file."""
+    temp_fname = f'{fname}.{os.getpid()}.tmp'
+    with open(temp_fname, 'w', encoding='utf-8', newline='\n') as fid:
+        fid.write(text)
+    os.replace(temp_fname, fname)
+
+
+def _source_checksum(cache_dir, src):
+    """Return the memo file and the memoized SHA-256 (or None) of a source.
+
+    Checksums are memoized per path, size and modification time, so an
+    unchanged source is never read again.
+    """
+    src_stat = os.stat(src)
+    key = f'{op.abspath(src)}\0{src_stat.st_size}\0{src_stat.st_mtime_ns}'
+    key = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    fname = op.join(cache_dir, 'sources', key)
+    if op.exists(fname):
+        with open(fname, 'r', encoding='utf-8') as fid:
+            return fname, fid.read().strip()
+    return fname, None
+
+
+def _remove_cached(fname):
+    """Remove a read-only file of the cache, if it still exists."""
+    try:
+        os.remove(fname)
+    except PermissionError:
+        # read-only files cannot be removed on Windows
+        try:
+            os.chmod(fname, stat.S_IWRITE | stat.S_IREAD)
+            os.remove(fname)
+        except OSError:
+            pass
+    except OSError:
+        pass
+
+
+def _evict_cached_copies(cache_dir, max_size):
+    """Remove the least recently used copies until the cache fits max_size."""
+    copies = list()
+    with os.scandir(op.join(cache_dir, 'objects')) as entries:
+        for entry in entries:
+            if not entry.name.endswith(('.sha256', '.tmp')):
+                entry_stat = entry.stat()
+                copies.append((entry_stat.st_mtime, entry_stat.st_size,
+                               entry.path))
+    size = sum(copy_size for _, copy_size, _ in copies)
+    for _, copy_size, fname in sorted(copies):
+        if size <= max_size:
+            break
+        # without its checksum a copy is a cache miss, even if it is left
+        _remove_cached(fname + '.sha256')
+        _remove_cached(fname)
+        size -= copy_size
+
+
+# ioctl request that makes a file share the data of another one (reflink),
+# on the Linux file systems that support it (Btrfs, XFS, ...)
+_FICLONE = 0x40049409
+
+# mode of the objects of the cache, which may be hard linked into datasets
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def _reflink(src, dest):
+    """Make ``dest`` a copy-on-write clone of ``src``, if the file system can.
+
+    Returns
+    -------
+    cloned : bool
+        Whether ``dest`` was created. Nothing is left behind otherwise.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        return False
+    try:
+        with open(src, 'rb') as fin, open(dest, 'xb') as fout:
+            try:
+                fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+                return True
+            except OSError:
+                pass
+    except OSError:
+        return False
+    os.remove(dest)
+    return False
+
+
+def _cached_copyfile(src, dest, patches, cache_dir, max_size, progress=None):
+    """Copy a file through a content-addressed cache of copies.
+
+    The cache is keyed by the SHA-256 of the source content and by the
+    header patches, which are the only inputs that change the copy. On a
+    hit, the cached copy is reflinked to ``dest`` where the file system
+    supports it, otherwise hard linked, and only copied if neither works.
+    On a miss, the source checksum is computed during the copy, and ``dest``
+    is added to ``<cache_dir>/objects`` the same way, without copying its
+    data again. The objects are read-only, so a hard linked ``dest`` is
+    read-only as well; ``copyfile_edf`` removes it before writing it again. The least
+    recently used copies are removed once the cache holds more than
+    ``max_size`` bytes.
+
+    Returns
+    -------
+    checksum : str
+        The SHA-256 hex digest of the destination file.
+    """
+    for subdir in ('sources', 'objects'):
+        os.makedirs(op.join(cache_dir, subdir), exist_ok=True)
+
+    def _object_key(src_checksum):
+        key = hashlib.sha256(src_checksum.encode('ascii'))
+        for offset, value in sorted(patches.items()):
+            key.update(b'%d:%d:' % (offset, len(value)) + value)
+        return op.join(cache_dir, 'objects', key.hexdigest())
+
+    memo_fname, src_checksum = _source_checksum(cache_dir, src)
+    if src_checksum is not None:
+        obj_fname = _object_key(src_checksum)
+        try:
+            with open(obj_fname + '.sha256', 'r', encoding='utf-8') as fid:
+                checksum = fid.read().strip()
+            if not _reflink(obj_fname, dest):
+                try:
+                    os.link(obj_fname, dest)
+                except OSError:
+                    sh.copyfile(obj_fname, dest)
+            os.utime(obj_fname)  # recently used
+            if progress is not None:
+                progress(op.getsize(dest))
+            logger.info(f'Linked {dest} from the conversion cache')
+            return checksum
+        except OSError:
+            pass  # not cached yet, or evicted meanwhile
+
+    src_hash = hashlib.sha256()
+    checksum = _copyfile_checksum(src, dest, patches, src_hash=src_hash,
+                                  progress=progress)
+    src_checksum = src_hash.hexdigest()
+    _write_atomic(memo_fname, src_checksum)
+    if op.getsize(dest) > max_size:
+        return checksum
+    obj_fname = _object_key(src_checksum)
+    temp_fname = f'{obj_fname}.{os.getpid()}.tmp'
+    try:
+        if not _reflink(dest, temp_fname):
+            os.link(dest, temp_fname)
+        os.chmod(temp_fname, _READ_ONLY)
+        os.replace(temp_fname, obj_fname)
+        _write_atomic(obj_fname + '.sha256', checksum)
+        _evict_cached_copies(cache_dir, max_size)
+    except OSError:
+        # e.g. links are not supported, the copy is then not cached
+        _remove_cached(temp_fname)
+    return checksum
+
+
+def _read_checksums(fname):
+    """Read a checksum manifest into a dict of relative path -> digest."""
+    checksums = dict()
+    if op.exists(fname):
+        with open(fname, 'r', encoding='utf-8') as fid:
+            for line in fid:
+                digest, _, relpath = line.rstrip('\n').partition('  ')
+                if relpath:
+                    checksums[relpath] = digest
+    return checksums
+
+
+def _update_checksums(bids_root, checksums):
+    """Add or replace entries of the checksum manifest of a dataset.
+
+    Parameters
+    ----------
+    bids_root : path-like
+        The root of the dataset, where the manifest is stored.
+    checksums : dict
+        Maps paths relative to ``bids_root`` (with ``/`` separators) to
+        SHA-256 hex digests.
+    """
+    fname = op.join(bids_root, CHECKSUMS_FNAME)
+    manifest = _read_checksums(fname)
+    manifest.update(checksums)
+    # written next to the manifest first, so that it is never left truncated
+    _write_atomic(fname, ''.join(f'{manifest[relpath]}  {relpath}\n'
+                                 for relpath in sorted(manifest)))
+
+
 def _get_brainvision_encoding(vhdr_file):
     """Get the encoding of .vhdr and .vmrk files.
 
@@ -362,7 +621,8 @@ def copyfile_brainvision(vhdr_src, vhdr_dest, anonymize=None, verbose=None):
         logger.info('Anonymized all dates in VHDR and VMRK.')
 
 
-def copyfile_edf(src, dest, anonymize=None):
+def copyfile_edf(src, dest, anonymize=None, header=None, cache_dir=None,
+                 cache_size=10 * 1024 ** 3, progress=None):
     """Copy an EDF, EDF+, or BDF file to a new location, optionally anonymize.
 
     .. warning:: EDF/EDF+/BDF files contain two fields for recording dates:
@@ -409,6 +669,27 @@ def copyfile_edf(src, dest, anonymize=None):
             date will be overwritten as well. If True, keep subject information
             apart from the recording date. Participant names and birthdates
             will always be anonymized if present, regardless of this setting.
+    header : dict | None
+        Header fields to overwrite in the copy, after any anonymization. Keys
+        can be ``'id_info'`` (the local patient identification) and
+        ``'rec_info'`` (the local recording identification).
+    cache_dir : path-like | None
+        If given, a content-addressed cache of copies. A source that was
+        already copied with the same header changes is linked from the cache
+        instead of being read and checksummed again. Linked copies can be
+        read-only, ``cache_dir`` must be on the file system of ``dest``.
+    cache_size : int
+        The maximum number of bytes of copies kept in ``cache_dir``. The
+        least recently used copies are removed beyond that.
+    progress : callable | None
+        If given, called with the number of bytes copied since its previous
+        call, every 16 MiB, e.g. to report the progress of large files. An
+        exception it raises stops the copy, and the partial copy is removed.
+
+    Returns
+    -------
+    checksum : str
+        The SHA-256 hex digest of the written file, computed while copying.
 
     See Also
     --------
@@ -434,20 +715,19 @@ def copyfile_edf(src, dest, anonymize=None):
         ext_dest = ext_dest.lower()
         dest = Path(dest).with_suffix(ext_dest)
 
-    # Copy data prior to any anonymization
-    sh.copyfile(src, dest)
-
-    # Anonymize EDF/BDF data, if requested
+    # The header is read from the source, so that the file is written once,
+    # with the anonymized header fields already in place
+    patches = dict()
     if anonymize is not None:
         if ext_src in ['.bdf', '.BDF']:
-            raw = read_raw_bdf(dest, preload=False, verbose=0)
+            raw = read_raw_bdf(src, preload=False, verbose=0)
         elif ext_src in ['.edf', '.EDF']:
-            raw = read_raw_edf(dest, preload=False, verbose=0)
+            raw = read_raw_edf(src, preload=False, verbose=0)
         else:
             raise ValueError('Unsupported file type ({0})'.format(ext_src))
 
         # Get subject info, recording info, and recording date
-        with open(dest, 'rb') as f:
+        with open(src, 'rb') as f:
             f.seek(8)  # id_info field starts 8 bytes in
             id_info = f.read(80).decode('ascii').rstrip()
             rec_info = f.read(80).decode('ascii').rstrip()
@@ -475,11 +755,25 @@ def copyfile_edf(src, dest, anonymize=None):
             id_info = ["0", "X", "X", "X"]
             rec_info = ["Startdate", start_date, "X",
                         "mne-bids_anonymize", "X"]
-        with open(dest, 'r+b') as f:
-            f.seek(8)  # id_info field starts 8 bytes in
-            f.write(bytes(" ".join(id_info).ljust(80), 'ascii'))
-            f.write(bytes(" ".join(rec_info).ljust(80), 'ascii'))
-            f.write(bytes(meas_date, 'ascii'))
+        patches[8] = bytes(" ".join(id_info).ljust(80), 'ascii')
+        patches[88] = bytes(" ".join(rec_info).ljust(80), 'ascii')
+        patches[168] = bytes(meas_date, 'ascii')
+
+    if header is not None:
+        for key, value in header.items():
+            if key not in EDF_HEADER_FIELDS:
+                raise ValueError(f'Unknown EDF header field "{key}", must be '
+                                 f'one of {list(EDF_HEADER_FIELDS)}')
+            offset, length = EDF_HEADER_FIELDS[key]
+            patches[offset] = bytes(value[:length].ljust(length), 'ascii')
+
+    # dest may be a read-only link into a cache, never write through it
+    if op.lexists(dest):
+        os.remove(dest)
+    if cache_dir is not None:
+        return _cached_copyfile(src, dest, patches, cache_dir, cache_size,
+                                progress)
+    return _copyfile_checksum(src, dest, patches, progress=progress)
 
 
 def copyfile_eeglab(src, dest):
@@ -0,0 +1,274 @@
+"""Index of the file names in a BIDS dataset.
+
+If the ``MNE_BIDS_INDEX_DIR`` config is set, the indices are kept in that
+directory, and later lookups only list the directories modified since.
+Otherwise no index is kept and the lookups search the directories.
+"""
+# License: BSD-3-Clause
+import hashlib
+import os
+import os.path as op
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from mne.utils import get_config, logger
+
+from mne_bids.config import ALLOWED_PATH_ENTITIES_SHORT
+from mne_bids.utils import param_regex
+
+# bump when the schema or the parsing of the names changes
+_INDEX_VERSION = 2
+
+# directories modified less than this many nanoseconds before they were listed
+# are listed again on the next refresh, their mtime may not have ticked yet
+_RACY_MTIME_NS = 2_000_000_000
+
+# persistent indices not used for this many seconds are removed
+_INDEX_MAX_AGE = 30 * 24 * 3600
+
+_ENTITY_COLUMNS = tuple(ALLOWED_PATH_ENTITIES_SHORT.values())
+_INSERT_ENTRY = ('INSERT INTO entries VALUES (%s)' %
+                 ', '.join('?' * (8 + len(_ENTITY_COLUMNS))))
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    is_file INTEGER NOT NULL,
+    is_link INTEGER NOT NULL,
+    {', '.join(f'{column} TEXT' for column in _ENTITY_COLUMNS)},
+    suffix TEXT,
+    extension TEXT,
+    PRIMARY KEY (dir, name)
+);
+CREATE INDEX IF NOT EXISTS entries_subject ON entries (subject);
+"""
+
+
+def _get_index_fname(root):
+    """Get the path of the persistent index file of a BIDS root.
+
+    The indices are kept outside of the dataset, in the ``MNE_BIDS_INDEX_DIR``
+    config directory, so that read-only roots can be indexed as well. If that
+    config is not set, ``None`` is returned and no index is kept.
+    """
+    index_dir = get_config('MNE_BIDS_INDEX_DIR')
+    if not index_dir:
+        return None
+    key = hashlib.sha1(op.realpath(root).encode('utf-8')).hexdigest()
+    return op.join(index_dir, f'{key[:16]}.sqlite')
+
+
+def _remove_stale_indices(index_dir):
+    """Remove the indices that were not used for ``_INDEX_MAX_AGE``."""
+    now = time.time()
+    with os.scandir(index_dir) as entries:
+        for entry in entries:
+            try:
+                if (entry.name.endswith('.sqlite') and
+                        now - entry.stat().st_mtime > _INDEX_MAX_AGE):
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# the open indices of the current thread, by file name
+_connections = threading.local()
+
+
+def _connect(fname):
+    """Open an index, creating or resetting its tables if needed.
+
+    The connection is kept open for the next lookups of the thread.
+    """
+    connections = _connections.__dict__.setdefault('by_fname', dict())
+    conn = connections.get(fname)
+    if conn is not None and op.exists(fname):
+        return conn
+
+    conn = sqlite3.connect(fname, timeout=60, isolation_level=None)
+    if conn.execute('PRAGMA user_version').fetchone()[0] != _INDEX_VERSION:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DROP TABLE IF EXISTS dirs')
+        conn.execute('DROP TABLE IF EXISTS entries')
+        conn.execute(f'PRAGMA user_version = {_INDEX_VERSION}')
+        conn.execute('COMMIT')
+    conn.executescript(_SCHEMA)
+    connections[fname] = conn
+    return conn
+
+
+def _below(column, rel_dir):
+    """Get the SQL condition selecting ``rel_dir`` and its subdirectories.
+
+    The range lets SQLite use the index of ``column``: ``rel_dir`` and the
+    paths below it sort from ``rel_dir`` to ``rel_dir + '0'`` (``'0'`` follows
+    ``'/'``), together with some siblings such as ``rel_dir + '-x'``, which
+    the second condition removes.
+    """
+    if not rel_dir:
+        return '1', ()
+    return (f'{column} >= ? AND {column} < ? AND '
+            f'({column} = ? OR substr({column}, 1, ?) = ?)',
+            (rel_dir, rel_dir + '0', rel_dir, len(rel_dir) + 1,
+             rel_dir + '/'))
+
+
+def _parse_entry(rel_dir, entry):
+    """Get the index row of a directory entry."""
+    name = entry.name
+    entities = dict.fromkeys(_ENTITY_COLUMNS)
+    for match in param_regex.finditer(name):
+        key, value = match.groups()
+        if key in ALLOWED_PATH_ENTITIES_SHORT:
+            entities[ALLOWED_PATH_ENTITIES_SHORT[key]] = value
+
+    # suffix and extension are last, as in get_bids_path_from_fname
+    last_entity = name.split('-')[-1]
+    suffix = extension = None
+    if '_' in last_entity:
+        suffix, _, extension = last_entity.split('_')[-1].partition('.')
+        extension = '.' + extension if extension else None
+    elif '.' in name:
+        extension = '.' + name.rsplit('.', 1)[-1]
+
+    try:
+        is_dir = entry.is_dir()
+        is_file = entry.is_file()
+    except OSError:
+        is_dir = is_file = False
+    return (rel_dir, name, rel_dir.rsplit('/', 1)[-1], is_dir, is_file,
+            entry.is_symlink(), *entities.values(), suffix, extension)
+
+
+def _delete_tree(conn, rel_dir):
+    """Drop a directory and everything below it from the index."""
+    where, params = _below('dir', rel_dir)
+    conn.execute(f'DELETE FROM entries WHERE {where}', params)
+    where, params = _below('path', rel_dir)
+    conn.execute(f'DELETE FROM dirs WHERE {where}', params)
+
+
+def _refresh_index(conn, root, start=''):
+    """Bring the index of ``start`` and its subdirectories up to date.
+
+    Every directory is stat'ed, but only the directories whose mtime changed
+    since they were indexed are listed again, and the index is only written
+    if one did. Directories are walked like ``Path.rglob`` does: symbolic
+    links to directories are not followed.
+    """
+    where, params = _below('path', start)
+    mtimes = dict(conn.execute(
+        f'SELECT path, mtime_ns FROM dirs WHERE {where}', params))
+    where, params = _below('dir', start)
+    old_dirs = defaultdict(set)
+    for rel_dir, name in conn.execute(
+            'SELECT dir, name FROM entries '
+            f'WHERE is_dir = 1 AND is_link = 0 AND {where}', params):
+        old_dirs[rel_dir].add(name)
+
+    # (directory, rows of its entries or None if it was removed, mtime)
+    changes = []
+    stack = [start]
+    while stack:
+        rel_dir = stack.pop()
+        path = op.join(root, rel_dir) if rel_dir else root
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            if rel_dir in mtimes:
+                changes.append((rel_dir, None, None))
+            continue
+
+        if mtimes.get(rel_dir) == mtime_ns:
+            sub_dirs = old_dirs[rel_dir]
+        else:
+            try:
+                with os.scandir(path) as entries:
+                    rows = [_parse_entry(rel_dir, entry) for entry in entries]
+            except OSError:
+                # unreadable directories are skipped, as by glob
+                rows = []
+            sub_dirs = {row[1] for row in rows if row[3] and not row[5]}
+            changes.extend((f'{rel_dir}/{name}' if rel_dir else name,
+                            None, None)
+                           for name in old_dirs[rel_dir] - sub_dirs)
+            if time.time_ns() - mtime_ns < _RACY_MTIME_NS:
+                mtime_ns = -1
+            changes.append((rel_dir, rows, mtime_ns))
+
+        stack.extend(f'{rel_dir}/{name}' if rel_dir else name
+                     for name in sub_dirs)
+
+    if not changes:
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for rel_dir, rows, mtime_ns in changes:
+            if rows is None:
+                _delete_tree(conn, rel_dir)
+                continue
+            conn.execute('DELETE FROM entries WHERE dir = ?', (rel_dir,))
+            conn.executemany(_INSERT_ENTRY, rows)
+            conn.execute('INSERT OR REPLACE INTO dirs VALUES (?, ?)',
+                         (rel_dir, mtime_ns))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    logger.debug(f'Listed {len(changes)} changed directories in {root}')
+
+
+def _query_index(root, where='1', params=(), start=''):
+    """Find entries below a BIDS root through its index.
+
+    Parameters
+    ----------
+    root : path-like
+        The directory that is indexed.
+    where : str
+        SQL condition on the columns of the ``entries`` table: ``dir`` (the
+        directory relative to ``root``, with ``/`` separators), ``name``,
+        ``parent`` (the name of ``dir``), ``is_dir``, ``is_file``, ``is_link``,
+        the entities parsed from ``name``, ``suffix`` and ``extension``.
+    params : tuple
+        Parameters of ``where``.
+    start : str
+        Only ``start``, relative to ``root``, and its subdirectories are
+        refreshed and searched.
+
+    Returns
+    -------
+    paths : list of pathlib.Path | None
+        The matching entries, joined to ``root``. ``None`` if no persistent
+        index is configured or it cannot be used, the caller then searches
+        the directories itself.
+    """
+    root = str(root)
+    fname = _get_index_fname(root)
+    if fname is None:
+        return None
+
+    below, below_params = _below('dir', start)
+    query = f'SELECT dir, name FROM entries WHERE ({where}) AND {below}'
+    try:
+        os.makedirs(op.dirname(fname), exist_ok=True)
+        if not op.exists(fname):
+            _remove_stale_indices(op.dirname(fname))
+        conn = _connect(fname)
+        _refresh_index(conn, root, start)
+        rows = conn.execute(query, (*params, *below_params)).fetchall()
+        os.utime(fname)  # recently used
+    except (OSError, sqlite3.Error) as exp:
+        logger.debug(f'Not using the persistent index of {root}: {exp}')
+        return None
+    return [Path(root, rel_dir, name) for rel_dir, name in rows]
@@ -6,6 +6,9 @@
 import glob
 import os
 import re
+import threading
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
 from io import StringIO
 import shutil as sh
 from collections import OrderedDict
@@ -27,6 +30,7 @@ from mne_bids.config import (
     reader, ENTITY_VALUE_TYPE)
 from mne_bids.utils import (_check_key_val, _check_empty_room_basename,
                             param_regex, _ensure_tuple)
+from mne_bids.index import _query_index
 
 
 def _find_matched_empty_room(bids_path):
@@ -776,15 +780,23 @@ class BIDSPath(object):
 
         # allow searching by datatype
         # all other entities are filtered below
+        # (the index queries are the equivalents of the rglob calls, only
+        # keeping files and not directories)
         if self.datatype is not None:
             search_str = f'*/{self.datatype}/*'
+            paths = _query_index(
+                self.root, "is_file = 1 AND parent = ? AND dir GLOB '*/*'",
+                (self.datatype,))
         else:
             search_str = '*.*'
-
-        paths = self.root.rglob(search_str)
-        # Only keep files (not directories), and omit the JSON sidecars.
-        paths = [p for p in paths
-                 if p.is_file() and p.suffix != '.json']
+            paths = _query_index(self.root, "is_file = 1 AND name GLOB '*.*'")
+
+        if paths is None:
+            paths = self.root.rglob(search_str)
+            # Only keep files (not directories)
+            paths = [p for p in paths if p.is_file()]
+        # Omit the JSON sidecars.
+        paths = [p for p in paths if p.suffix != '.json']
         fnames = _filter_fnames(paths, suffix=self.suffix,
                                 extension=self.extension,
                                 **self.entities)
@@ -1458,9 +1470,27 @@ def _find_matching_sidecar(bids_path, suffix=None,
         search_dir / f'{search_str_filename}*{search_suffix}'
     )
 
-    candidate_list = glob.glob(search_str_complete, recursive=True)
-    best_candidates = _find_best_candidates(bids_path.entities,
-                                            candidate_list)
+    # the index equivalent of glob.glob(search_str_complete, recursive=True),
+    # which skips hidden directories
+    where = "name GLOB ? AND instr('/' || dir, '/.') = 0"
+    params = (f'{search_str_filename}*{search_suffix}',)
+    if bids_path.datatype is not None:
+        where += ' AND parent = ? AND dir != ?'
+        params += (bids_path.datatype, f'sub-{bids_path.subject}')
+    resolver = getattr(_sidecar_resolvers, 'by_root', {}).get(
+        str(Path(bids_root)))
+    if resolver is not None:
+        candidate_list, best_candidates = resolver.resolve(
+            bids_path, search_str_filename, search_suffix)
+    else:
+        candidate_list = _query_index(bids_root, where, params,
+                                      start=f'sub-{bids_path.subject}')
+        if candidate_list is None:
+            candidate_list = glob.glob(search_str_complete, recursive=True)
+        else:
+            candidate_list = [str(path) for path in candidate_list]
+        best_candidates = _find_best_candidates(bids_path.entities,
+                                                candidate_list)
     if len(best_candidates) == 1:
         # Success
         return best_candidates[0]
@@ -1485,6 +1515,107 @@ def _find_matching_sidecar(bids_path, suffix=None,
     return None
 
 
+# the resolvers of the current thread, by root, see _resolve_sidecars()
+_sidecar_resolvers = threading.local()
+
+
+class _SidecarResolver(object):
+    """Resolve the sidecar files of the data files below a BIDS root.
+
+    The candidate sidecars of a subject are listed once, and each resolved
+    sidecar is cached. A resolver only lives for one ``_resolve_sidecars``
+    block, in which no files are written.
+
+    Parameters
+    ----------
+    root : path-like
+        The BIDS root.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.candidates = dict()
+        self.entities = dict()
+        self.resolved = dict()
+
+    def _get_candidates(self, subject):
+        """Get the path, name, parent and depth of the files of a subject."""
+        if subject not in self.candidates:
+            subject_dir = self.root / f'sub-{subject}'
+            paths = _query_index(
+                self.root, "name GLOB ? AND instr('/' || dir, '/.') = 0",
+                (f'sub-{subject}*',), start=subject_dir.name)
+            if paths is None:
+                paths = map(Path, glob.glob(
+                    str(subject_dir / '**' / f'sub-{subject}*'),
+                    recursive=True))
+            self.candidates[subject] = [
+                (str(path), path.name, path.parent.name,
+                 path.parent == subject_dir) for path in paths]
+        return self.candidates[subject]
+
+    def resolve(self, bids_path, search_str_filename, search_suffix):
+        """Find the candidates and the best candidates for a sidecar.
+
+        Parameters
+        ----------
+        bids_path : BIDSPath
+            The data file, without the searched suffix and extension.
+        search_str_filename : str
+            The beginning of the sidecar file names.
+        search_suffix : str
+            The end of the sidecar file names.
+
+        Returns
+        -------
+        candidate_list : list of str
+            The sidecars of the subject matching the file names.
+        best_candidates : list of str
+            The candidates sharing the most entities with ``bids_path``.
+        """
+        params = bids_path.entities
+        key = (bids_path.datatype, search_str_filename, search_suffix,
+               tuple(params.items()))
+        if key not in self.resolved:
+            pattern = f'{search_str_filename}*{search_suffix}'
+            datatype = bids_path.datatype
+            candidate_list = [
+                path for path, name, parent, in_subject_dir
+                in self._get_candidates(bids_path.subject)
+                if fnmatchcase(name, pattern) and (
+                    datatype is None or
+                    (parent == datatype and not in_subject_dir))
+            ]
+            best_candidates = _find_best_candidates(params, candidate_list,
+                                                    self.entities)
+            self.resolved[key] = (candidate_list, best_candidates)
+
+        candidate_list, best_candidates = self.resolved[key]
+        return list(candidate_list), list(best_candidates)
+
+
+@contextmanager
+def _resolve_sidecars(root):
+    """Cache the sidecar lookups below ``root`` while in the block.
+
+    The cache is only kept for the duration of the block, so that files
+    changed between two blocks are seen. Files must not be added, removed
+    or renamed below ``root`` inside the block. Nested blocks for the same
+    root share their resolver.
+    """
+    resolvers = _sidecar_resolvers.__dict__.setdefault('by_root', dict())
+    if root is None or str(Path(root)) in resolvers:
+        yield
+        return
+
+    key = str(Path(root))
+    resolvers[key] = _SidecarResolver(root)
+    try:
+        yield
+    finally:
+        del resolvers[key]
+
+
 def _get_bids_suffix_and_ext(str_suffix):
     """Parse suffix for valid suffix and ext."""
     # no matter what the suffix is, suffix and extension are last
@@ -1555,10 +1686,10 @@ def get_entity_vals(root, entity_key, *, ignore_subjects='emptyroom',
                   nested within ``root``. Depending on the size of your
                   dataset and storage system, searching the entire BIDS dataset
                   may take a **considerable** amount of time (seconds up to
-                  several minutes). If you find yourself running into such
-                  performance issues, consider limiting the search to only a
-                  subdirectory in the dataset, e.g., to a single subject or
-                  session only.
+                  several minutes). If the ``MNE_BIDS_INDEX_DIR`` config is
+                  set, the file names are kept in an index in that directory,
+                  and later searches only list the directories that were
+                  modified since.
 
     entity_key : str
         The name of the entity key to search for.
@@ -1659,7 +1790,10 @@ def get_entity_vals(root, entity_key, *, ignore_subjects='emptyroom',
 
     p = re.compile(r'{}-(.*?)_'.format(entity_long_abbr_map[entity_key]))
     values = list()
-    filenames = root.glob(f'**/*{entity_long_abbr_map[entity_key]}-*_*')
+    search_str = f'*{entity_long_abbr_map[entity_key]}-*_*'
+    filenames = _query_index(root, 'name GLOB ?', (search_str,))
+    if filenames is None:
+        filenames = root.glob(f'**/{search_str}')
 
     for filename in filenames:
         # Skip ignored directories
@@ -1726,7 +1860,7 @@ def _mkdir_p(path, overwrite=False):
         logger.info(f'Creating folder: {path}')
 
 
-def _find_best_candidates(params, candidate_list):
+def _find_best_candidates(params, candidate_list, entities=None):
     """Return the best candidate, based on the number of param matches.
 
     Assign each candidate a score, based on how many entities are shared with
@@ -1740,6 +1874,8 @@ def _find_best_candidates(params, candidate_list):
         The entities that the candidate should match.
     candidate_list : list of str
         A list of candidate filenames.
+    entities : dict | None
+        Cache of the entities parsed from the candidate filenames.
 
     Returns
     -------
@@ -1754,7 +1890,12 @@ def _find_best_candidates(params, candidate_list):
     for candidate in candidate_list:
         n_matches = 0
         candidate_disqualified = False
-        candidate_params = get_entities_from_fname(candidate)
+        if entities is None:
+            candidate_params = get_entities_from_fname(candidate)
+        else:
+            if candidate not in entities:
+                entities[candidate] = get_entities_from_fname(candidate)
+            candidate_params = entities[candidate]
         for entity, value in params.items():
             if entity in candidate_params:
                 if candidate_params[entity] is None:
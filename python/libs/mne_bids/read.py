@@ -24,13 +24,15 @@ from mne.coreg import fit_matched_points
 from mne.transforms import apply_trans
 
 from mne_bids.dig import _read_dig_bids
+from mne_bids.copyfiles import _get_brainvision_paths
 from mne_bids.tsv_handler import _from_tsv, _drop
 from mne_bids.config import (ALLOWED_DATATYPE_EXTENSIONS,
                              ANNOTATIONS_TO_KEEP,
                              reader, _map_options)
 from mne_bids.utils import _get_ch_type_mapping, verbose
 from mne_bids.path import (BIDSPath, _parse_ext, _find_matching_sidecar,
-                           _infer_datatype, get_bids_path_from_fname)
+                           _infer_datatype, get_bids_path_from_fname,
+                           _resolve_sidecars)
 
 
 def _read_raw(raw_path, electrode=None, hsp=None, hpi=None,
@@ -219,8 +221,11 @@ def _handle_participants_reading(participants_fname, raw, subject):
     return raw
 
 
-def _handle_scans_reading(scans_fname, raw, bids_path):
-    """Read associated scans.tsv and set meas_date."""
+def _get_scans_acq_time(scans_fname, bids_path):
+    """Get the acquisition time of a recording from its scans.tsv file.
+
+    Returns ``None`` if the acquisition time is not available.
+    """
     scans_tsv = _from_tsv(scans_fname)
     fname = bids_path.fpath.name
 
@@ -263,8 +268,14 @@ def _handle_scans_reading(scans_fname, raw, bids_path):
             # acquisition time ends with '.%fZ' microseconds string
             acq_time += '.0Z'
         acq_time = datetime.strptime(acq_time, '%Y-%m-%dT%H:%M:%S.%fZ')
-        acq_time = acq_time.replace(tzinfo=timezone.utc)
+        return acq_time.replace(tzinfo=timezone.utc)
+    return None
 
+
+def _handle_scans_reading(scans_fname, raw, bids_path):
+    """Read associated scans.tsv and set meas_date."""
+    acq_time = _get_scans_acq_time(scans_fname, bids_path)
+    if acq_time is not None:
         logger.debug(f'Loaded {scans_fname} scans file to set '
                      f'acq_time as {acq_time}.')
         # First set measurement date to None and then call call anonymize() to
@@ -292,6 +303,86 @@ def _handle_scans_reading(scans_fname, raw, bids_path):
     return raw
 
 
+_EDF_MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP',
+               'OCT', 'NOV', 'DEC')
+
+
+def _read_edf_meas_date(fname):
+    """Read the measurement date from the header of an EDF or BDF file."""
+    with open(fname, 'rb') as fid:
+        fid.seek(88)  # rec_info field starts 88 bytes in
+        rec_info = fid.read(80).decode('latin-1').rstrip().split(' ')
+        meas_date = fid.read(8).decode('latin-1')
+        meas_time = fid.read(8).decode('latin-1')
+
+    # as in MNE, the 4-digit year of the recording info is preferred. The month
+    # is matched against the English abbreviations of the EDF+ specification,
+    # strptime's %b would depend on the locale
+    startdate = None
+    if len(rec_info) == 5 and rec_info[1].count('-') == 2:
+        day, month, year = rec_info[1].split('-')
+        if day.isdigit() and month.upper() in _EDF_MONTHS and year.isdigit():
+            startdate = (int(day), _EDF_MONTHS.index(month.upper()) + 1,
+                         int(year))
+
+    try:
+        if startdate is None:
+            day, month, year = [int(x) for x in meas_date.split('.')]
+            year = year + 2000 if year < 85 else year + 1900
+        else:
+            day, month, year = startdate
+        hour, minute, sec = [int(x) for x in meas_time.split('.')]
+        return datetime(year, month, day, hour, minute, sec,
+                        tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def _read_brainvision_meas_date(fname):
+    """Read the measurement date from the marker file of a BrainVision file."""
+    from mne.io.brainvision.brainvision import _str_to_meas_date
+
+    _, vmrk_fname = _get_brainvision_paths(fname)
+    # the date of the first "New Segment" marker, as read by MNE
+    regexp = re.compile(r'^Mk\d+=New Segment,.*,\d+,\d+,-?\d+,(\d{20})$')
+    with open(vmrk_fname, 'r', encoding='latin-1') as fid:
+        for line in fid:
+            match = regexp.match(line.strip())
+            if match:
+                return _str_to_meas_date(match.group(1))
+    return None
+
+
+def _read_meas_date(bids_path):
+    """Read the measurement date of a recording without reading its data.
+
+    The acquisition time in the scans.tsv file takes precedence, as in
+    :func:`mne_bids.read_raw_bids`. Otherwise, only the header of FIF, EDF,
+    BDF and BrainVision files is read, and other recordings are read with
+    :func:`mne_bids.read_raw_bids`.
+    """
+    scans_fname = BIDSPath(
+        subject=bids_path.subject, session=bids_path.session,
+        suffix='scans', extension='.tsv',
+        root=bids_path.root
+    ).fpath
+    if scans_fname.exists():
+        acq_time = _get_scans_acq_time(scans_fname, bids_path)
+        if acq_time is not None:
+            return acq_time
+
+    fname = bids_path.fpath
+    ext = bids_path.extension.lower()
+    if ext == '.fif':
+        return mne.io.read_info(fname, verbose=False)['meas_date']
+    elif ext in ('.edf', '.bdf'):
+        return _read_edf_meas_date(fname)
+    elif ext == '.vhdr':
+        return _read_brainvision_meas_date(fname)
+    return read_raw_bids(bids_path=bids_path,
+                         verbose='error').info['meas_date']
+
+
 def _handle_info_reading(sidecar_fname, raw):
     """Read associated sidecar JSON and populate raw.
 
@@ -695,34 +786,46 @@ def read_raw_bids(bids_path, extra_params=None, verbose=None):
     raw = _read_raw(raw_path, electrode=None, hsp=None, hpi=None,
                     config_path=config_path, **extra_params)
 
-    # Try to find an associated events.tsv to get information about the
-    # events in the recorded data
-    events_fname = _find_matching_sidecar(bids_path, suffix='events',
-                                          extension='.tsv',
-                                          on_error='warn')
+    # The sidecars are resolved against one listing of the subject's files
+    on_error = 'warn' if suffix == 'ieeg' else 'ignore'
+    with _resolve_sidecars(bids_root):
+        # Try to find an associated events.tsv to get information about the
+        # events in the recorded data
+        events_fname = _find_matching_sidecar(bids_path, suffix='events',
+                                              extension='.tsv',
+                                              on_error='warn')
+
+        # Try to find an associated channels.tsv to get information about
+        # the status and type of present channels
+        channels_fname = _find_matching_sidecar(bids_path,
+                                                suffix='channels',
+                                                extension='.tsv',
+                                                on_error='warn')
+
+        # Try to find an associated electrodes.tsv and coordsystem.json
+        # to get information about the status and type of present channels
+        electrodes_fname = _find_matching_sidecar(bids_path,
+                                                  suffix='electrodes',
+                                                  extension='.tsv',
+                                                  on_error=on_error)
+        coordsystem_fname = _find_matching_sidecar(bids_path,
+                                                   suffix='coordsystem',
+                                                   extension='.json',
+                                                   on_error=on_error)
+
+        # Try to find an associated sidecar .json to get information about
+        # the recording snapshot
+        sidecar_fname = _find_matching_sidecar(bids_path,
+                                               suffix=datatype,
+                                               extension='.json',
+                                               on_error='warn')
+
     if events_fname is not None:
         raw = _handle_events_reading(events_fname, raw)
 
-    # Try to find an associated channels.tsv to get information about the
-    # status and type of present channels
-    channels_fname = _find_matching_sidecar(bids_path,
-                                            suffix='channels',
-                                            extension='.tsv',
-                                            on_error='warn')
     if channels_fname is not None:
         raw = _handle_channels_reading(channels_fname, raw)
 
-    # Try to find an associated electrodes.tsv and coordsystem.json
-    # to get information about the status and type of present channels
-    on_error = 'warn' if suffix == 'ieeg' else 'ignore'
-    electrodes_fname = _find_matching_sidecar(bids_path,
-                                              suffix='electrodes',
-                                              extension='.tsv',
-                                              on_error=on_error)
-    coordsystem_fname = _find_matching_sidecar(bids_path,
-                                               suffix='coordsystem',
-                                               extension='.json',
-                                               on_error=on_error)
     if electrodes_fname is not None:
         if coordsystem_fname is None:
             raise RuntimeError(f"BIDS mandates that the coordsystem.json "
@@ -733,12 +836,6 @@ def read_raw_bids(bids_path, extra_params=None, verbose=None):
             _read_dig_bids(electrodes_fname, coordsystem_fname,
                            raw=raw, datatype=datatype)
 
-    # Try to find an associated sidecar .json to get information about the
-    # recording snapshot
-    sidecar_fname = _find_matching_sidecar(bids_path,
-                                           suffix=datatype,
-                                           extension='.json',
-                                           on_error='warn')
     if sidecar_fname is not None:
         raw = _handle_info_reading(sidecar_fname, raw)
 
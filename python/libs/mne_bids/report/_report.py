@@ -3,6 +3,7 @@
 #
 # License: BSD-3-Clause
 import json
+import os
 import os.path as op
 import textwrap
 from pathlib import Path
@@ -12,10 +13,14 @@ import jinja2
 from mne.utils import warn, logger, verbose
 
 from mne_bids.config import DOI, ALLOWED_DATATYPES
+from mne_bids.index import _query_index
 from mne_bids.tsv_handler import _from_tsv
 from mne_bids.path import (get_bids_path_from_fname, get_datatypes,
                            get_entity_vals, BIDSPath,
-                           _parse_ext, _find_matching_sidecar)
+                           _parse_ext, _find_matching_sidecar,
+                           _resolve_sidecars)
+from mne_bids.utils import (_read_file_cache, _write_file_cache,
+                            _parallel_map)
 
 
 jinja_env = jinja2.Environment(
@@ -236,7 +241,71 @@ def _summarize_participants_tsv(root):
     return template_dict
 
 
-def _summarize_scans(root, session=None):
+# bump when the format of the saved facts changes
+_FACTS_CACHE_VERSION = 1
+
+
+def _read_file_facts(fname, kind):
+    """Read the facts of one file that the scans summary needs.
+
+    Parameters
+    ----------
+    fname : str
+        The path of the file.
+    kind : str
+        ``'scans'`` for a scans.tsv file, ``'sidecar'`` for the JSON sidecar
+        of a recording, or ``'channels'`` for a channels.tsv file.
+
+    Returns
+    -------
+    facts : list | dict
+        The file names listed in a scans.tsv file, the metadata of a sidecar
+        (only the keys that are present), or the number of channels, bad
+        channels and good channels of a channels.tsv file.
+    """
+    if kind == 'scans':
+        return list(_from_tsv(fname)['filename'])
+    elif kind == 'channels':
+        channels_tsv = _from_tsv(fname)
+        return [len(channels_tsv['name']),
+                channels_tsv['status'].count('bad'),
+                channels_tsv['status'].count('good')]
+
+    with open(fname, 'r', encoding='utf-8-sig') as fin:
+        sidecar_json = json.load(fin)
+    # REQUIRED kwargs
+    facts = {key: sidecar_json[key]
+             for key in ('SamplingFrequency', 'PowerLineFrequency')}
+    # RECOMMENDED kwargs
+    for key in ('SoftwareFilters', 'Manufacturer', 'RecordingDuration'):
+        if key in sidecar_json:
+            facts[key] = sidecar_json[key]
+    return facts
+
+
+def _get_file_facts(fnames, kind, cache, n_jobs=1):
+    """Get the facts of files, reading only those not found in ``cache``.
+
+    ``cache`` maps the real path of the files to their modification time,
+    size, kind and facts. It is updated with the files that were read.
+    """
+    stats = dict()
+    for fname in fnames:
+        fname = op.realpath(fname)
+        stat = os.stat(fname)
+        stats[fname] = [stat.st_mtime_ns, stat.st_size, kind]
+    pending = [fname for fname in stats
+               if cache.get(fname, [None])[:3] != stats[fname]]
+    if pending:
+        logger.info(f'Reading {len(pending)} {kind} files '
+                    f'({len(stats) - len(pending)} unchanged)')
+    for fname, facts in zip(pending, _parallel_map(
+            _read_file_facts, [(fname, kind) for fname in pending], n_jobs)):
+        cache[fname] = stats[fname] + [facts]
+    return [cache[op.realpath(fname)][3] for fname in fnames]
+
+
+def _summarize_scans(root, session=None, n_jobs=1, cache_fname=None):
     """Summarize scans in BIDS root directory.
 
     Summarizes scans only if there is a *_scans.tsv file.
@@ -247,6 +316,10 @@ def _summarize_scans(root, session=None):
         The path of the root of the BIDS compatible folder.
     session : str, optional
         The session for a item. Corresponds to "ses".
+    n_jobs : int
+        The number of processes reading the files in parallel.
+    cache_fname : path-like | None
+        A JSON file where the facts read from each file are saved, if any.
 
     Returns
     -------
@@ -260,7 +333,10 @@ def _summarize_scans(root, session=None):
     else:
         search_str = f'*ses-{session}' \
                      f'*_scans.tsv'
-    scans_fpaths = list(root.rglob(search_str))
+    scans_fpaths = _query_index(root, 'name GLOB ?', (search_str,))
+    if scans_fpaths is None:
+        scans_fpaths = root.rglob(search_str)
+    scans_fpaths = sorted(scans_fpaths)
     if len(scans_fpaths) == 0:
         warn('No *scans.tsv files found. Currently, '
              'we do not generate a report without the scans.tsv files.')
@@ -268,9 +344,53 @@ def _summarize_scans(root, session=None):
 
     logger.info(f'Summarizing scans.tsv files {scans_fpaths}...')
 
+    cache = dict()
+    if cache_fname is not None:
+        cache = _read_file_cache(cache_fname, _FACTS_CACHE_VERSION)
+    old_cache = dict(cache)
+
+    # find the sidecar and channels.tsv file of each scan
+    recordings = []
+    all_scans = _get_file_facts(scans_fpaths, 'scans', cache, n_jobs)
+    with _resolve_sidecars(root):
+        for scans in all_scans:
+            for scan in scans:
+                # summarize metadata of recordings
+                bids_path, _ = _parse_ext(scan)
+                datatype = op.dirname(scan)
+                if datatype not in ALLOWED_DATATYPES:
+                    continue
+
+                # convert to BIDS Path
+                if not isinstance(bids_path, BIDSPath):
+                    bids_path = get_bids_path_from_fname(bids_path)
+                bids_path.root = root
+
+                # XXX: improve to allow emptyroom
+                if bids_path.subject == 'emptyroom':
+                    recordings.append((datatype, None, None))
+                    continue
+
+                sidecar_fname = _find_matching_sidecar(bids_path=bids_path,
+                                                       suffix=datatype,
+                                                       extension='.json')
+                channels_fname = None
+                if datatype in ['meg', 'eeg', 'ieeg']:
+                    channels_fname = _find_matching_sidecar(
+                        bids_path=bids_path, suffix='channels',
+                        extension='.tsv')
+                recordings.append((datatype, sidecar_fname, channels_fname))
+
+    sidecars = [sidecar for _, sidecar, _ in recordings if sidecar]
+    channels = [channel for _, _, channel in recordings if channel]
+    sidecars = _get_file_facts(sidecars, 'sidecar', cache, n_jobs)
+    channels = _get_file_facts(channels, 'channels', cache, n_jobs)
+    if cache_fname is not None and cache != old_cache:
+        _write_file_cache(cache_fname, _FACTS_CACHE_VERSION, cache)
+
     # summarize sidecar.json, channels.tsv template
-    sidecar_dict = _summarize_sidecar_json(root, scans_fpaths)
-    channels_dict = _summarize_channels_tsv(root, scans_fpaths)
+    sidecar_dict = _summarize_sidecar_json(len(recordings), sidecars)
+    channels_dict = _summarize_channels_tsv(channels)
     template_dict = dict()
     template_dict.update(**sidecar_dict)
     template_dict.update(**channels_dict)
@@ -278,16 +398,16 @@ def _summarize_scans(root, session=None):
     return template_dict
 
 
-def _summarize_sidecar_json(root, scans_fpaths):
-    """Summarize scans in BIDS root directory.
+def _summarize_sidecar_json(n_scans, sidecars):
+    """Summarize the sidecar.json files of the scans.
 
     Parameters
     ----------
-    root : path-like
-        The path of the root of the BIDS compatible folder.
-    scans_fpaths : list
-        A list of all *_scans.tsv files in ``root``. The summary
-        will occur for all scans listed in the *_scans.tsv files.
+    n_scans : int
+        The number of scans listed in the *_scans.tsv files.
+    sidecars : list of dict
+        The metadata read from the sidecar.json file of each scan, except
+        for the empty-room recordings.
 
     Returns
     -------
@@ -295,58 +415,29 @@ def _summarize_sidecar_json(root, scans_fpaths):
         A dictionary of values for various template strings.
 
     """
-    n_scans = 0
     powerlinefreqs, sfreqs = set(), set()
     manufacturers = set()
     length_recordings = []
-
-    # loop through each scan
-    for scan_fpath in scans_fpaths:
-        # load in the scans.tsv file
-        # and read metadata for each scan
-        scans_tsv = _from_tsv(scan_fpath)
-        scans = scans_tsv['filename']
-        for scan in scans:
-            # summarize metadata of recordings
-            bids_path, ext = _parse_ext(scan)
-            datatype = op.dirname(scan)
-            if datatype not in ALLOWED_DATATYPES:
-                continue
-
-            n_scans += 1
-
-            # convert to BIDS Path
-            if not isinstance(bids_path, BIDSPath):
-                bids_path = get_bids_path_from_fname(bids_path)
-            bids_path.root = root
-
-            # XXX: improve to allow emptyroom
-            if bids_path.subject == 'emptyroom':
-                continue
-
-            sidecar_fname = _find_matching_sidecar(bids_path=bids_path,
-                                                   suffix=datatype,
-                                                   extension='.json')
-            with open(sidecar_fname, 'r', encoding='utf-8-sig') as fin:
-                sidecar_json = json.load(fin)
-
-            # aggregate metadata from each scan
-            # REQUIRED kwargs
-            sfreq = sidecar_json['SamplingFrequency']
-            powerlinefreq = str(sidecar_json['PowerLineFrequency'])
-            software_filters = sidecar_json.get('SoftwareFilters')
-            if not software_filters:
-                software_filters = 'n/a'
-
-            # RECOMMENDED kwargs
-            manufacturer = sidecar_json.get('Manufacturer', 'n/a')
-            record_duration = sidecar_json.get('RecordingDuration', 'n/a')
-
-            sfreqs.add(str(np.round(sfreq, 2)))
-            powerlinefreqs.add(str(powerlinefreq))
-            if manufacturer != 'n/a':
-                manufacturers.add(manufacturer)
-            length_recordings.append(record_duration)
+    software_filters = 'n/a'
+
+    # aggregate metadata from each scan
+    for sidecar_json in sidecars:
+        # REQUIRED kwargs
+        sfreq = sidecar_json['SamplingFrequency']
+        powerlinefreq = str(sidecar_json['PowerLineFrequency'])
+        software_filters = sidecar_json.get('SoftwareFilters')
+        if not software_filters:
+            software_filters = 'n/a'
+
+        # RECOMMENDED kwargs
+        manufacturer = sidecar_json.get('Manufacturer', 'n/a')
+        record_duration = sidecar_json.get('RecordingDuration', 'n/a')
+
+        sfreqs.add(str(np.round(sfreq, 2)))
+        powerlinefreqs.add(str(powerlinefreq))
+        if manufacturer != 'n/a':
+            manufacturers.add(manufacturer)
+        length_recordings.append(record_duration)
 
     # XXX: length summary is only allowed, if no 'n/a' was found
     if any([dur == 'n/a' for dur in length_recordings]):
@@ -363,73 +454,34 @@ def _summarize_sidecar_json(root, scans_fpaths):
     return template_dict
 
 
-def _summarize_channels_tsv(root, scans_fpaths):
-    """Summarize channels.tsv data in BIDS root directory.
+def _summarize_channels_tsv(channels):
+    """Summarize channels.tsv data of the scans.
 
     Currently, summarizes all REQUIRED components of channels
     data, and some RECOMMENDED and OPTIONAL components.
 
     Parameters
     ----------
-    root : path-like
-        The path of the root of the BIDS compatible folder.
-    scans_fpaths : list
-        A list of all *_scans.tsv files in ``root``. The summary
-        will occur for all scans listed in the *_scans.tsv files.
+    channels : list of list
+        The number of channels, bad channels and good channels in the
+        channels.tsv file of each (M/I)EEG scan.
 
     Returns
     -------
     template_dict : dict
         A dictionary of values for various template strings.
     """
-    root = Path(root)
-
     # keep track of channel type, status
-    ch_status_count = {'bad': [], 'good': []}
-    ch_count = []
-
-    # loop through each scan
-    for scan_fpath in scans_fpaths:
-        # load in the scans.tsv file
-        # and read metadata for each scan
-        scans_tsv = _from_tsv(scan_fpath)
-        scans = scans_tsv['filename']
-        for scan in scans:
-            # summarize metadata of recordings
-            bids_path, _ = _parse_ext(scan)
-            datatype = op.dirname(scan)
-            if datatype not in ['meg', 'eeg', 'ieeg']:
-                continue
-
-            # convert to BIDS Path
-            if not isinstance(bids_path, BIDSPath):
-                bids_path = get_bids_path_from_fname(bids_path)
-            bids_path.root = root
-
-            # XXX: improve to allow emptyroom
-            if bids_path.subject == 'emptyroom':
-                continue
-
-            channels_fname = _find_matching_sidecar(bids_path=bids_path,
-                                                    suffix='channels',
-                                                    extension='.tsv')
-
-            # summarize channels.tsv
-            channels_tsv = _from_tsv(channels_fname)
-            for status in ch_status_count.keys():
-                ch_status = [ch for ch in channels_tsv['status']
-                             if ch == status]
-                ch_status_count[status].append(len(ch_status))
-            ch_count.append(len(channels_tsv['name']))
+    ch_count, n_bad, n_good = np.array(channels, float).reshape(-1, 3).T
 
     # create summary template strings for status
     template_dict = {
         'mean_chs': np.mean(ch_count),
         'std_chs': np.std(ch_count),
-        'mean_good_chs': np.mean(ch_status_count['good']),
-        'std_good_chs': np.std(ch_status_count['good']),
-        'mean_bad_chs': np.mean(ch_status_count['bad']),
-        'std_bad_chs': np.std(ch_status_count['bad']),
+        'mean_good_chs': np.mean(n_good),
+        'std_good_chs': np.std(n_good),
+        'mean_bad_chs': np.mean(n_bad),
+        'std_bad_chs': np.std(n_bad),
     }
     for key, val in template_dict.items():
         template_dict[key] = round(val, 2)
@@ -437,7 +489,8 @@ def _summarize_channels_tsv(root, scans_fpaths):
 
 
 @verbose
-def make_report(root, session=None, verbose=None):
+def make_report(root, session=None, n_jobs=1, cache_fname=None,
+                verbose=None):
     """Create a methods paragraph string from BIDS dataset.
 
     Summarizes the REQUIRED components in the BIDS specification
@@ -455,6 +508,13 @@ def make_report(root, session=None, verbose=None):
         The path of the root of the BIDS compatible folder.
     session : str | None
             The (optional) session for a item. Corresponds to "ses".
+    n_jobs : int
+        The number of processes reading the scans.tsv, sidecar and
+        channels.tsv files in parallel, all CPUs if negative.
+    cache_fname : path-like | None
+        If not ``None``, a JSON file where the facts read from each scans.tsv,
+        sidecar and channels.tsv file are saved. Files whose modification time
+        and size did not change since they were read are not read again.
     %(verbose)s
 
     Returns
@@ -485,7 +545,8 @@ def make_report(root, session=None, verbose=None):
     participant_summary = _summarize_participants_tsv(root)
 
     # RECOMMENDED: scans summary
-    scans_summary = _summarize_scans(root, session=session)
+    scans_summary = _summarize_scans(root, session=session, n_jobs=n_jobs,
+                                     cache_fname=cache_fname)
 
     dataset_agnostic_summary = scans_summary.copy()
     dataset_agnostic_summary['system'] = _pretty_str(modalities)
@@ -5,11 +5,53 @@
 # License: BSD-3-Clause
 
 
+import os
+import os.path as op
+from collections import defaultdict
+
 from mne_bids import BIDSPath, get_datatypes
 from mne_bids.config import EPHY_ALLOWED_DATATYPES
+from mne_bids.utils import (_read_file_cache, _write_file_cache,
+                            _parallel_map)
+
+# bump when the format of the saved counts changes
+_COUNTS_CACHE_VERSION = 1
+
+
+def _count_trial_types(fname):
+    """Count the trial types in one events.tsv.
 
+    Only the ``trial_type`` column (or ``stim_type`` in some old files) is
+    parsed, with the same type inference and missing values as a full
+    ``pandas.read_csv``.
 
-def count_events(root_or_path, datatype='auto'):
+    Returns
+    -------
+    n_rows : int
+        The number of events.
+    counts : list of list | None
+        The ``[trial_type, count]`` pairs, or ``None`` if the file has no
+        ``trial_type`` column.
+    """
+    import pandas as pd
+
+    with open(fname, 'r', encoding='utf-8-sig') as fid:
+        columns = fid.readline().rstrip('\r\n').split('\t')
+    column = None
+    for name in ('trial_type', 'stim_type'):
+        if name in columns:
+            column = name
+            break
+
+    df = pd.read_csv(fname, delimiter='\t', usecols=[column or columns[0]])
+    if column is None:
+        return len(df), None
+    counts = df[column].value_counts(sort=False)
+    return len(df), [[label, int(count)] for label, count
+                     in zip(counts.index.tolist(), counts.tolist())]
+
+
+def count_events(root_or_path, datatype='auto', n_jobs=1, cache_fname=None):
     """Count events present in dataset.
 
     Parameters
@@ -26,6 +68,13 @@ def count_events(root_or_path, datatype='auto'):
         attribute set, then this data type will be used. Otherwise, only
         one data type should be present in the dataset to avoid any
         ambiguity.
+    n_jobs : int
+        The number of processes counting the events.tsv files in parallel,
+        all CPUs if negative.
+    cache_fname : path-like | None
+        If not ``None``, a JSON file where the counts of each events.tsv
+        file are saved. Files whose modification time and size did not
+        change since they were counted are not read again.
 
     Returns
     -------
@@ -63,44 +112,66 @@ def count_events(root_or_path, datatype='auto'):
 
     bids_path.update(datatype=datatype)
 
-    tasks = sorted(set([bp.task for bp in bids_path.match()]))
+    bids_paths = bids_path.match()
+    tasks = sorted(set([bp.task for bp in bids_paths]))
+
+    # count the files that are not in the cache, or changed since
+    files = dict()
+    if cache_fname is not None:
+        files = _read_file_cache(cache_fname, _COUNTS_CACHE_VERSION)
+    stats = dict()
+    for bp in bids_paths:
+        fname = op.realpath(bp.fpath)
+        stat = os.stat(fname)
+        stats[fname] = [stat.st_mtime_ns, stat.st_size]
+    pending = [fname for fname in stats if files.get(fname, [None])[:2] !=
+               stats[fname]]
+    for fname, (n_rows, counts) in zip(pending, _parallel_map(
+            _count_trial_types, [(fname,) for fname in pending], n_jobs)):
+        files[fname] = stats[fname] + [n_rows, counts]
+    if cache_fname is not None and pending:
+        _write_file_cache(cache_fname, _COUNTS_CACHE_VERSION, files)
+
+    bids_paths_by_task = defaultdict(list)
+    for bp in bids_paths:
+        bids_paths_by_task[bp.task].append(bp)
 
     all_counts = []
 
     for task in tasks:
-        bids_path.update(task=task)
-
-        all_df = []
-        for bp in bids_path.match():
-            df = pd.read_csv(str(bp), delimiter='\t')
-            df['subject'] = bp.subject
+        # one row per subject, session, run and trial type, with its count
+        rows = []
+        has_trial_type = False
+        for bp in bids_paths_by_task[task]:
+            _, _, n_rows, counts = files[op.realpath(bp.fpath)]
+            entities = dict(subject=bp.subject)
             if bp.session is not None:
-                df['session'] = bp.session
+                entities['session'] = bp.session
             if bp.run is not None:
-                df['run'] = bp.run
-            all_df.append(df)
-
-        if not all_df:
+                entities['run'] = bp.run
+            if counts is None:
+                rows.append(dict(entities, n=n_rows))
+                continue
+            has_trial_type = True
+            rows.extend(dict(entities, trial_type=label, n=count)
+                        for label, count in counts)
+
+        if not rows:
             continue
 
-        df = pd.concat(all_df)
+        df = pd.DataFrame(rows)
         groups = ['subject']
         if bp.session is not None:
             groups.append('session')
         if bp.run is not None:
             groups.append('run')
 
-        if 'stim_type' in df.columns:
-            # Deal with some old files that use stim_type rather than
-            # trial_type
-            df = df.rename(columns={"stim_type": "trial_type"})
-
         # There are datasets out there without a `trial_type` or `stim_type`
         # column.
-        if 'trial_type' in df.columns:
+        if has_trial_type:
             groups.append('trial_type')
 
-        counts = df.groupby(groups).size()
+        counts = df.groupby(groups)['n'].sum()
         counts = counts.unstack()
 
         if 'BAD_ACQ_SKIP' in counts.columns:
@@ -4,8 +4,11 @@
 #          Stefan Appelhoff <stefan.appelhoff@mailbox.org>
 #
 # License: BSD-3-Clause
+import os
 import os.path as op
 import datetime
+import hashlib
+import stat
 from pathlib import Path
 
 import pytest
@@ -20,7 +23,10 @@ from mne_bids.copyfiles import (_get_brainvision_encoding,
                                 copyfile_brainvision,
                                 copyfile_edf,
                                 copyfile_eeglab,
-                                copyfile_kit)
+                                copyfile_kit,
+                                _copyfile_checksum,
+                                _read_checksums,
+                                _update_checksums)
 
 
 base_path = op.join(op.dirname(mne.__file__), 'io')
@@ -193,6 +199,84 @@ def test_copyfile_edfbdf_uppercase(tmp_path):
         assert Path(new_name).with_suffix(ext).exists()
 
 
+def test_copyfile_checksum(tmp_path):
+    """Test copying with header patches and an inline checksum."""
+    src = tmp_path / 'src.edf'
+    content = bytes(range(256)) * 40
+    src.write_bytes(content)
+
+    # patches are applied across buffer boundaries
+    dest = tmp_path / 'dest.edf'
+    patches = {8: b'X X X X'.ljust(80), 1000: b'abc'}
+    checksum = _copyfile_checksum(src, dest, patches, buffer_size=50)
+    want = bytearray(content)
+    want[8:88] = patches[8]
+    want[1000:1003] = b'abc'
+    assert dest.read_bytes() == want
+    assert checksum == hashlib.sha256(want).hexdigest()
+    assert src.read_bytes() == content
+
+    # the progress is reported per buffer, and an error stops the copy
+    copied = []
+    _copyfile_checksum(src, dest, buffer_size=4096, progress=copied.append)
+    assert copied == [4096, 4096, len(content) - 8192]
+
+    def _cancel(n_bytes):
+        raise RuntimeError('cancelled')
+
+    with pytest.raises(RuntimeError, match='cancelled'):
+        _copyfile_checksum(src, dest, buffer_size=4096, progress=_cancel)
+    assert not dest.exists()
+
+    checksum = copyfile_edf(src, dest, header={'id_info': 'X X X X'})
+    assert dest.read_bytes()[8:88] == b'X X X X'.ljust(80)
+    assert checksum == hashlib.sha256(dest.read_bytes()).hexdigest()
+    with pytest.raises(ValueError, match='Unknown EDF header field'):
+        copyfile_edf(src, dest, header={'startdate': '01.01.85'})
+
+    # a cached copy is reused when the source and the header did not change
+    cache_dir = tmp_path / 'cache'
+    dests = [tmp_path / f'cached_{ii}.edf' for ii in range(3)]
+    checksums = [copyfile_edf(src, dests[0], header={'id_info': 'X X X X'},
+                              cache_dir=cache_dir),
+                 copyfile_edf(src, dests[1], header={'id_info': 'X X X X'},
+                              cache_dir=cache_dir),
+                 copyfile_edf(src, dests[2], header={'id_info': 'Y Y Y Y'},
+                              cache_dir=cache_dir)]
+    assert checksums[0] == checksums[1] == checksum != checksums[2]
+    assert dests[1].read_bytes() == dests[0].read_bytes()
+    assert dests[2].read_bytes()[8:88] == b'Y Y Y Y'.ljust(80)
+    # the copies are linked to the read-only cache, and are replaced rather
+    # than written through when copied again
+    copies = [p for p in (cache_dir / 'objects').iterdir()
+              if p.suffix not in ('.sha256', '.tmp')]
+    assert len(copies) == 2
+    assert not any(p.stat().st_mode & stat.S_IWUSR for p in copies)
+    cached = dests[0].read_bytes()
+    assert copyfile_edf(src, dests[1], header={'id_info': 'Y Y Y Y'}) != \
+        checksum
+    assert dests[0].read_bytes() == cached
+    assert copyfile_edf(src, dests[1], header={'id_info': 'X X X X'},
+                        cache_dir=cache_dir) == checksum
+    assert dests[1].read_bytes() == cached
+
+    # the least recently used copies are evicted beyond cache_size
+    copyfile_edf(src, dests[1], header={'id_info': 'Z Z Z Z'},
+                 cache_dir=cache_dir, cache_size=2 * len(content))
+    copies = [p for p in (cache_dir / 'objects').iterdir()
+              if p.suffix not in ('.sha256', '.tmp')]
+    assert len(copies) == 2
+
+    # the manifest keeps one sorted entry per file
+    _update_checksums(tmp_path, {'sub-01/b.edf': 'b' * 64})
+    _update_checksums(tmp_path, {'sub-01/a.edf': 'a' * 64,
+                                 'sub-01/b.edf': checksum})
+    assert _read_checksums(tmp_path / 'checksums.sha256') == {
+        'sub-01/a.edf': 'a' * 64, 'sub-01/b.edf': checksum}
+    assert (tmp_path / 'checksums.sha256').read_text().splitlines()[0] == \
+        'a' * 64 + '  sub-01/a.edf'
+
+
 @pytest.mark.parametrize('fname',
                          ('test_raw.set', 'test_raw_chanloc.set',
                           'test_raw_2021.set'))
@@ -0,0 +1,171 @@
+"""Test the persistent index of BIDS file names."""
+# License: BSD-3-Clause
+import glob
+import os
+import os.path as op
+from pathlib import Path
+
+import pytest
+
+import mne_bids.index
+from mne_bids import BIDSPath, get_entity_vals
+from mne_bids.index import _query_index, _get_index_fname
+from mne_bids.path import _find_matching_sidecar, _resolve_sidecars
+
+
+def _touch(root, *fnames):
+    for fname in fnames:
+        fname = Path(root, fname)
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        fname.touch()
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    """Keep the indices in a temporary directory."""
+    index_dir = tmp_path / 'index'
+    monkeypatch.setenv('MNE_BIDS_INDEX_DIR', str(index_dir))
+    return index_dir
+
+
+def test_query_index(tmp_path, index_dir, monkeypatch):
+    """Test that the index follows changes of the dataset."""
+    root = tmp_path / 'bids'
+    _touch(root, 'participants.tsv',
+           'sub-01/ses-01/eeg/sub-01_ses-01_task-rest_eeg.edf',
+           'sub-01/ses-01/eeg/sub-01_ses-01_task-rest_eeg.json',
+           'sub-02/eeg/sub-02_task-rest_run-01_eeg.edf')
+
+    def _expected(pattern):
+        return sorted(Path(p) for p in glob.glob(
+            op.join(root, '**', pattern), recursive=True))
+
+    assert sorted(_query_index(root, "name GLOB '*.edf'")) == \
+        _expected('*.edf')
+    assert op.isfile(_get_index_fname(root))
+
+    # changed directories are listed again, removed ones are dropped
+    _touch(root, 'sub-03/eeg/sub-03_task-rest_eeg.edf',
+           'sub-01/ses-01/eeg/sub-01_ses-01_task-other_eeg.edf')
+    os.remove(root / 'sub-02' / 'eeg' / 'sub-02_task-rest_run-01_eeg.edf')
+    os.rmdir(root / 'sub-02' / 'eeg')
+    for _ in range(2):
+        assert sorted(_query_index(root, "name GLOB '*.edf'")) == \
+            _expected('*.edf')
+
+    paths = _query_index(root, "task = 'rest'", start='sub-01')
+    assert sorted(p.name for p in paths) == \
+        ['sub-01_ses-01_task-rest_eeg.edf',
+         'sub-01_ses-01_task-rest_eeg.json']
+
+    # an unusable index directory leaves the search to the caller
+    (tmp_path / 'file').touch()
+    monkeypatch.setenv('MNE_BIDS_INDEX_DIR', str(tmp_path / 'file' / 'x'))
+    assert _query_index(root, "name GLOB '*.edf'") is None
+
+
+def test_index_dir(tmp_path, index_dir, monkeypatch):
+    """Test that indices are only kept in a configured directory."""
+    root = tmp_path / 'bids'
+    _touch(root, 'sub-01/eeg/sub-01_task-rest_eeg.edf')
+
+    monkeypatch.delenv('MNE_BIDS_INDEX_DIR')
+    monkeypatch.setattr(mne_bids.index, 'get_config', lambda key: None)
+    assert _get_index_fname(root) is None
+    assert _query_index(root, "name GLOB '*.edf'") is None
+    assert not index_dir.exists()
+    monkeypatch.undo()
+
+    # indices that were not used for a long time are removed
+    monkeypatch.setenv('MNE_BIDS_INDEX_DIR', str(index_dir))
+    index_dir.mkdir()
+    stale = index_dir / 'stale.sqlite'
+    stale.touch()
+    os.utime(stale, (0, 0))
+    _query_index(root, "name GLOB '*.edf'")
+    assert os.listdir(index_dir) == [op.basename(_get_index_fname(root))]
+
+
+@pytest.mark.parametrize('use_index', (True, False))
+def test_index_lookups(tmp_path, index_dir, monkeypatch, use_index):
+    """Test the path lookups, with and without an index."""
+    if not use_index:
+        monkeypatch.delenv('MNE_BIDS_INDEX_DIR')
+        monkeypatch.setattr(mne_bids.index, 'get_config', lambda key: None)
+    root = tmp_path / 'bids'
+    _touch(root, 'sub-01/ses-01/eeg/sub-01_ses-01_task-rest_eeg.edf',
+           'sub-01/ses-01/eeg/sub-01_ses-01_task-rest_eeg.json',
+           'sub-01/ses-01/eeg/sub-01_ses-01_task-rest_channels.tsv',
+           'sub-01/ses-01/sub-01_ses-01_scans.tsv',
+           'sub-02/ses-01/eeg/sub-02_ses-01_task-count_eeg.edf',
+           'sub-02/ses-01/.hidden/sub-02_ses-01_task-count_eeg.json',
+           'derivatives/sub-03/eeg/sub-03_task-rest_eeg.edf')
+
+    assert get_entity_vals(root, 'subject') == ['01', '02']
+    assert get_entity_vals(root, 'task') == ['count', 'rest']
+    assert get_entity_vals(root, 'subject', ignore_dirs=None) == \
+        ['01', '02', '03']
+
+    bids_path = BIDSPath(root=root, subject='01', session='01', task='rest',
+                         datatype='eeg', suffix='eeg', extension='.edf')
+    assert [p.basename for p in bids_path.match()] == \
+        ['sub-01_ses-01_task-rest_eeg.edf']
+    matches = BIDSPath(root=root, task='rest').match()
+    assert sorted(p.basename for p in matches) == \
+        ['sub-01_ses-01_task-rest_channels.tsv',
+         'sub-01_ses-01_task-rest_eeg.edf',
+         'sub-03_task-rest_eeg.edf']
+
+    assert _find_matching_sidecar(bids_path, suffix='channels',
+                                  extension='.tsv') == \
+        str(root / 'sub-01/ses-01/eeg/sub-01_ses-01_task-rest_channels.tsv')
+    assert _find_matching_sidecar(bids_path, suffix='scans',
+                                  extension='.tsv', on_error='ignore') is None
+
+    # hidden directories are not searched
+    bids_path.update(subject='02', task='count')
+    assert _find_matching_sidecar(bids_path, extension='.json',
+                                  on_error='ignore') is None
+
+    # new files are found
+    _touch(root, 'sub-02/ses-01/eeg/sub-02_ses-01_task-count_eeg.json')
+    assert _find_matching_sidecar(bids_path, extension='.json') == \
+        str(root / 'sub-02/ses-01/eeg/sub-02_ses-01_task-count_eeg.json')
+    assert index_dir.exists() == use_index
+
+
+def test_resolve_sidecars(tmp_path, index_dir, monkeypatch):
+    """Test that sidecar lookups are cached for the duration of a block."""
+    import mne_bids.path
+    n_queries = [0]
+    query_index = mne_bids.path._query_index
+
+    def _counting_query_index(*args, **kwargs):
+        n_queries[0] += 1
+        return query_index(*args, **kwargs)
+
+    monkeypatch.setattr(mne_bids.path, '_query_index', _counting_query_index)
+
+    root = tmp_path / 'bids'
+    _touch(root, 'sub-01/eeg/sub-01_task-rest_run-01_eeg.edf',
+           'sub-01/eeg/sub-01_task-rest_channels.tsv',
+           'sub-01/eeg/sub-01_task-rest_run-01_events.tsv')
+    bids_path = BIDSPath(root=root, subject='01', task='rest', run='01',
+                         datatype='eeg', suffix='eeg', extension='.edf')
+    eeg_dir = root / 'sub-01' / 'eeg'
+    expected = {'channels': 'sub-01_task-rest_channels.tsv',
+                'events': 'sub-01_task-rest_run-01_events.tsv'}
+    with _resolve_sidecars(root):
+        for suffix in ('channels', 'events', 'channels'):
+            assert _find_matching_sidecar(bids_path, suffix=suffix,
+                                          extension='.tsv') == \
+                str(eeg_dir / expected[suffix])
+        assert n_queries[0] == 1
+
+    # outside of the block every lookup queries the index, and sees the
+    # files written since
+    fname = eeg_dir / 'sub-01_task-rest_run-01_channels.tsv'
+    fname.touch()
+    assert _find_matching_sidecar(bids_path, suffix='channels',
+                                  extension='.tsv') == str(fname)
+    assert n_queries[0] == 2
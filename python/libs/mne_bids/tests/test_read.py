@@ -24,7 +24,8 @@ from mne_bids.config import (MNE_STR_TO_FRAME, BIDS_SHARED_COORDINATE_FRAMES,
                              BIDS_TO_MNE_FRAMES)
 from mne_bids.read import (read_raw_bids,
                            _read_raw, get_head_mri_trans,
-                           _handle_events_reading)
+                           _handle_events_reading, _read_meas_date,
+                           _read_edf_meas_date)
 from mne_bids.tsv_handler import _to_tsv, _from_tsv
 from mne_bids.utils import (_write_json)
 from mne_bids.sidecar_updates import _update_sidecar
@@ -556,6 +557,57 @@ def test_handle_scans_reading(tmp_path):
     assert new_acq_time != raw_01.info['meas_date']
 
 
+@pytest.mark.filterwarnings(warning_str['channel_unit_changed'])
+def test_read_meas_date(tmp_path):
+    """Test reading the measurement date from the headers only."""
+    raw_fif = _read_raw_fif(raw_fname)
+    raw_edf = _read_raw_edf(op.join(testing.data_path(), 'EDF',
+                                    'test_reduced.edf'))
+    raw_edf.set_channel_types({ch: 'eeg' for ch in raw_edf.ch_names})
+    bids_paths = [
+        write_raw_bids(raw_fif, _bids_path.copy().update(root=tmp_path)),
+        write_raw_bids(raw_edf, _bids_path.copy().update(root=tmp_path,
+                                                         datatype='eeg'))
+    ]
+    for bids_path in bids_paths:
+        meas_date = read_raw_bids(bids_path).info['meas_date']
+        assert _read_meas_date(bids_path) == meas_date
+
+        # without an acquisition time, the date is read from the header
+        scans_path = BIDSPath(subject=bids_path.subject,
+                              session=bids_path.session, root=tmp_path,
+                              suffix='scans', extension='.tsv')
+        scans_tsv = _from_tsv(scans_path)
+        scans_tsv['acq_time'] = ['n/a'] * len(scans_tsv['acq_time'])
+        _to_tsv(scans_tsv, scans_path)
+        assert _read_meas_date(bids_path) == meas_date
+
+
+def test_read_edf_meas_date(tmp_path):
+    """Test reading the measurement date of EDF headers."""
+    fname = tmp_path / 'test.edf'
+
+    def _meas_date(rec_info, meas_date, meas_time):
+        fname.write_bytes(b'0'.ljust(88) + rec_info.ljust(80).encode() +
+                          meas_date.encode() + meas_time.encode())
+        return _read_edf_meas_date(fname)
+
+    want = datetime(2020, 3, 2, 10, 11, 12, tzinfo=timezone.utc)
+    assert _meas_date('Startdate 02-MAR-2020 X X X', '02.03.20',
+                      '10.11.12') == want
+    assert _meas_date('Startdate 02-mar-2020 X X X', '01.01.85',
+                      '10.11.12') == want
+    # the startdate of EDF files falls back to the 2-digit year field
+    assert _meas_date('Startdate X X X X', '02.03.20', '10.11.12') == want
+    assert _meas_date('Startdate 02-MRZ-2020 X X X', '02.03.20',
+                      '10.11.12') == want
+    # blanked or malformed dates are not read
+    assert _meas_date('Startdate X X X X', '        ', '10.11.12') is None
+    assert _meas_date('Startdate X X X X', '02.03.20', 'xx.yy.zz') is None
+    assert _meas_date('Startdate 31-FEB-2020 X X X', '02.03.20',
+                      '10.11.12') is None
+
+
 @pytest.mark.filterwarnings(warning_str['channel_unit_changed'])
 def test_handle_info_reading(tmp_path):
     """Test reading information from a BIDS sidecar JSON file."""
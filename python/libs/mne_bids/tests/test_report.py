@@ -96,3 +96,39 @@ analysis (2.0 +/- 0.0 were removed from analysis)."""  # noqa
 
     expected_report = '\n'.join(textwrap.wrap(expected_report, width=80))
     assert report == expected_report
+
+
+@pytest.mark.filterwarnings(warning_str['channel_unit_changed'])
+def test_report_cache(tmp_path, monkeypatch):
+    """Test that the report only reads the files that changed."""
+    import mne_bids.report._report
+    bids_root = tmp_path / 'bids'
+    raw = mne.io.read_raw_fif(raw_fname, verbose=False)
+    raw.info['line_freq'] = 60
+    bids_path = _bids_path.copy().update(root=bids_root)
+    write_raw_bids(raw, bids_path, overwrite=True, verbose=False)
+
+    cache_fname = tmp_path / 'report.json'
+    report = make_report(bids_root, cache_fname=cache_fname)
+    assert report == make_report(bids_root)
+
+    read_kinds = []
+    read_file_facts = mne_bids.report._report._read_file_facts
+
+    def _counting_read_file_facts(fname, kind):
+        read_kinds.append(kind)
+        return read_file_facts(fname, kind)
+
+    monkeypatch.setattr(mne_bids.report._report, '_read_file_facts',
+                        _counting_read_file_facts)
+    assert make_report(bids_root, cache_fname=cache_fname) == report
+    assert read_kinds == []
+
+    # a changed sidecar is read again
+    sidecar_fname = bids_path.copy().update(datatype='meg', suffix='meg',
+                                            extension='.json').fpath
+    sidecar = sidecar_fname.read_text().replace('"Elekta"', '"Other"')
+    sidecar_fname.write_text(sidecar + '\n')
+    report = make_report(bids_root, cache_fname=cache_fname)
+    assert read_kinds == ['sidecar']
+    assert 'MEG system (Other)' in report
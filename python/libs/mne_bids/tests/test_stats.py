@@ -4,6 +4,7 @@
 # License: BSD-3-Clause
 
 
+from collections import OrderedDict
 from pathlib import Path
 import itertools
 
@@ -14,6 +15,7 @@ import mne
 from mne.utils import requires_pandas
 from mne.datasets import testing
 
+import mne_bids.stats
 from mne_bids import BIDSPath, write_raw_bids
 from mne_bids.stats import count_events
 from mne_bids.read import _from_tsv
@@ -149,3 +151,41 @@ def test_count_no_events_column(tmp_path):
     counts = count_events(root)
     _check_counts(counts, events, event_id, [subject], [task], [run],
                   [session])
+
+
+@requires_pandas
+def test_count_events_cache(tmp_path):
+    """Test counting events in parallel and reusing saved counts."""
+    root = tmp_path / 'bids'
+    for subject, run in itertools.product(['01', '02'], ['01', '02']):
+        bids_path = BIDSPath(root=root, subject=subject, task='task1',
+                             run=run, datatype='eeg', suffix='events',
+                             extension='.tsv')
+        bids_path.mkdir()
+        events = OrderedDict(onset=[0, 1, 2, 3], duration=[0] * 4,
+                             trial_type=['a', 'b', 'a', 'n/a'])
+        _write_tsv(bids_path.fpath, events)
+
+    cache_fname = tmp_path / 'counts.json'
+    counts = count_events(root)
+    assert counts.at[('01', '01'), ('task1', 'a')] == 2
+    assert counts.at[('02', '02'), ('task1', 'b')] == 1
+    assert ('task1', 'n/a') not in counts.columns
+    assert counts.equals(count_events(root, n_jobs=2,
+                                      cache_fname=cache_fname))
+    assert cache_fname.exists()
+
+    # unchanged files are not read again
+    def _fail(fname):
+        raise AssertionError(f'{fname} was read again')
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(mne_bids.stats, '_count_trial_types', _fail)
+        assert counts.equals(count_events(root, cache_fname=cache_fname))
+
+    # changed files are
+    _write_tsv(bids_path.fpath, OrderedDict(onset=[0], trial_type=['c']),
+               overwrite=True)
+    counts = count_events(root, cache_fname=cache_fname)
+    assert counts.at[('02', '02'), ('task1', 'c')] == 1
+    assert counts.equals(count_events(root))
@@ -9,7 +9,7 @@ from collections import OrderedDict as odict
 import pytest
 
 from mne_bids.tsv_handler import (_from_tsv, _to_tsv, _combine_rows, _drop,
-                                  _contains_row, _tsv_to_str)
+                                  _contains_row, _tsv_to_str, _append_tsv_row)
 
 
 def test_tsv_handler(tmp_path):
@@ -90,3 +90,66 @@ def test_drop_different_types():
     result = _drop(data, values=values_to_drop, column=column)
     for value in values_to_drop:
         assert value not in result
+
+
+def test_from_tsv_types(tmp_path):
+    """Test reading typed columns, blank lines and ragged rows."""
+    d_path = tmp_path / 'output.tsv'
+    d_path.write_text('a\tb\tc\n1\t2.5\t x \n\n3\t4\t\n',
+                      encoding='utf-8-sig')
+    d = _from_tsv(d_path, [int, float, str])
+    assert d == odict(a=[1, 3], b=[2.5, 4.0], c=[' x ', ''])
+
+    d_path.write_text('a\tb\n', encoding='utf-8')
+    assert _from_tsv(d_path) == odict(a=[], b=[])
+
+    d_path.write_text('a\tb\n1\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='number of columns changed'):
+        _from_tsv(d_path)
+
+
+def test_append_tsv_row(tmp_path):
+    """Test appending rows without rewriting the file."""
+    d_path = tmp_path / 'participants.tsv'
+    d = odict(participant_id=['sub-01', 'sub-03'], age=[20, 30],
+              site=['a', 'b'])
+    _to_tsv(d, d_path)
+
+    # appended rows match what combining and rewriting produces
+    row = odict(participant_id=['sub-04'], age=[40])
+    assert _append_tsv_row(d_path, {k: v[0] for k, v in row.items()},
+                           'participant_id')
+    expected = tmp_path / 'expected.tsv'
+    _to_tsv(_combine_rows(d, row, 'participant_id'), expected)
+    assert d_path.read_bytes() == expected.read_bytes()
+
+    # keys that do not sort last, unknown columns and ragged rows are refused
+    data = _from_tsv(d_path)
+    assert not _append_tsv_row(d_path, {'participant_id': 'sub-02'},
+                               'participant_id')
+    assert not _append_tsv_row(d_path, {'participant_id': 'sub-04'},
+                               'participant_id')
+    assert not _append_tsv_row(d_path, {'participant_id': 'sub-05', 'x': 1},
+                               'participant_id')
+    assert _from_tsv(d_path) == data
+
+    # keys already in an unsorted file are refused, new ones appended once
+    _to_tsv(odict(participant_id=['sub-05', 'sub-02']), d_path)
+    assert not _append_tsv_row(d_path, {'participant_id': 'sub-05'},
+                               'participant_id')
+    assert _append_tsv_row(d_path, {'participant_id': 'sub-06'},
+                           'participant_id')
+    assert _from_tsv(d_path) == \
+        odict(participant_id=['sub-05', 'sub-02', 'sub-06'])
+    # the keys read for the first append are reused for the next ones
+    assert not _append_tsv_row(d_path, {'participant_id': 'sub-02'},
+                               'participant_id')
+    assert _append_tsv_row(d_path, {'participant_id': 'sub-07'},
+                           'participant_id')
+    assert not _append_tsv_row(d_path, {'participant_id': 'sub-07'},
+                               'participant_id')
+
+    # header only
+    _to_tsv(odict(filename=[]), d_path)
+    assert _append_tsv_row(d_path, {'filename': 'eeg/a.edf'}, 'filename')
+    assert _from_tsv(d_path) == odict(filename=['eeg/a.edf'])
@@ -16,7 +16,7 @@ import mne
 from mne_bids import BIDSPath
 from mne_bids.utils import (_check_types, _age_on_date, _handle_datatype,
                             _infer_eeg_placement_scheme, _get_ch_type_mapping,
-                            _check_datatype)
+                            _check_datatype, _parallel_map)
 from mne_bids.path import _path_to_str
 
 base_path = op.join(op.dirname(mne.__file__), 'io')
@@ -166,3 +166,13 @@ def test_check_datatype():
         with pytest.raises(ValueError, match=f'The specified datatype '
                                              f'{datatype} was not found'):
             _check_datatype(raw, datatype)
+
+
+@pytest.mark.parametrize('n_jobs', (1, 2, -1))
+def test_parallel_map(n_jobs):
+    """Test calling a function in parallel processes."""
+    args = [(x, 3) for x in range(10)]
+    assert _parallel_map(divmod, args, n_jobs) == [divmod(*a) for a in args]
+    assert _parallel_map(divmod, [], n_jobs) == []
+    with pytest.raises(ZeroDivisionError):
+        _parallel_map(divmod, [(1, 1), (1, 0), (2, 1)], n_jobs)
@@ -3393,6 +3393,22 @@ def test_anonymize_dataset(_bids_validate, tmpdir):
     events_tsv_anonymized = _from_tsv(events_tsv_anonymized_bp)
     assert events_tsv_orig == events_tsv_anonymized
 
+    # Anonymizing the subjects in parallel gives the same dataset
+    bids_root_anon_parallel = tmpdir / 'bids-anonymized-parallel'
+    anonymize_dataset(
+        bids_root_in=bids_root,
+        bids_root_out=bids_root_anon_parallel,
+        random_state=42,
+        n_jobs=2
+    )
+    _bids_validate(bids_root_anon_parallel)
+    fnames = sorted(p.relative_to(bids_root_anon)
+                    for p in Path(bids_root_anon).rglob('*'))
+    assert sorted(p.relative_to(bids_root_anon_parallel)
+                  for p in Path(bids_root_anon_parallel).rglob('*')) == fnames
+    assert _from_tsv(bids_root_anon_parallel / 'participants.tsv') == \
+        _from_tsv(bids_root_anon / 'participants.tsv')
+
     # Explicitly specify multiple data types
     bids_root_anon = tmpdir / 'bids-anonymized-1'
     anonymize_dataset(
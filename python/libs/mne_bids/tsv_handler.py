@@ -1,8 +1,17 @@
 """Private functions to handle tabular data."""
+import os
+
 import numpy as np
 from collections import OrderedDict
 from copy import deepcopy
 
+# column types that are converted value by value instead of through NumPy
+_SCALAR_TYPES = (str, int, float)
+
+# keys of the tsv files rows were appended to, by file name and key column,
+# with the modification time and size of the file they are valid for
+_tsv_keys = dict()
+
 
 def _combine_rows(data1, data2, drop_column=None):
     """Add two OrderedDict's together and optionally drop repeated data.
@@ -23,7 +32,8 @@ def _combine_rows(data1, data2, drop_column=None):
     data : collections.OrderedDict
         The new combined data.
     """
-    data = deepcopy(data1)
+    # the columns hold scalars, copying the lists is enough
+    data = OrderedDict((key, list(value)) for key, value in data1.items())
     # next extend the values in data1 with values in data2
     for key, value in data2.items():
         data[key].extend(value)
@@ -135,23 +145,135 @@ def _from_tsv(fname, dtypes=None):
         Keys are the column names, and values are the column data.
 
     """
-    data = np.loadtxt(fname, dtype=str, delimiter='\t', ndmin=2,
-                      comments=None, encoding='utf-8-sig')
-    column_names = data[0, :]
-    info = data[1:, :]
+    # rows are split while the file is read, the columns are transposed once
+    with open(fname, 'r', encoding='utf-8-sig') as fid:
+        rows = [line.rstrip('\n').split('\t') for line in fid
+                if line != '\n']
+    if not rows:
+        raise ValueError(f'{fname} is empty.')
+
+    n_columns = len(rows[0])
+    for idx, row in enumerate(rows):
+        if len(row) != n_columns:
+            raise ValueError(f'the number of columns changed from '
+                             f'{n_columns} to {len(row)} at row {idx + 1}')
+
+    column_names = rows[0]
+    columns = list(zip(*rows[1:])) or [()] * n_columns
     data_dict = OrderedDict()
     if dtypes is None:
-        dtypes = [str] * info.shape[1]
+        dtypes = [str] * n_columns
     if not isinstance(dtypes, (list, tuple)):
-        dtypes = [dtypes] * info.shape[1]
-    if not len(dtypes) == info.shape[1]:
+        dtypes = [dtypes] * n_columns
+    if not len(dtypes) == n_columns:
         raise ValueError('dtypes length mismatch. Provided: {0}, '
-                         'Expected: {1}'.format(len(dtypes), info.shape[1]))
-    for i, name in enumerate(column_names):
-        data_dict[name] = info[:, i].astype(dtypes[i]).tolist()
+                         'Expected: {1}'.format(len(dtypes), n_columns))
+    for name, column, dtype in zip(column_names, columns, dtypes):
+        if dtype in _SCALAR_TYPES:
+            data_dict[name] = list(map(dtype, column))
+        else:
+            data_dict[name] = np.array(column, dtype=str).astype(dtype).tolist()
     return data_dict
 
 
+def _read_last_line(fid, size, block_size=4096):
+    """Return the last line of a binary file, reading from its end."""
+    end = size - 1  # skip the final newline
+    tail = b''
+    while end > 0:
+        start = max(end - block_size, 0)
+        fid.seek(start)
+        tail = fid.read(end - start) + tail
+        end = start
+        if b'\n' in tail:
+            break
+    return tail.rsplit(b'\n', 1)[-1]
+
+
+def _read_tsv_keys(fid, n_columns, key_idx):
+    """Return the set of keys of the rows after the header, or None."""
+    keys = set()
+    for line in fid:
+        values = line.rstrip(b'\r\n').split(b'\t')
+        if len(values) != n_columns:
+            return None
+        keys.add(values[key_idx].decode('utf-8'))
+    return keys
+
+
+def _append_tsv_row(fname, row_data, key_column):
+    """Append one row to a tsv file without rewriting the whole file.
+
+    Only the header and the last line are read. The row is appended when its
+    key is not in the file yet and sorts after the last key, so that a file
+    sorted on ``key_column``, as after
+    ``_combine_rows(..., drop_column=key_column)``, stays sorted. The keys of
+    the file are read once and kept for as long as its modification time and
+    size are those left by the last append.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the tsv file, which must end with a newline.
+    row_data : dict
+        Column names as keys, and the (single) row values. Columns of the file
+        missing in ``row_data`` are written as "n/a".
+    key_column : str
+        Name of the column the rows are sorted on.
+
+    Returns
+    -------
+    appended : bool
+        False if the row could not be appended, in which case the file has
+        to be combined and rewritten.
+    """
+    key = str(row_data.get(key_column))
+    with open(fname, 'rb') as fid:
+        header = fid.readline()
+        column_names = header.decode('utf-8-sig').rstrip('\r\n').split('\t')
+        if (not header.endswith(b'\n') or key_column not in column_names or
+                not set(row_data).issubset(column_names)):
+            return False
+        key_idx = column_names.index(key_column)
+
+        stat = os.fstat(fid.fileno())
+        cache_key = (os.path.abspath(fname), key_column)
+        cached = _tsv_keys.get(cache_key)
+        if cached is not None and cached[0] == (stat.st_mtime_ns,
+                                                stat.st_size):
+            keys = cached[1]
+        else:
+            keys = _read_tsv_keys(fid, len(column_names), key_idx)
+            if keys is None:  # a ragged row
+                _tsv_keys.pop(cache_key, None)
+                return False
+            _tsv_keys[cache_key] = ((stat.st_mtime_ns, stat.st_size), keys)
+        if key in keys:
+            # a row that may have to be replaced
+            return False
+
+        last_key = None
+        if stat.st_size > len(header):
+            fid.seek(stat.st_size - 1)
+            if fid.read(1) != b'\n':
+                return False
+            last_line = _read_last_line(fid, stat.st_size)
+            last_key = (last_line.rstrip(b'\r').split(b'\t')[key_idx]
+                        .decode('utf-8'))
+
+    if last_key is not None and not key > last_key:
+        return False
+
+    row = [str(row_data.get(name, 'n/a')) for name in column_names]
+    with open(fname, 'a', encoding='utf-8') as fid:
+        fid.write('\t'.join(row) + '\n')
+        fid.flush()
+        stat = os.fstat(fid.fileno())
+    keys.add(key)
+    _tsv_keys[cache_key] = ((stat.st_mtime_ns, stat.st_size), keys)
+    return True
+
+
 def _to_tsv(data, fname):
     """Write an OrderedDict into a tsv file.
 
@@ -193,10 +315,9 @@ def _tsv_to_str(data, rows=5):
     # write headings.
     output.append('\t'.join(col_names))
 
-    # write column data.
+    # write column data, converted column by column.
     max_rows = min(n_rows, rows)
-    for idx in range(max_rows):
-        row_data = list(str(data[key][idx]) for key in data)
-        output.append('\t'.join(row_data))
+    columns = [map(str, data[key][:max_rows]) for key in col_names]
+    output.extend('\t'.join(row_data) for row_data in zip(*columns))
 
     return '\n'.join(output)
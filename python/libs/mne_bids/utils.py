@@ -8,8 +8,10 @@
 #
 # License: BSD-3-Clause
 import json
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date, timedelta, timezone
 from os import path as op
 
@@ -222,6 +224,71 @@ def _write_text(fname, text, overwrite=False):
     logger.info(f"Writing '{fname}'...")
 
 
+def _read_file_cache(fname, version):
+    """Read per-file results saved with ``_write_file_cache``.
+
+    The results are dropped if they were saved in another format ``version``.
+    """
+    try:
+        with open(fname, 'r', encoding='utf-8') as fid:
+            cache = json.load(fid)
+        if cache.get('version') == version:
+            return cache['files']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return dict()
+
+
+def _write_file_cache(fname, version, files):
+    """Save per-file results, replacing the previous file at once."""
+    temp_fname = f'{fname}.{os.getpid()}'
+    with open(temp_fname, 'w', encoding='utf-8') as fid:
+        json.dump(dict(version=version, files=files), fid)
+    os.replace(temp_fname, fname)
+
+
+def _call_logged(level, func, *args):
+    """Call ``func`` in a pool process, logging at the level of the caller."""
+    logger.setLevel(level)
+    return func(*args)
+
+
+def _parallel_map(func, args, n_jobs=1):
+    """Call ``func(*arg)`` for each ``arg`` of ``args`` in parallel processes.
+
+    Unlike ``mne.parallel.parallel_func``, this does not need joblib. The
+    calls are made in a ``concurrent.futures`` process pool of ``n_jobs``
+    workers (all CPUs if negative), started with ``spawn``. ``func`` and its
+    arguments must be picklable. With a single job or argument, the calls
+    are made in this process.
+
+    Returns
+    -------
+    results : list
+        The return values of ``func``, in the order of ``args``.
+    """
+    args = list(args)
+    if n_jobs is None:
+        n_jobs = 1
+    elif n_jobs < 0:
+        n_jobs = max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    n_jobs = min(n_jobs, len(args))
+    if n_jobs <= 1:
+        return [func(*arg) for arg in args]
+
+    with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(_call_logged, logger.level, func, *arg)
+                   for arg in args]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            # do not start the remaining calls after an error
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
 def _check_key_val(key, val):
     """Perform checks on a value to make sure it adheres to the spec."""
     if any(ii in val for ii in ['-', '_', '/']):
@@ -343,13 +410,43 @@ def _get_anonymization_daysback(raw):
     daysback_max : int
         The maximum number of daysback that MNE can store.
     """
-    this_date = _stamp_to_dt(raw.info['meas_date']).date()
+    return _get_meas_date_daysback(raw.info['meas_date'])
+
+
+def _get_meas_date_daysback(meas_date):
+    """Get the min and max number of daysback for one measurement date."""
+    this_date = _stamp_to_dt(meas_date).date()
     daysback_min = (this_date - date(year=1924, month=12, day=31)).days
     daysback_max = (this_date - datetime.fromtimestamp(0).date() +
                     timedelta(seconds=np.iinfo('>i4').max)).days
     return daysback_min, daysback_max
 
 
+def _get_group_daysback(meas_dates):
+    """Get the group min and max number of daysback of measurement dates.
+
+    Dates that are ``None`` are ignored.
+    """
+    daysback_min_list = list()
+    daysback_max_list = list()
+    for meas_date in meas_dates:
+        if meas_date is not None:
+            daysback_min, daysback_max = _get_meas_date_daysback(meas_date)
+            daysback_min_list.append(daysback_min)
+            daysback_max_list.append(daysback_max)
+    if not daysback_min_list or not daysback_max_list:
+        raise ValueError('All measurement dates are None, '
+                         'pass any `daysback` value to anonymize.')
+    daysback_min = max(daysback_min_list)
+    daysback_max = min(daysback_max_list)
+    if daysback_min > daysback_max:
+        raise ValueError('The dataset spans more time than can be '
+                         'accomodated by MNE, you may have to '
+                         'not follow BIDS recommendations and use'
+                         'anonymized dates after 1925')
+    return daysback_min, daysback_max
+
+
 @verbose
 def get_anonymization_daysback(raws, verbose=None):
     """Get the group min and max number of daysback necessary for BIDS specs.
@@ -381,24 +478,7 @@ def get_anonymization_daysback(raws, verbose=None):
     """
     if not isinstance(raws, list):
         raws = list([raws])
-    daysback_min_list = list()
-    daysback_max_list = list()
-    for raw in raws:
-        if raw.info['meas_date'] is not None:
-            daysback_min, daysback_max = _get_anonymization_daysback(raw)
-            daysback_min_list.append(daysback_min)
-            daysback_max_list.append(daysback_max)
-    if not daysback_min_list or not daysback_max_list:
-        raise ValueError('All measurement dates are None, '
-                         'pass any `daysback` value to anonymize.')
-    daysback_min = max(daysback_min_list)
-    daysback_max = min(daysback_max_list)
-    if daysback_min > daysback_max:
-        raise ValueError('The dataset spans more time than can be '
-                         'accomodated by MNE, you may have to '
-                         'not follow BIDS recommendations and use'
-                         'anonymized dates after 1925')
-    return daysback_min, daysback_max
+    return _get_group_daysback([raw.info['meas_date'] for raw in raws])
 
 
 def _stamp_to_dt(utc_stamp):
@@ -16,6 +16,7 @@ import os.path as op
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import shutil
+import tempfile
 from collections import defaultdict, OrderedDict
 
 from pkg_resources import parse_version
@@ -39,16 +40,18 @@ from mne_bids.dig import _write_dig_bids, _write_coordsystem_json
 from mne_bids.utils import (_write_json, _write_tsv, _write_text,
                             _age_on_date, _infer_eeg_placement_scheme,
                             _get_ch_type_mapping, _check_anonymize,
-                            _stamp_to_dt, _handle_datatype)
-from mne_bids import (BIDSPath, read_raw_bids, get_anonymization_daysback,
-                      get_bids_path_from_fname)
+                            _stamp_to_dt, _handle_datatype,
+                            _get_group_daysback, _parallel_map)
+from mne_bids import BIDSPath, read_raw_bids, get_bids_path_from_fname
 from mne_bids.path import _parse_ext, _mkdir_p, _path_to_str
 from mne_bids.copyfiles import (copyfile_brainvision, copyfile_eeglab,
                                 copyfile_ctf, copyfile_bti, copyfile_kit,
-                                copyfile_edf)
+                                copyfile_edf, _update_checksums,
+                                _read_checksums, CHECKSUMS_FNAME)
 from mne_bids.tsv_handler import (_from_tsv, _drop, _contains_row,
-                                  _combine_rows)
-from mne_bids.read import _find_matching_sidecar, _read_events
+                                  _combine_rows, _append_tsv_row)
+from mne_bids.read import (_find_matching_sidecar, _read_events,
+                           _read_meas_date)
 from mne_bids.sidecar_updates import update_sidecar_json
 
 from mne_bids.config import (ORIENTATION, UNITS, MANUFACTURERS,
@@ -375,6 +378,13 @@ def _participants_tsv(raw, subject_id, fname, overwrite=False):
     data = OrderedDict(participant_id=[subject_id])
     data.update({'age': [subject_age], 'sex': [sex], 'hand': [hand]})
 
+    # a new participant sorting after all others is appended to the file
+    if os.path.exists(fname) and _append_tsv_row(
+            fname, {key: value[0] for key, value in data.items()},
+            'participant_id'):
+        logger.info(f"Appending to '{fname}'...")
+        return
+
     if os.path.exists(fname):
         orig_data = _from_tsv(fname)
         # whether the new data exists identically in the previous data
@@ -531,6 +541,13 @@ def _scans_tsv(raw, raw_fname, fname, keep_source, overwrite=False):
         else:
             _write_json(sidecar_json_path, sidecar_json)
 
+    # a single new file name sorting after all others is appended to the file
+    if (os.path.exists(fname) and len(raw_fnames) == 1 and _append_tsv_row(
+            fname, {key: value[0] for key, value in data.items()},
+            'filename')):
+        logger.info(f"Appending to '{fname}'...")
+        return
+
     if os.path.exists(fname):
         orig_data = _from_tsv(fname)
         # if the file name is already in the file raise an error
@@ -1148,7 +1165,8 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
                    anonymize=None, format='auto', symlink=False,
                    empty_room=None, allow_preload=False,
                    montage=None, acpc_aligned=False,
-                   overwrite=False, verbose=None):
+                   overwrite=False, edf_header=None, edf_cache_dir=None,
+                   edf_progress=None, verbose=None):
     """Save raw data to a BIDS-compliant folder structure.
 
     .. warning:: * The original file is simply copied over if the original
@@ -1317,6 +1335,22 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
         and ``participants.tsv`` by a user will be retained.
         If ``False``, no existing data will be overwritten or
         replaced.
+    edf_header : dict | None
+        For EDF/BDF files that are copied, header fields to overwrite in the
+        copy while it is written. See :func:`mne_bids.copyfiles.copyfile_edf`.
+        The SHA-256 of each copied EDF/BDF file is added to the
+        ``checksums.sha256`` manifest at the root of the dataset.
+    edf_cache_dir : path-like | None
+        For EDF/BDF files that are copied, a content-addressed cache of
+        earlier copies, which are linked instead of being read and
+        checksummed again when the source content and ``edf_header`` did not
+        change. See
+        :func:`mne_bids.copyfiles.copyfile_edf`.
+    edf_progress : callable | None
+        For EDF/BDF files that are copied, called with the number of bytes
+        copied since its previous call while the file is copied. An exception
+        it raises stops the copy. See
+        :func:`mne_bids.copyfiles.copyfile_edf`.
     %(verbose)s
 
     Returns
@@ -1763,7 +1797,12 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
                  "supports 2-digit years. The date for that field will be "
                  "set to 85 (i.e., 1985), the earliest possible date. "
                  "The true anonymized date is stored in the scans.tsv file.")
-        copyfile_edf(raw_fname, bids_path, anonymize=anonymize)
+        checksum = copyfile_edf(raw_fname, bids_path, anonymize=anonymize,
+                                header=edf_header, cache_dir=edf_cache_dir,
+                                progress=edf_progress)
+        _update_checksums(bids_path.root, {
+            Path(bids_path.fpath).relative_to(bids_path.root).as_posix():
+            checksum})
     # EEGLAB .set might be accompanied by a .fdt - find out and copy it too
     elif ext == '.set':
         copyfile_eeglab(raw_fname, bids_path)
@@ -2329,7 +2368,8 @@ def _get_daysback(
     *,
     bids_paths: List[BIDSPath],
     rng: np.random.Generator,
-    show_progress_thresh: int
+    show_progress_thresh: int,
+    n_jobs: int = 1
 ) -> int:
     """Try to find a suitable "daysback" for anonymization.
 
@@ -2343,6 +2383,8 @@ def _get_daysback(
     show_progress_thresh
         After narrowing down the files to query for their measurement date,
         show a progress bar if >= this number of files remain.
+    n_jobs
+        The number of processes reading the measurement dates in parallel.
     """
     bids_paths_for_daysback = dict()
 
@@ -2374,21 +2416,18 @@ def _get_daysback(
     for bids_path in bids_paths_for_daysback.values():
         bids_paths_to_consider.extend(bids_path)
 
-    if len(bids_paths_to_consider) >= show_progress_thresh:
-        raws = []
+    # only the headers are read, or the acquisition times in scans.tsv
+    if n_jobs != 1:
+        meas_dates = _parallel_map(
+            _read_meas_date, [(bp,) for bp in bids_paths_to_consider], n_jobs)
+    elif len(bids_paths_to_consider) >= show_progress_thresh:
         logger.info('\n')
-        for bids_path in ProgressBar(
-            iterable=bids_paths_to_consider, mesg='Determining daysback'
-        ):
-            raw = read_raw_bids(bids_path=bids_path, verbose='error')
-            raws.append(raw)
+        meas_dates = [_read_meas_date(bp) for bp in ProgressBar(
+            iterable=bids_paths_to_consider, mesg='Determining daysback')]
     else:
-        raws = [read_raw_bids(bids_path=bp, verbose='error')
-                for bp in bids_paths_to_consider]
+        meas_dates = [_read_meas_date(bp) for bp in bids_paths_to_consider]
 
-    daysback_min, daysback_max = get_anonymization_daysback(
-        raws=raws, verbose=False
-    )
+    daysback_min, daysback_max = _get_group_daysback(meas_dates)
 
     # Pick one randomly
     daysback = rng.choice(
@@ -2418,10 +2457,227 @@ def _check_finecal_path(bids_path: BIDSPath) -> bool:
     return is_finecal_path
 
 
+def _link_or_copy(src, dst):
+    """Hard link a file or directory tree, copying it if that fails."""
+    def _link(src, dst):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    if op.isdir(src):
+        shutil.copytree(src, dst, copy_function=_link)
+    else:
+        _mkdir_p(op.dirname(dst))
+        _link(src, dst)
+
+
+def _anonymize_recording(bp_in, bids_root_out, subject_mapping, daysback,
+                         er_root=None):
+    """Anonymize one recording of a BIDS dataset.
+
+    If ``er_root`` is passed, the anonymized empty-room recordings were
+    written there, and are linked into ``bids_root_out`` when needed.
+    """
+    bp_out = (
+        bp_in.copy().update(
+            subject=subject_mapping[bp_in.subject],
+            root=bids_root_out
+        )
+    )
+
+    bp_er_in = bp_er_out = None
+
+    # Handle empty-room anonymization: we need to change the session to
+    # match the new date
+    if (
+        bp_in.datatype == 'meg' and
+        'emptyroom' in subject_mapping and
+        not (_check_finecal_path(bp_in) or _check_crosstalk_path(bp_in))
+    ):
+        if bp_in.subject == 'emptyroom':
+            er_session_in = bp_in.session
+        else:
+            # An experimental recording, so we need to find the associated
+            # empty-room
+            bp_er_in = bp_in.find_empty_room(
+                use_sidecar_only=True, verbose='error'
+            )
+            if bp_er_in is None:
+                er_session_in = None
+            else:
+                er_session_in = bp_er_in.session
+
+        # Update the session entity
+        if er_session_in is not None:
+            date_fmt = '%Y%m%d'
+            er_session_out = (
+                datetime.strptime(er_session_in, date_fmt) -
+                timedelta(days=daysback)
+            )
+            er_session_out = datetime.strftime(er_session_out, date_fmt)
+
+            if bp_in.subject == 'emptyroom':
+                bp_out.session = er_session_out
+                assert bp_er_out is None
+            else:
+                bp_er_out = bp_er_in.copy().update(
+                    subject=subject_mapping['emptyroom'],
+                    session=er_session_out,
+                    root=bp_out.root
+                )
+                if er_root is not None and not bp_er_out.fpath.exists():
+                    _link_or_copy(
+                        bp_er_out.copy().update(root=er_root).fpath,
+                        bp_er_out.fpath
+                    )
+
+    if bp_in.datatype == 'anat':
+        bp_anat_json = bp_in.copy().update(extension='.json')
+        anat_json = json.loads(
+            bp_anat_json.fpath.read_text(encoding='utf-8')
+        )
+        landmarks = anat_json['AnatomicalLandmarkCoordinates']
+        landmarks_dig = mne.channels.make_dig_montage(
+            nasion=landmarks['NAS'],
+            lpa=landmarks['LPA'],
+            rpa=landmarks['RPA'],
+            coord_frame='mri_voxel'
+        )
+        write_anat(
+            image=bp_in.fpath,
+            bids_path=bp_out,
+            landmarks=landmarks_dig,
+            deface=True,
+            verbose='error'
+        )
+    elif _check_crosstalk_path(bp_in):
+        write_meg_crosstalk(
+            fname=bp_in.fpath,
+            bids_path=bp_out,
+            verbose='error'
+        )
+    elif _check_finecal_path(bp_in):
+        write_meg_calibration(
+            calibration=bp_in.fpath,
+            bids_path=bp_out,
+            verbose='error'
+        )
+    else:
+        raw = read_raw_bids(bids_path=bp_in, verbose='error')
+        write_raw_bids(
+            raw=raw,
+            bids_path=bp_out,
+            anonymize={
+                'daysback': daysback,
+                'keep_his': False,
+                'keep_source': False,
+            },
+            empty_room=bp_er_out,
+            verbose='error'
+        )
+
+    # Enrich sidecars
+    bp_in_json = bp_in.copy().update(extension='.json')
+    bp_out_json = bp_out.copy().update(extension='.json')
+    bp_in_events = bp_in.copy().update(suffix='events', extension='.tsv')
+    bp_out_events = bp_out.copy().update(suffix='events', extension='.tsv')
+
+    # Enrich the JSON file
+    if bp_in_json.fpath.exists():
+        json_in = json.loads(
+            bp_in_json.fpath.read_text(encoding='utf-8')
+        )
+    else:
+        json_in = dict()
+
+    if bp_out_json.fpath.exists():
+        json_out = json.loads(
+            bp_out_json.fpath.read_text(encoding='utf-8')
+        )
+    else:
+        json_out = dict()
+
+    # Only transfer data that we believe doesn't contain any personally
+    # identifiable information
+    json_updates = dict()
+    for key, value in json_in.items():
+        if key in ANONYMIZED_JSON_KEY_WHITELIST and key not in json_out:
+            json_updates[key] = value
+    del json_in, json_out
+
+    if json_updates:
+        bp_out_json.fpath.touch(exist_ok=True)
+        update_sidecar_json(
+            bids_path=bp_out_json,
+            entries=json_updates,
+            verbose='error'
+        )
+
+    # Transfer trigger codes from original *_events.tsv file
+    if bp_in_events.fpath.exists():
+        assert bp_out_events.fpath.exists()
+        events_tsv_in = _from_tsv(bp_in_events)
+        events_tsv_out = _from_tsv(bp_out_events)
+
+        assert events_tsv_in['trial_type'] == events_tsv_out['trial_type']
+        events_tsv_out['value'] = events_tsv_in['value']
+        _write_tsv(
+            fname=bp_out_events.fpath,
+            dictionary=events_tsv_out,
+            overwrite=True,
+            verbose='error'
+        )
+
+
+def _anonymize_subject(bids_paths_in, bids_root_out, subject_mapping,
+                       daysback, er_root):
+    """Anonymize the recordings of one subject into their own BIDS root."""
+    for bp_in in bids_paths_in:
+        _anonymize_recording(bp_in, bids_root_out, subject_mapping, daysback,
+                             er_root=er_root)
+
+
+def _merge_anonymized_subjects(staging_roots, bids_root_out, datatypes):
+    """Move the subjects anonymized into their own roots to the output.
+
+    The top-level files of the staged roots are combined in memory, and each
+    one is written once to the output dataset.
+    """
+    participants_fname = bids_root_out / 'participants.tsv'
+    participants = None
+    if participants_fname.exists():
+        participants = _from_tsv(participants_fname)
+    checksums = dict()
+    for subject, staging_root in staging_roots.items():
+        shutil.move(str(staging_root / f'sub-{subject}'),
+                    str(bids_root_out / f'sub-{subject}'))
+
+        if (staging_root / 'participants.tsv').exists():
+            data = _from_tsv(staging_root / 'participants.tsv')
+            if participants is not None:
+                data = _combine_rows(participants, data, 'participant_id')
+            participants = data
+
+        checksums.update(_read_checksums(staging_root / CHECKSUMS_FNAME))
+
+        for fname in ('participants.json', 'dataset_description.json'):
+            if ((staging_root / fname).exists() and
+                    not (bids_root_out / fname).exists()):
+                shutil.copyfile(staging_root / fname, bids_root_out / fname)
+
+    if participants is not None:
+        _write_tsv(participants_fname, participants, overwrite=True)
+    if checksums:
+        _update_checksums(bids_root_out, checksums)
+    for datatype in datatypes:
+        _readme(datatype, bids_root_out / 'README', False)
+
+
 @verbose
 def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
                       subject_mapping='auto', datatypes=None,
-                      random_state=None, verbose=None):
+                      random_state=None, n_jobs=1, verbose=None):
     """Anonymize a BIDS dataset.
 
     This function creates a copy of a BIDS dataset, and tries to remove all
@@ -2450,6 +2706,11 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
     %(random_state)s
         The RNG will be used to derive ``daysback`` and ``subject_mapping`` if
         they are ``'auto'``.
+    n_jobs : int
+        The number of processes anonymizing subjects in parallel, all CPUs if
+        negative. The empty-room recordings are anonymized first, and the
+        ``participants.tsv`` file and other top-level files are updated once
+        all subjects are done.
     %(verbose)s
     """
     bids_root_in = Path(bids_root_in).expanduser()
@@ -2589,7 +2850,8 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
             logger.info('Determining "daysback" for anonymization.')
 
             daysback = _get_daysback(
-                bids_paths=bids_paths, rng=rng, show_progress_thresh=20
+                bids_paths=bids_paths, rng=rng, show_progress_thresh=20,
+                n_jobs=n_jobs
             )
         else:
             daysback = None
@@ -2639,151 +2901,54 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
     del msg
 
     # Actual processing starts here
-    for bp_in in ProgressBar(iterable=bids_paths_in, mesg='Anonymizing'):
-        bp_out = (
-            bp_in.copy().update(
-                subject=subject_mapping[bp_in.subject],
-                root=bids_root_out
-            )
-        )
-
-        bp_er_in = bp_er_out = None
-
-        # Handle empty-room anonymization: we need to change the session to
-        # match the new date
-        if (
-            bp_in.datatype == 'meg' and
-            'emptyroom' in subject_mapping and
-            not (_check_finecal_path(bp_in) or _check_crosstalk_path(bp_in))
-        ):
+    if n_jobs == 1:
+        for bp_in in ProgressBar(iterable=bids_paths_in, mesg='Anonymizing'):
+            _anonymize_recording(bp_in, bids_root_out, subject_mapping,
+                                 daysback)
+    else:
+        # The empty-room recordings are anonymized first, then each subject
+        # is anonymized into its own root. The subjects are moved to the
+        # output dataset and their top-level files merged once all are done.
+        bids_paths_in_by_subject = defaultdict(list)
+        for bp_in in bids_paths_in:
             if bp_in.subject == 'emptyroom':
-                er_session_in = bp_in.session
+                _anonymize_recording(bp_in, bids_root_out, subject_mapping,
+                                     daysback)
             else:
-                # An experimental recording, so we need to find the associated
-                # empty-room
-                bp_er_in = bp_in.find_empty_room(
-                    use_sidecar_only=True, verbose='error'
-                )
-                if bp_er_in is None:
-                    er_session_in = None
-                else:
-                    er_session_in = bp_er_in.session
-
-            # Update the session entity
-            if er_session_in is not None:
-                date_fmt = '%Y%m%d'
-                er_session_out = (
-                    datetime.strptime(er_session_in, date_fmt) -
-                    timedelta(days=daysback)
-                )
-                er_session_out = datetime.strftime(er_session_out, date_fmt)
-
-                if bp_in.subject == 'emptyroom':
-                    bp_out.session = er_session_out
-                    assert bp_er_out is None
-                else:
-                    bp_er_out = bp_er_in.copy().update(
-                        subject=subject_mapping['emptyroom'],
-                        session=er_session_out,
-                        root=bp_out.root
-                    )
-
-        if bp_in.datatype == 'anat':
-            bp_anat_json = bp_in.copy().update(extension='.json')
-            anat_json = json.loads(
-                bp_anat_json.fpath.read_text(encoding='utf-8')
-            )
-            landmarks = anat_json['AnatomicalLandmarkCoordinates']
-            landmarks_dig = mne.channels.make_dig_montage(
-                nasion=landmarks['NAS'],
-                lpa=landmarks['LPA'],
-                rpa=landmarks['RPA'],
-                coord_frame='mri_voxel'
-            )
-            write_anat(
-                image=bp_in.fpath,
-                bids_path=bp_out,
-                landmarks=landmarks_dig,
-                deface=True,
-                verbose='error'
-            )
-        elif _check_crosstalk_path(bp_in):
-            write_meg_crosstalk(
-                fname=bp_in.fpath,
-                bids_path=bp_out,
-                verbose='error'
-            )
-        elif _check_finecal_path(bp_in):
-            write_meg_calibration(
-                calibration=bp_in.fpath,
-                bids_path=bp_out,
-                verbose='error'
-            )
-        else:
-            raw = read_raw_bids(bids_path=bp_in, verbose='error')
-            write_raw_bids(
-                raw=raw,
-                bids_path=bp_out,
-                anonymize={
-                    'daysback': daysback,
-                    'keep_his': False,
-                    'keep_source': False,
+                bids_paths_in_by_subject[bp_in.subject].append(bp_in)
+
+        # staged next to the output, so that an interrupted run never leaves
+        # the staged subjects inside the dataset
+        bids_root_out.parent.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(
+            prefix=f'.{bids_root_out.name}-anonymize-',
+            dir=bids_root_out.parent))
+        try:
+            logger.info(f'Anonymizing {len(bids_paths_in_by_subject)} '
+                        f'subjects using {n_jobs} jobs')
+            _parallel_map(_anonymize_subject, [
+                (bps, staging_dir / f'sub-{subject_mapping[subject]}',
+                 subject_mapping, daysback, bids_root_out)
+                for subject, bps in bids_paths_in_by_subject.items()
+            ], n_jobs)
+
+            datatypes = []
+            for bp in bids_paths_in:
+                if (bp.subject != 'emptyroom' and
+                        bp.datatype not in datatypes + ['anat'] and
+                        not _check_crosstalk_path(bp) and
+                        not _check_finecal_path(bp)):
+                    datatypes.append(bp.datatype)
+            _merge_anonymized_subjects(
+                staging_roots={
+                    subject_mapping[subject]:
+                    staging_dir / f'sub-{subject_mapping[subject]}'
+                    for subject in bids_paths_in_by_subject
                 },
-                empty_room=bp_er_out,
-                verbose='error'
-            )
-
-        # Enrich sidecars
-        bp_in_json = bp_in.copy().update(extension='.json')
-        bp_out_json = bp_out.copy().update(extension='.json')
-        bp_in_events = bp_in.copy().update(suffix='events', extension='.tsv')
-        bp_out_events = bp_out.copy().update(suffix='events', extension='.tsv')
-
-        # Enrich the JSON file
-        if bp_in_json.fpath.exists():
-            json_in = json.loads(
-                bp_in_json.fpath.read_text(encoding='utf-8')
-            )
-        else:
-            json_in = dict()
-
-        if bp_out_json.fpath.exists():
-            json_out = json.loads(
-                bp_out_json.fpath.read_text(encoding='utf-8')
-            )
-        else:
-            json_out = dict()
-
-        # Only transfer data that we believe doesn't contain any personally
-        # identifiable information
-        json_updates = dict()
-        for key, value in json_in.items():
-            if key in ANONYMIZED_JSON_KEY_WHITELIST and key not in json_out:
-                json_updates[key] = value
-        del json_in, json_out
-
-        if json_updates:
-            bp_out_json.fpath.touch(exist_ok=True)
-            update_sidecar_json(
-                bids_path=bp_out_json,
-                entries=json_updates,
-                verbose='error'
-            )
-
-        # Transfer trigger codes from original *_events.tsv file
-        if bp_in_events.fpath.exists():
-            assert bp_out_events.fpath.exists()
-            events_tsv_in = _from_tsv(bp_in_events)
-            events_tsv_out = _from_tsv(bp_out_events)
-
-            assert events_tsv_in['trial_type'] == events_tsv_out['trial_type']
-            events_tsv_out['value'] = events_tsv_in['value']
-            _write_tsv(
-                fname=bp_out_events.fpath,
-                dictionary=events_tsv_out,
-                overwrite=True,
-                verbose='error'
+                bids_root_out=bids_root_out, datatypes=datatypes
             )
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
 
     # Copy some additional files
     additional_files = (
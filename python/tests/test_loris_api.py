@@ -0,0 +1,95 @@
+"""Test the LorisAPI client against a stub LORIS server."""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from python.libs.loris_api import LorisAPI
+
+
+class StubLoris(BaseHTTPRequestHandler):
+    """Answer GET requests from server.responses, counting them per path."""
+
+    def do_GET(self):
+        self.server.requests[self.path] += 1
+        if self.server.failures[self.path]:
+            self.server.failures[self.path] -= 1
+            self.send_json(503, {'error': 'Service unavailable'})
+        else:
+            self.send_json(200, self.server.responses[self.path])
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('ascii')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def loris():
+    """Run a stub server and point a LorisAPI at it."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubLoris)
+    server.requests = Counter()
+    server.failures = Counter()
+    server.responses = {
+        '/api/sites': {'Sites': ['Montreal', 'Ottawa']},
+        '/api/projects': {'Projects': {'Pumpernickel': {}}},
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    loris_api = LorisAPI()
+    loris_api.url = 'http://127.0.0.1:%d/api/' % server.server_port
+    loris_api.token = 'token'
+    yield loris_api, server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_cached_lookups(loris):
+    """Test that lookups are reused until they expire or are invalidated."""
+    loris_api, server = loris
+
+    assert loris_api.get_sites() == ['Montreal', 'Ottawa']
+    assert loris_api.get_sites_and_projects() == \
+        [['Montreal', 'Ottawa'], {'Pumpernickel': {}}]
+    assert server.requests == {'/api/sites': 1, '/api/projects': 1}
+
+    loris_api.invalidate_cache()
+    loris_api.get_sites()
+    assert server.requests['/api/sites'] == 2
+
+    # another token does not reuse the cached responses
+    loris_api.token = 'other'
+    loris_api.get_sites()
+    assert server.requests['/api/sites'] == 3
+
+    loris_api.cache_ttl = 0.1
+    loris_api.get_projects()
+    loris_api.get_projects()
+    assert server.requests['/api/projects'] == 2
+    time.sleep(0.2)
+    loris_api.get_projects()
+    assert server.requests['/api/projects'] == 3
+
+
+def test_retry(loris):
+    """Test that lookups are retried when the server is unavailable."""
+    loris_api, server = loris
+
+    server.failures['/api/sites'] = 2
+    assert loris_api.get_sites() == ['Montreal', 'Ottawa']
+    assert server.requests['/api/sites'] == 3
+
+    # only the successful response is cached
+    loris_api.get_sites()
+    assert server.requests['/api/sites'] == 3
@@ -101,6 +101,8 @@ const Configuration = (props) => {
   const [displayErrors, setDisplayErrors] = useState(false);
   const [outputTime, setOutputTime] = useState('');
   const [successMessage, setSuccessMessage] = useState(null);
+  const [jobID, setJobID] = useState(null);
+  const [jobStatus, setJobStatus] = useState({});
   const [modalVisible, setModalVisible] = useState(false);
   const [modalText, setModalText] = useState({
     mode: 'loading',
@@ -146,6 +148,7 @@ const Configuration = (props) => {
     setModalText((prevState) => {
       return {...prevState, ['mode']: 'loading'};
     });
+    setJobID(null);
     setModalVisible(true);
 
     if (appContext.getFromTask('edfData')?.['files'].length > 0) {
@@ -176,10 +179,52 @@ const Configuration = (props) => {
         taskName: appContext.getFromTask('taskName') ?? '',
         reference: appContext.getFromTask('reference') ?? '',
         subject_id: appContext.getFromTask('subject_id') ?? '',
+      }, (response) => {
+        setJobID(response['job_id']);
       });
     }
   };
 
+  /**
+   * cancelBidsCreation - cancel the running conversion.
+   *   Sent by socket to python: cancel_job.
+   */
+  const cancelBidsCreation = () => {
+    if (jobID) {
+      socketContext.emit('cancel_job', jobID);
+    }
+  };
+
+  /**
+   * formatJobProgress - the progress of the running conversion.
+   * @return {JSX.Element}
+   */
+  const formatJobProgress = () => {
+    const status = jobStatus[jobID];
+    if (!status) {
+      return null;
+    }
+    const percent = status['total_bytes'] > 0 ?
+      Math.min(100, Math.round(
+          100 * status['done_bytes'] / status['total_bytes'])) : 0;
+    return (
+      <div className='bids-progress'>
+        <progress max='100' value={percent}/>
+        <span>
+          {percent}% &middot; {status['done_runs']}/{status['total_runs']} runs
+          {status['eta'] !== null && status['status'] === 'running' &&
+            <> &middot; {Math.ceil(status['eta'])} s left</>}
+        </span>
+        <input type='button'
+          className='primary-btn'
+          onClick={cancelBidsCreation}
+          value='Cancel'
+          disabled={!['queued', 'running'].includes(status['status'])}
+        />
+      </div>
+    );
+  };
+
   /**
    * Similar to componentDidMount and componentDidUpdate.
    */
@@ -315,6 +360,11 @@ const Configuration = (props) => {
 
   useEffect(() => {
     if (socketContext) {
+      socketContext.on('job_progress', (message) => {
+        setJobStatus((prevState) => {
+          return {...prevState, [message['job_id']]: message};
+        });
+      });
       socketContext.on('bids', (message) => {
         if (message['output_time']) {
           setOutputTime(message['output_time']);
@@ -2032,6 +2082,7 @@ const Configuration = (props) => {
           width='500px'
         >
           {modalText.message[modalText.mode]}
+          {modalText.mode === 'loading' && formatJobProgress()}
         </Modal>
         <ReactTooltip/>
       </>
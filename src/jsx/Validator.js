@@ -180,6 +180,16 @@ const Validator = (props) => {
       setModalText((prevState) => {
         return {...prevState, ['mode']: 'success'};
       });
+    } else if (message['error']) {
+      setModalText((prevState) => {
+        prevState.message['error'] = (
+          <div className='bids-errors'>
+            {message['error'].map((error, i) =>
+              <span key={i}>{error}<br/></span>)}
+          </div>
+        );
+        return {...prevState, ['mode']: 'error'};
+      });
     }
   };
 